@@ -1,20 +1,56 @@
-import requests
+import argparse
 import json
-import base64
-import io
+import math
 import os
-from PIL import Image
-import numpy as np
-from moviepy.editor import *
-import tempfile
-from typing import Dict, List, Optional, Tuple
-import time
+import sys
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from datetime import datetime
 
-class AIVideoEngine:
-    """Advanced AI-powered video generation engine"""
+from profiles import ENCODING_PROFILES, EncodingProfile, get_profile
+from progress import ProgressCallback, RenderProgress
+from scripts import ScriptGenerator
+
+if TYPE_CHECKING:
+    import numpy as np
+    from moviepy.editor import VideoClip
+
+    from audio import AudioPipeline, Cue, Mix
+    from backgrounds import BackgroundCache, CachedBackground
+    from compositor import Layer, TimelineCompositor
+    from layout import Layout
+    from profiling import RenderProfiler
+    from render_cache import CachedRender, RenderCache
+    from text_cache import TextRasterCache
+    from transforms import AffineAnimation
+
+# Length of the script timeline; renders of another duration stretch it
+SCRIPT_DURATION = 30
+
+class AIVideoEngine(ScriptGenerator):
+    """Advanced AI-powered video generation engine.
+
+    Script generation (inherited from ScriptGenerator) is pure Python; the
+    render stack (numpy, PIL, moviepy, ffmpeg) and the caches are loaded on
+    first use, so importing this module or writing a script stays cheap.
+    """
     
-    def __init__(self):
+    def __init__(self, background_cache: Optional['BackgroundCache'] = None,
+                 text_cache: Optional['TextRasterCache'] = None,
+                 render_cache: Optional['RenderCache'] = None,
+                 audio_pipeline: Optional['AudioPipeline'] = None,
+                 encoding_profile: Union[str, EncodingProfile, None] = None,
+                 memory_budget_mb: Optional[float] = None):
+        super().__init__()
+        self._background_cache = background_cache
+        self._text_cache = text_cache
+        self._render_cache = render_cache
+        self._audio_pipeline = audio_pipeline
+        # Profile name or settings used when a render does not pass one
+        # (None: AI_SHORTS_ENCODING_PROFILE, see profiles.py)
+        self.encoding_profile = encoding_profile
+        # Renders run memory bounded when a budget is set (see render_platforms)
+        self.memory_budget_mb = memory_budget_mb
+        
         self.api_keys = {
             'openai': os.getenv('OPENAI_API_KEY', ''),
             'runway': os.getenv('RUNWAY_API_KEY', ''),
@@ -22,321 +58,124 @@ class AIVideoEngine:
             'replicate': os.getenv('REPLICATE_API_TOKEN', ''),
             'leonardo': os.getenv('LEONARDO_API_KEY', '')
         }
-        
-        self.viral_hooks = {
-            'finance': [
-                "This ONE secret made me $10k in 30 days",
-                "Banks HATE this simple trick",
-                "Turn $100 into $1000 (Step by step)",
-                "I discovered this at 3 AM and it changed everything",
-                "Nobody talks about this money strategy"
-            ],
-            'lifestyle': [
-                "I did this for 30 days and here's what happened",
-                "This morning habit changed my entire life",
-                "You've been doing this WRONG your whole life",
-                "The 1% secret that nobody teaches you",
-                "This will be trending everywhere in 2024"
-            ],
-            'tech': [
-                "This AI can do ANYTHING in seconds",
-                "Technology that will replace 90% of jobs",
-                "This app made me $500/day on autopilot",
-                "AI just solved humanity's biggest problem",
-                "This tech breakthrough will shock you"
-            ],
-            'motivation': [
-                "From broke to millionaire in 2 years",
-                "This mindset shift changed everything",
-                "What successful people do at 5 AM",
-                "The psychology trick that gets you anything",
-                "Why 99% of people never succeed"
-            ]
-        }
-        
-        self.engagement_patterns = {
-            'retention': [
-                "Wait until you see what happens next...",
-                "But here's where it gets interesting...",
-                "The shocking truth is...",
-                "This will blow your mind...",
-                "You won't believe what happened..."
-            ],
-            'cta': [
-                "Follow for more secrets like this!",
-                "Save this before it gets taken down!",
-                "Share this with someone who needs it!",
-                "Comment 'YES' if you want part 2!",
-                "Double tap if this helped you!"
-            ]
-        }
     
-    def analyze_prompt_category(self, prompt: str) -> str:
-        """Intelligently categorize prompt for optimal content generation"""
-        prompt_lower = prompt.lower()
-        
-        finance_keywords = ['money', 'trading', 'crypto', 'investment', 'profit', 'business', 'income']
-        tech_keywords = ['ai', 'technology', 'app', 'software', 'digital', 'online', 'automation']
-        lifestyle_keywords = ['habit', 'routine', 'health', 'fitness', 'productivity', 'success']
-        motivation_keywords = ['motivation', 'inspire', 'mindset', 'goal', 'achieve', 'dream']
-        
-        scores = {
-            'finance': sum(1 for word in finance_keywords if word in prompt_lower),
-            'tech': sum(1 for word in tech_keywords if word in prompt_lower),
-            'lifestyle': sum(1 for word in lifestyle_keywords if word in prompt_lower),
-            'motivation': sum(1 for word in motivation_keywords if word in prompt_lower)
-        }
-        
-        return max(scores, key=scores.get) if max(scores.values()) > 0 else 'lifestyle'
+    @property
+    def background_cache(self) -> 'BackgroundCache':
+        if self._background_cache is None:
+            from backgrounds import get_background_cache
+            self._background_cache = get_background_cache()
+        return self._background_cache
     
-    def generate_viral_script(self, prompt: str, category: str = None) -> Dict[str, any]:
-        """Generate viral script structure optimized for engagement"""
-        if not category:
-            category = self.analyze_prompt_category(prompt)
-        
-        hook = np.random.choice(self.viral_hooks.get(category, self.viral_hooks['lifestyle']))
-        retention = np.random.choice(self.engagement_patterns['retention'])
-        cta = np.random.choice(self.engagement_patterns['cta'])
-        
-        # Generate content structure
-        script_structure = {
-            'hook': hook,
-            'opening': f"In today's video, I'll show you {prompt.lower()}",
-            'main_points': [
-                f"First, understand this key principle...",
-                f"Next, apply this proven method...",
-                f"Finally, see these incredible results..."
-            ],
-            'retention_hook': retention,
-            'call_to_action': cta,
-            'category': category,
-            'estimated_engagement': self.calculate_engagement_score(hook, category)
-        }
-        
-        return script_structure
+    @property
+    def text_cache(self) -> 'TextRasterCache':
+        if self._text_cache is None:
+            from text_cache import get_text_cache
+            self._text_cache = get_text_cache()
+        return self._text_cache
     
-    def calculate_engagement_score(self, hook: str, category: str) -> float:
-        """Calculate predicted engagement score based on content analysis"""
-        engagement_words = ['secret', 'shock', 'amazing', 'incredible', 'proven', 'guaranteed']
-        emotional_words = ['hate', 'love', 'obsessed', 'crazy', 'insane', 'unbelievable']
-        urgency_words = ['now', 'today', 'limited', 'before', 'urgent', 'immediate']
-        
-        score = 0.5  # Base score
-        
-        hook_lower = hook.lower()
-        
-        # Add points for engagement words
-        score += sum(0.1 for word in engagement_words if word in hook_lower)
-        score += sum(0.15 for word in emotional_words if word in hook_lower)
-        score += sum(0.05 for word in urgency_words if word in hook_lower)
-        
-        # Category multipliers
-        multipliers = {
-            'finance': 1.2,
-            'tech': 1.1,
-            'lifestyle': 1.0,
-            'motivation': 1.15
-        }
-        
-        score *= multipliers.get(category, 1.0)
-        
-        return min(score, 1.0)  # Cap at 1.0
+    @property
+    def render_cache(self) -> 'RenderCache':
+        if self._render_cache is None:
+            from render_cache import get_render_cache
+            self._render_cache = get_render_cache()
+        return self._render_cache
     
-    def create_dynamic_background(self, category: str, duration: int = 30) -> VideoClip:
-        """Create dynamic animated background based on category"""
-        
-        color_schemes = {
-            'finance': [(34, 139, 34), (0, 100, 0), (50, 205, 50)],  # Green money theme
-            'tech': [(0, 191, 255), (138, 43, 226), (75, 0, 130)],   # Blue/purple tech theme
-            'lifestyle': [(255, 182, 193), (255, 160, 122), (255, 105, 180)], # Warm lifestyle
-            'motivation': [(255, 69, 0), (255, 140, 0), (255, 215, 0)]  # Orange/gold energy
-        }
-        
-        colors = color_schemes.get(category, color_schemes['lifestyle'])
-        
-        def make_dynamic_frame(t):
-            # Create animated gradient with movement
-            progress = (t / duration) % 1
-            
-            # Oscillating color blend
-            color_index = int((progress * len(colors)) % len(colors))
-            next_color_index = (color_index + 1) % len(colors)
-            
-            blend_ratio = (progress * len(colors)) % 1
-            
-            color1 = np.array(colors[color_index])
-            color2 = np.array(colors[next_color_index])
-            
-            base_color = color1 * (1 - blend_ratio) + color2 * blend_ratio
-            
-            # Create dynamic patterns
-            height, width = 720, 720
-            y, x = np.ogrid[:height, :width]
-            
-            # Moving wave pattern
-            wave = np.sin((x + y + t * 50) * 0.02) * 0.3 + 0.7
-            
-            # Apply wave to color channels
-            frame = np.zeros((height, width, 3))
-            for i in range(3):
-                frame[:, :, i] = base_color[i] * wave
-            
-            # Add subtle noise for texture
-            noise = np.random.random((height, width, 1)) * 20 - 10
-            frame += noise
-            
-            return np.clip(frame, 0, 255).astype(np.uint8)
+    @property
+    def audio_pipeline(self) -> 'AudioPipeline':
+        if self._audio_pipeline is None:
+            from audio import get_audio_pipeline
+            self._audio_pipeline = get_audio_pipeline()
+        return self._audio_pipeline
+    
+    def create_dynamic_background(self, category: str, duration: float = 30, fps: int = 30,
+                                  progress: Optional[ProgressCallback] = None,
+                                  seed: Optional[int] = None,
+                                  size: Tuple[int, int] = (720, 720)) -> 'VideoClip':
+        """Create dynamic animated background based on category, rendered natively at `size`"""
+        from moviepy.editor import VideoClip
+        
+        cached = self.cached_background(category, duration, fps, progress, seed, size)
+        return VideoClip(cached.make_frame, duration=duration)
+    
+    def cached_background(self, category: str, duration: float = 30, fps: int = 30,
+                          progress: Optional[ProgressCallback] = None, seed: Optional[int] = None,
+                          size: Tuple[int, int] = (720, 720)) -> 'CachedBackground':
+        """Frame source of the category background, served from the background cache"""
+        from backgrounds import DynamicBackground
         
-        return VideoClip(make_dynamic_frame, duration=duration)
+        return self.background_cache.get(DynamicBackground(category, duration, size, seed=seed), fps, progress)
     
     def create_text_with_effects(self, text: str, start_time: float, duration: float, 
-                               position: tuple = ('center', 'center'), style: str = 'title') -> TextClip:
+                               position: tuple = ('center', 'center'), style: str = 'title') -> 'VideoClip':
         """Create text with advanced effects and animations"""
-        
-        styles = {
-            'title': {
-                'fontsize': 50,
-                'color': 'white',
-                'font': 'Arial-Bold',
-                'stroke_color': 'black',
-                'stroke_width': 3
-            },
-            'subtitle': {
-                'fontsize': 35,
-                'color': 'yellow',
-                'font': 'Arial',
-                'stroke_color': 'black',
-                'stroke_width': 2
-            },
-            'content': {
-                'fontsize': 40,
-                'color': 'white',
-                'font': 'Arial-Bold',
-                'stroke_color': 'red',
-                'stroke_width': 2
-            },
-            'cta': {
-                'fontsize': 45,
-                'color': 'lime',
-                'font': 'Arial-Bold',
-                'stroke_color': 'black',
-                'stroke_width': 3
-            }
-        }
-        
-        style_config = styles.get(style, styles['content'])
-        
-        # Create text clip
-        txt_clip = TextClip(text, **style_config)
-        
-        # Add entrance animation (scale up)
-        txt_clip = txt_clip.set_duration(duration).set_position(position)
-        txt_clip = txt_clip.set_start(start_time)
-        
-        # Add scale animation for emphasis
+        return self.create_text_layer(text, start_time, duration, position, style).clip()
+    
+    def create_text_layer(self, text: str, start_time: float, duration: float,
+                          position: tuple = ('center', 'center'), style: str = 'title',
+                          layout: Optional['Layout'] = None) -> 'Layer':
+        """Create a timed text overlay for the compositor, sized for the layout's canvas"""
+        from compositor import Layer
+        from layout import Layout
+        from transforms import make_sprite
+        
+        style_config = (layout or Layout()).style(style)
+        
+        # Create text sprite from the cached raster, with a scale animation
+        # for emphasis served from pre-scaled variants
+        raster = self.text_cache.get(text, **style_config)
         if style in ['title', 'cta']:
-            txt_clip = txt_clip.resize(lambda t: 1 + 0.1 * np.sin(t * 4))
+            sprite = make_sprite(raster, scale=lambda t: 1 + 0.1 * math.sin(t * 4))
+        else:
+            sprite = make_sprite(raster)
         
-        return txt_clip
+        return Layer(sprite, start_time, duration, position)
     
-    def add_viral_elements(self, video_clip: VideoClip) -> VideoClip:
-        """Add viral elements like zoom, transitions, and effects"""
-        # Add subtle zoom for retention
-        zoomed = video_clip.resize(lambda t: 1 + 0.05 * np.sin(t * 0.5))
-        
-        # Add fade transitions
-        with_transitions = zoomed.crossfadein(1.0).crossfadeout(1.0)
-        
-        # Add slight rotation for dynamic feel
-        dynamic = with_transitions.rotate(lambda t: 2 * np.sin(t * 0.3))
-        
-        return dynamic
+    def viral_animation(self) -> 'AffineAnimation':
+        """Zoom, rotation and fades applied to the background"""
+        from transforms import AffineAnimation
+        
+        return AffineAnimation(
+            zoom=lambda t: 1 + 0.05 * math.sin(t * 0.5),  # Subtle zoom for retention
+            angle=lambda t: 2 * math.sin(t * 0.3),  # Slight rotation for dynamic feel
+            fade_in=1.0,  # Fade transitions
+            fade_out=1.0
+        )
     
-    def create_shorts_masterpiece(self, prompt: str, style: str = "viral") -> Tuple[VideoClip, Dict]:
-        """Create a complete 30-second viral shorts video"""
+    def add_viral_elements(self, video_clip: 'VideoClip',
+                           profiler: Optional['RenderProfiler'] = None,
+                           animation: Optional['AffineAnimation'] = None) -> 'VideoClip':
+        """Add viral elements like zoom, transitions, and effects (timed as 'effects WxH' by `profiler`)"""
+        animation = animation or self.viral_animation()
+        
+        if profiler is not None:
+            width, height = video_clip.size
+            animation.apply = profiler.timed(f"effects {width}x{height}", animation.apply)
+        
+        # Zoom, rotation and fades are applied in a single warp per frame
+        return animation.apply_to(video_clip)
+    
+    def create_shorts_masterpiece(self, prompt: str, style: str = "viral",
+                                  progress: Optional[ProgressCallback] = None,
+                                  seed: Optional[int] = None,
+                                  platform: str = 'instagram') -> Tuple['VideoClip', Dict]:
+        """Create a complete 30-second viral shorts video, laid out natively for `platform`"""
+        from fanout import platform_spec
+        
+        progress = RenderProgress.wrap(progress)
         
         try:
             # Generate script and analyze
+            progress('script', 0)
             category = self.analyze_prompt_category(prompt)
-            script_data = self.generate_viral_script(prompt, category)
-            
-            # Create dynamic background (30 seconds)
-            bg_video = self.create_dynamic_background(category, 30)
-            
-            # Create text elements with perfect timing
-            text_clips = []
-            
-            # Hook (0-3 seconds)
-            hook_clip = self.create_text_with_effects(
-                script_data['hook'],
-                start_time=0,
-                duration=3,
-                position=('center', 150),
-                style='title'
-            )
-            text_clips.append(hook_clip)
-            
-            # Opening (3-6 seconds)
-            opening_clip = self.create_text_with_effects(
-                script_data['opening'],
-                start_time=3,
-                duration=3,
-                position=('center', 350),
-                style='subtitle'
-            )
-            text_clips.append(opening_clip)
-            
-            # Main content points (6-24 seconds)
-            for i, point in enumerate(script_data['main_points']):
-                start_time = 6 + i * 6
-                point_clip = self.create_text_with_effects(
-                    point,
-                    start_time=start_time,
-                    duration=5,
-                    position=('center', 400 + i * 50),
-                    style='content'
-                )
-                text_clips.append(point_clip)
-            
-            # Retention hook (24-27 seconds)
-            retention_clip = self.create_text_with_effects(
-                script_data['retention_hook'],
-                start_time=24,
-                duration=3,
-                position=('center', 200),
-                style='subtitle'
-            )
-            text_clips.append(retention_clip)
-            
-            # Call to action (27-30 seconds)
-            cta_clip = self.create_text_with_effects(
-                script_data['call_to_action'],
-                start_time=27,
-                duration=3,
-                position=('center', 600),
-                style='cta'
-            )
-            text_clips.append(cta_clip)
+            script_data = self.generate_viral_script(prompt, category, seed)
+            progress('script', 1)
             
-            # Add viral effects to background
-            enhanced_bg = self.add_viral_elements(bg_video)
-            
-            # Compose final video
-            final_video = CompositeVideoClip([enhanced_bg] + text_clips)
-            
-            # Ensure perfect 720p vertical format
-            final_video = final_video.resize((720, 720))
+            # Compose the timeline
+            size = platform_spec(platform)['size']
+            final_video = self.build_compositor(script_data, progress, size).as_clip()
             
             # Add metadata
-            metadata = {
-                'script': script_data,
-                'category': category,
-                'duration': 30,
-                'resolution': '720x720',
-                'engagement_score': script_data['estimated_engagement'],
-                'created_at': datetime.now().isoformat(),
-                'optimization': 'viral_shorts'
-            }
+            metadata = dict(self.script_metadata(script_data, size), platform=platform)
             
             return final_video, metadata
             
@@ -344,20 +183,256 @@ class AIVideoEngine:
             print(f"Error in video creation: {str(e)}")
             return None, None
     
-    def optimize_for_platform(self, video: VideoClip, platform: str) -> VideoClip:
-        """Optimize video for specific social media platforms"""
-        
-        platform_specs = {
-            'instagram': {'size': (720, 720), 'fps': 30, 'duration': 30},
-            'tiktok': {'size': (720, 1280), 'fps': 30, 'duration': 30},
-            'youtube_shorts': {'size': (720, 1280), 'fps': 30, 'duration': 60},
-            'facebook': {'size': (720, 720), 'fps': 30, 'duration': 30}
+    def script_metadata(self, script_data: Dict, size: Tuple[int, int] = (720, 720),
+                        duration: float = SCRIPT_DURATION) -> Dict:
+        """Metadata describing a script rendered at `size` for `duration` seconds"""
+        return {
+            'script': script_data,
+            'category': script_data['category'],
+            'duration': duration,
+            'resolution': f'{size[0]}x{size[1]}',
+            'engagement_score': script_data['estimated_engagement'],
+            'created_at': datetime.now().isoformat(),
+            'optimization': 'viral_shorts',
+            'seed': script_data.get('seed')
         }
+    
+    def render_short(self, prompt: str, style: str = "viral", platform: str = 'instagram', fps: int = 30,
+                     progress: Optional[ProgressCallback] = None, seed: Optional[int] = None,
+                     audio: bool = True, profile: Union[str, EncodingProfile, None] = None,
+                     preview: Optional[Callable[[bytes], None]] = None,
+                     profiler: Optional['RenderProfiler'] = None,
+                     duration: float = SCRIPT_DURATION) -> 'CachedRender':
+        """Generate a script and return its encoded MP4, thumbnail and metadata"""
+        progress = RenderProgress.wrap(progress)
+        if profiler is not None:
+            progress.profiler = profiler
+        progress('script', 0)
+        script_data = self.generate_viral_script(prompt, self.analyze_prompt_category(prompt), seed)
+        progress('script', 1)
+        return self.render_script(script_data, style, platform, fps, progress, audio, profile, preview, profiler,
+                                  duration)
+    
+    def render_script(self, script_data: Dict, style: str = "viral", platform: str = 'instagram', fps: int = 30,
+                      progress: Optional[ProgressCallback] = None, audio: bool = True,
+                      profile: Union[str, EncodingProfile, None] = None,
+                      preview: Optional[Callable[[bytes], None]] = None,
+                      profiler: Optional['RenderProfiler'] = None,
+                      duration: float = SCRIPT_DURATION) -> 'CachedRender':
+        """Encoded MP4, thumbnail and metadata of a resolved script, served from the render cache when possible"""
+        return self.render_platforms(script_data, [platform], style, fps, progress, audio, profile, preview,
+                                     profiler, duration)[platform]
+    
+    def render_platforms(self, script_data: Dict, platforms: Sequence[str] = ('instagram',), style: str = "viral",
+                         fps: int = 30, progress: Optional[ProgressCallback] = None,
+                         audio: bool = True, profile: Union[str, EncodingProfile, None] = None,
+                         preview: Optional[Callable[[bytes], None]] = None,
+                         profiler: Optional['RenderProfiler'] = None,
+                         duration: float = SCRIPT_DURATION) -> Dict[str, 'CachedRender']:
+        """One render per platform from a single composition pass.
+        
+        Platforms missing from the render cache are composed natively once
+        per canvas size, fanned out from that frame stream and encoded in
+        parallel.  `preview`, if given, receives an animated GIF preview
+        (see preview.py) before the full-quality encode starts.
+        
+        A started `profiler` (see profiling.py) records stage and frame
+        timings of the render, and its report is attached to each render's
+        metadata as 'profile'; the render cache is not read then, so the
+        report always covers a full render.  The script timeline (overlays
+        and narration) is stretched to `duration` seconds, or to a
+        platform's length limit when that is shorter.
+        
+        With a memory budget (see memory_budget) the render runs memory
+        bounded: composed frames in flight and encoder threads are cut as
+        far as the budget and canvas sizes need (see fanout.fit_memory_budget),
+        and a render that still goes over it is stopped with
+        MemoryBudgetExceeded.  Peak memory is recorded in each render's
+        metadata either way, along with its size, length, encoding and
+        whether it came from the render cache ('cache_hit').
+        """
+        progress = RenderProgress.wrap(progress)
+        if profiler is not None:
+            # Deferred render-stack imports, cache setup and lookups, up to the first frame work
+            progress.profiler = profiler
+            profiler.enter('setup')
+        
+        from fanout import FRAMES_IN_FLIGHT, fit_memory_budget, platform_variant, render_variants
+        from profiling import MemoryBudgetExceeded, MemoryMonitor
+        from render_cache import CachedRender, encode_thumbnail, render_key
+        
+        profile = self.resolve_profile(profile)
+        renders, keys = {}, {}
+        for platform in platforms:
+            key = render_key(script_data, {'renderer': 'engine', 'style': style, 'platform': platform, 'fps': fps,
+                                           'duration': platform_variant(platform, duration, fps).frames / fps,
+                                           'audio': self.audio_pipeline.render_tag if audio else None,
+                                           'encoding': profile._asdict()})
+            cached = self.render_cache.get(key) if profiler is None else None
+            if cached is not None:
+                renders[platform] = cached._replace(metadata=dict(cached.metadata, cache_hit=True))
+            else:
+                keys[platform] = key
+        if not keys:
+            progress('cached', 1)
+            return renders
+        
+        # One native composition per distinct canvas size and length: a
+        # platform capped below `duration` gets the whole script, stretched
+        # to its own length, rather than the start of a longer timeline
+        variants = {platform: platform_variant(platform, duration, fps) for platform in keys}
+        timelines = {(variant.size, variant.frames) for variant in variants.values()}
+        budget = self.memory_budget()
+        frames_in_flight = FRAMES_IN_FLIGHT
+        if budget is not None:
+            frames_in_flight, threads = fit_memory_budget(budget, [size for size, _ in timelines],
+                                                          set(variants.values()), profile.threads)
+            profile = profile._replace(threads=threads)
+        
+        with MemoryMonitor(limit_mb=budget) as memory:
+            compositors = {}
+            for variant in variants.values():
+                if (variant.size, variant.frames) not in compositors:
+                    compositors[variant.size, variant.frames] = self.build_compositor(
+                        script_data, progress, variant.size, profiler, variant.frames / fps)
+            if preview is not None:
+                if profiler is not None:
+                    profiler.enter('preview')
+                preview(self.render_preview(next(iter(compositors.values()))))
+            mixes = {}
+            if audio:
+                for frames in sorted({variant.frames for variant in variants.values()}):
+                    mixes[frames] = self.build_audio(script_data, progress=progress, duration=frames / fps)
+            if profiler is not None:
+                profiler.enter('thumbnail')
+            thumbnails = {timeline: self.generate_thumbnail(compositor.as_clip())
+                          for timeline, compositor in compositors.items()}
+            reused = sum(compositor.reused_frames for compositor in compositors.values())
+            videos = render_variants(list(compositors.values()), variants.values(), fps,
+                                     {variant: mixes[variant.frames].path if audio else None
+                                      for variant in variants.values()},
+                                     progress, profile=profile, profiler=profiler, frames_in_flight=frames_in_flight,
+                                     stop=memory.exceeded)
+            reused = sum(compositor.reused_frames for compositor in compositors.values()) - reused
+        if memory.exceeded.is_set():
+            raise MemoryBudgetExceeded(f"Render went over its {budget:g} MB memory budget "
+                                       f"({frames_in_flight} frames in flight, encoder threads: {profile.threads or 'auto'})")
+        if profiler is not None:
+            profiler.enter('store')
+        
+        peak_memory = memory.report()
+        peak_memory['total_mb'] = round(peak_memory['peak_rss_mb'] + peak_memory['peak_ffmpeg_rss_mb'], 1)
+        memory_info = {'peak_memory': peak_memory}
+        if budget is not None:
+            memory_info.update(memory_budget_mb=budget, frames_in_flight=frames_in_flight)
+        for platform, key in keys.items():
+            variant = variants[platform]
+            render = CachedRender(
+                videos[variant],
+                encode_thumbnail(thumbnails[variant.size, variant.frames]),
+                dict(self.script_metadata(script_data, variant.size, variant.frames / fps), platform=platform,
+                     fps=fps, encoding=profile._asdict(), deduplicated_frames=reused,
+                     **memory_info)
+            )
+            # A mix whose narration fell back to music only must not answer later narrated requests
+            if not audio or mixes[variant.frames].tag == self.audio_pipeline.render_tag:
+                self.render_cache.put(key, *render)
+            renders[platform] = render._replace(metadata=dict(render.metadata, cache_hit=False))
+        if profiler is not None:
+            # The report describes this run only, so it is not stored in the render cache
+            profiler.enter(None)
+            report = profiler.report()
+            for platform in keys:
+                renders[platform] = renders[platform]._replace(metadata=dict(renders[platform].metadata,
+                                                                             profile=report))
+        return renders
+    
+    def build_compositor(self, script_data: Dict, progress: Optional[ProgressCallback] = None,
+                         size: Tuple[int, int] = (720, 720),
+                         profiler: Optional['RenderProfiler'] = None,
+                         duration: float = SCRIPT_DURATION) -> 'TimelineCompositor':
+        """Build the timeline for a generated script, laid out natively for `size`.
+        
+        The overlays are timed for a 30-second clip and stretched to
+        `duration`.  With a `profiler`, background frames, effects and
+        overlay blends are timed.
+        """
+        from compositor import TimelineCompositor
+        from layout import SLOTS, Layout
+        from moviepy.editor import VideoClip
+        
+        progress = RenderProgress.wrap(progress)
+        layout = Layout(size)
+        stretch = duration / SCRIPT_DURATION
+        
+        # Create dynamic background, one color cycle per clip
+        background = self.cached_background(script_data['category'], duration, progress=progress,
+                                            seed=script_data.get('seed'), size=layout.size)
+        bg_video = VideoClip(background.make_frame, duration=duration)
+        if profiler is not None:
+            bg_video.make_frame = profiler.timed(f"background {size[0]}x{size[1]}", bg_video.make_frame)
+        
+        # Create text elements with perfect timing; positions and font
+        # sizes are relative to the canvas (see layout.SLOTS)
+        progress('text', 0)
+        text_layers = []
+        
+        def add_text(element: str, text: str, start_time: float, duration: float, index: int = 0):
+            position = layout.position(element, index)
+            style = SLOTS[element].style
+            text_layers.append(self.create_text_layer(text, start_time * stretch, duration * stretch,
+                                                      position, style, layout))
+        
+        # Hook (0-3 seconds)
+        add_text('hook', script_data['hook'], 0, 3)
+        
+        # Opening (3-6 seconds)
+        add_text('opening', script_data['opening'], 3, 3)
+        
+        # Main content points (6-24 seconds)
+        for i, point in enumerate(script_data['main_points']):
+            add_text('main_point', point, 6 + i * 6, 5, i)
+        
+        # Retention hook (24-27 seconds)
+        add_text('retention_hook', script_data['retention_hook'], 24, 3)
+        
+        # Call to action (27-30 seconds)
+        add_text('call_to_action', script_data['call_to_action'], 27, 3)
+        progress('text', 1)
+        
+        # Add viral effects to background
+        animation = self.viral_animation()
+        enhanced_bg = self.add_viral_elements(bg_video, profiler, animation)
+        
+        # An effected background frame is unchanged while both the cached
+        # background frame and the warp are; the compositor then only
+        # re-blends the overlays that changed, or reuses the whole frame
+        def background_key(t: float) -> Optional[Tuple]:
+            key = background.frame_key(t)
+            return None if key is None else (key, animation.frame_key(t, layout.size, duration))
+        
+        # Compose final video; every layer is already at the canvas size,
+        # so no final resize pass is needed
+        compositor = TimelineCompositor(enhanced_bg.get_frame, text_layers, duration, layout.size,
+                                        background_key=background_key)
+        if profiler is not None:
+            compositor.blend = profiler.timed(f"blend {size[0]}x{size[1]}", compositor.blend)
+        return compositor
+    
+    def optimize_for_platform(self, video: 'VideoClip', platform: str) -> 'VideoClip':
+        """Optimize video for specific social media platforms.
         
-        spec = platform_specs.get(platform, platform_specs['instagram'])
+        Prefer composing at the platform size (build_compositor's `size`);
+        this fits an already-built clip without distorting it.
+        """
+        from fanout import fit_frame, platform_spec
         
-        # Resize and adjust
-        optimized = video.resize(spec['size'])
+        spec = platform_spec(platform)
+        
+        # Fit and adjust (skipping the resample when the size already matches)
+        optimized = video
+        if tuple(video.size) != spec['size']:
+            optimized = video.fl_image(lambda frame: fit_frame(frame, spec['size'], spec['fit']))
         
         # Adjust duration if needed
         if video.duration > spec['duration']:
@@ -365,38 +440,200 @@ class AIVideoEngine:
         
         return optimized
     
-    def generate_thumbnail(self, video: VideoClip, timestamp: float = 2.0) -> np.ndarray:
+    def render_preview(self, compositor: 'TimelineCompositor') -> bytes:
+        """Animated GIF of a few downscaled keyframes, ready long before the full encode"""
+        from preview import render_preview
+        
+        return render_preview(compositor.make_frame, compositor.duration)
+    
+    def memory_budget(self) -> Optional[float]:
+        """Peak memory budget of a render in MB (None: unbounded), from the engine or AI_SHORTS_MEMORY_BUDGET_MB"""
+        budget = self.memory_budget_mb or float(os.getenv('AI_SHORTS_MEMORY_BUDGET_MB', 0))
+        return budget or None
+    
+    def resolve_profile(self, profile: Union[str, EncodingProfile, None] = None) -> EncodingProfile:
+        """Settings of `profile`, else of the engine's default encoding profile"""
+        return get_profile(profile or self.encoding_profile)
+    
+    def encode_video(self, video: 'VideoClip', fps: int = 30, output: Optional[str] = None,
+                     progress: Optional[ProgressCallback] = None, audio: Optional[str] = None,
+                     profile: Union[str, EncodingProfile, None] = None) -> bytes:
+        """Encode the video (and optional audio file) to MP4 bytes by piping frames straight into ffmpeg"""
+        from encoder import encode_clip
+        
+        return encode_clip(video, fps, output, progress, audio, self.resolve_profile(profile))
+    
+    def stream_video(self, video: 'VideoClip', fps: int = 30, progress: Optional[ProgressCallback] = None,
+                     audio: Optional[str] = None, profile: Union[str, EncodingProfile, None] = None) -> Iterator[bytes]:
+        """Encode the video and yield fragmented MP4 chunks as they are produced"""
+        from encoder import stream_clip
+        
+        return stream_clip(video, fps, progress=progress, audio=audio, profile=self.resolve_profile(profile))
+    
+    def render_parallel(self, script_data: Dict, fps: int = 30, workers: Optional[int] = None,
+                        output: Optional[str] = None, progress: Optional[ProgressCallback] = None,
+                        audio: bool = True, profile: Union[str, EncodingProfile, None] = None) -> bytes:
+        """Render a script's timeline in parallel segments and join them without re-encoding the video"""
+        from parallel_render import render_parallel
+        
+        audio_path = self.build_audio(script_data, progress=progress).path if audio else None
+        return render_parallel(self, script_data, fps, workers, output, progress, audio_path,
+                               self.resolve_profile(profile))
+    
+    def generate_batch(self, prompts: List[str], platforms: Tuple[str, ...] = ('instagram',),
+                       output_dir: str = 'shorts', workers: Optional[int] = None,
+                       fps: int = 30, seed: Optional[int] = None, audio: bool = True,
+                       profile: Optional[str] = None) -> Iterator[Dict]:
+        """Render many prompts on a worker pool, yielding path + metadata as each finishes"""
+        from batch import generate_batch
+        
+        return generate_batch(prompts, platforms, output_dir, workers, fps, seed, audio,
+                              profile or self.encoding_profile)
+    
+    def generate_thumbnail(self, video: 'VideoClip', timestamp: float = 2.0) -> 'np.ndarray':
         """Generate an engaging thumbnail from the video"""
+        import numpy as np
+        
         # Get frame at specified timestamp
         frame = video.get_frame(timestamp)
         
-        # Add thumbnail enhancements (brightness, contrast)
-        enhanced = np.clip(frame * 1.2 + 20, 0, 255).astype(np.uint8)
-        
-        return enhanced
+        # Add thumbnail enhancements (brightness, contrast) through a lookup
+        # table, so the frame never goes through a float64 copy
+        levels = np.clip(np.arange(256) * 1.2 + 20, 0, 255).astype(np.uint8)
+        return levels[np.asarray(frame, dtype=np.uint8)]
+    
+    def add_background_music(self, video: 'VideoClip', music_type: str = 'upbeat',
+                             script_data: Optional[Dict] = None) -> 'VideoClip':
+        """Add background music (and narration of `script_data`, if given)"""
+        from moviepy.editor import AudioFileClip
+        
+        cues = self.narration_cues(script_data) if script_data else []
+        path = self.audio_pipeline.mix(cues, video.duration, music_type, narration=bool(cues))
+        # encode_video muxes the file behind the clip's audio in the video pass
+        return video.set_audio(AudioFileClip(path))
+    
+    def narration_cues(self, script_data: Dict, duration: float = SCRIPT_DURATION) -> List['Cue']:
+        """Spoken script lines, timed like the overlays in build_compositor"""
+        cues = [(0, 3, script_data['hook']), (3, 3, script_data['opening'])]
+        cues += [(6 + i * 6, 5, point) for i, point in enumerate(script_data['main_points'])]
+        cues.append((27, 3, script_data['call_to_action']))
+        if duration != SCRIPT_DURATION:
+            stretch = duration / SCRIPT_DURATION
+            cues = [(start * stretch, length * stretch, text) for start, length, text in cues]
+        return cues
     
-    def add_background_music(self, video: VideoClip, music_type: str = 'upbeat') -> VideoClip:
-        """Add background music based on category"""
-        # This would integrate with music APIs or local files
-        # For now, return video as-is
-        # In production, you'd add actual audio processing here
-        return video
+    def build_audio(self, script_data: Dict, music_type: Optional[str] = None, narration: bool = True,
+                    progress: Optional[ProgressCallback] = None, duration: float = SCRIPT_DURATION) -> 'Mix':
+        """The mixed music + narration track for a script (its path, and 'music' in its tag when narration failed)"""
+        from audio import CATEGORY_MUSIC
+        
+        progress = RenderProgress.wrap(progress)
+        progress('audio', 0)
+        music_type = music_type or CATEGORY_MUSIC.get(script_data['category'], 'upbeat')
+        mix = self.audio_pipeline.mix_tagged(self.narration_cues(script_data, duration), duration, music_type,
+                                             narration)
+        progress('audio', 1)
+        return mix
 
-# Usage example and testing
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="AI shorts generator")
+    subcommands = parser.add_subparsers(dest='command')
+    
+    demo = subcommands.add_parser('demo', help="Generate one test short (the default command)")
+    demo.add_argument('prompt', nargs='?', default="How to make money with AI in 2024")
+    demo.add_argument('--seed', type=int, default=None, help="Seed for a reproducible render")
+    demo.add_argument('--platform', default='instagram', help="Platform whose canvas size to lay out for")
+    demo.add_argument('--profile', action='store_true',
+                      help="Render and encode the short, reporting per-stage/per-frame timings and peak memory")
+    demo.add_argument('--output', default=None,
+                      help="Render and encode the short to this MP4 (default with the options below: short.mp4); "
+                           "metadata and any profile report go next to it as JSON")
+    demo.add_argument('--duration', type=float, default=None,
+                      help=f"Render and encode a short of this many seconds (default {SCRIPT_DURATION})")
+    demo.add_argument('--memory-budget', type=float, default=None,
+                      help="Render and encode the short memory bounded, within this budget in MB")
+    
+    batch = subcommands.add_parser('batch', help="Render many prompts in one job")
+    batch.add_argument('prompts_file', help="Text file with one prompt per line")
+    batch.add_argument('--platforms', nargs='+', default=['instagram'])
+    batch.add_argument('--output-dir', default='shorts')
+    batch.add_argument('--workers', type=int, default=None)
+    batch.add_argument('--fps', type=int, default=30)
+    batch.add_argument('--seed', type=int, default=None, help="Base seed; prompt i uses seed + i")
+    batch.add_argument('--no-audio', dest='audio', action='store_false', help="Render silent videos")
+    batch.add_argument('--encoding-profile', choices=sorted(ENCODING_PROFILES), default=None,
+                       help="Encoder settings (default: AI_SHORTS_ENCODING_PROFILE or publish)")
+    
+    # 'demo' is the default command, so e.g. `python ai_generator.py --profile` profiles the demo
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in subcommands.choices and argv[0] not in ('-h', '--help'):
+        argv = ['demo'] + argv
+    args = parser.parse_args(argv)
+    
     # Initialize the AI engine
-    engine = AIVideoEngine()
+    engine = AIVideoEngine(memory_budget_mb=getattr(args, 'memory_budget', None))
     
-    # Test prompt
-    test_prompt = "How to make money with AI in 2024"
+    if args.command == 'batch':
+        with open(args.prompts_file) as handle:
+            prompts = [line.strip() for line in handle if line.strip()]
+        
+        results = engine.generate_batch(prompts, args.platforms, args.output_dir, args.workers, args.fps,
+                                        args.seed, args.audio, args.encoding_profile)
+        for result in results:
+            if 'error' in result:
+                print(f"[{result['completed']}/{result['total']}] FAILED {result['prompt']}: {result['error']}")
+            else:
+                print(f"[{result['completed']}/{result['total']}] {result['prompt']} -> "
+                      f"{', '.join(result['paths'].values())} "
+                      f"({result['videos_per_minute']:.1f} videos/min)")
+        return
+    
+    prompt = args.prompt
+    if args.profile or args.output or args.duration or args.memory_budget:
+        from profiling import MemoryBudgetExceeded, RenderProfiler, format_report
+        
+        output = args.output or 'short.mp4'
+        base = os.path.splitext(output)[0]
+        profiler = RenderProfiler() if args.profile else None
+        try:
+            if profiler is not None:
+                profiler.start()
+            render = engine.render_short(prompt, platform=args.platform, seed=args.seed, profiler=profiler,
+                                         duration=args.duration or SCRIPT_DURATION)
+        except MemoryBudgetExceeded as e:
+            parser.exit(1, f"{e}\n")
+        finally:
+            if profiler is not None:
+                profiler.stop()
+        
+        with open(output, 'wb') as handle:
+            handle.write(render.video)
+        with open(f"{base}.json", 'w') as handle:
+            json.dump(render.metadata, handle, indent=2, default=str)
+        written = [output, f"{base}.json"]
+        if profiler is not None:
+            report = profiler.report()
+            with open(f"{base}.profile.json", 'w') as handle:
+                json.dump(report, handle, indent=2)
+            written.append(f"{base}.profile.json")
+            print(format_report(report))
+        if 'peak_memory' in render.metadata:
+            print(f"Peak memory: {render.metadata['peak_memory']['total_mb']:.1f} MB")
+        print(f"Wrote {', '.join(written)}")
+        return
     
     # Generate video
-    video, metadata = engine.create_shorts_masterpiece(test_prompt)
+    video, metadata = engine.create_shorts_masterpiece(prompt, seed=args.seed, platform=args.platform)
     
     if video and metadata:
         print(f"Video created successfully!")
         print(f"Category: {metadata['category']}")
         print(f"Engagement Score: {metadata['engagement_score']:.2f}")
         print(f"Script Hook: {metadata['script']['hook']}")
+        print(f"Seed: {metadata['seed']}")
     else:
-        print("Failed to create video")
\ No newline at end of file
+        print("Failed to create video")
+
+# Usage example and testing
+if __name__ == "__main__":
+    main()
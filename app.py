@@ -1,24 +1,16 @@
 import streamlit as st
-import requests
-import json
-import time
-from moviepy.editor import *
-from PIL import Image, ImageDraw, ImageFont
-import numpy as np
-import os
-from datetime import datetime
-import tempfile
+import random
 
-# Page config
-st.set_page_config(
-    page_title="AI Shorts Generator",
-    page_icon="🎬",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+# The render stack (numpy, PIL, moviepy, ffmpeg) is imported inside the
+# render functions, which run in the job workers, so the UI starts fast
+from engine import QueueFullError
+from job_ui import download_video, get_engine, show_job, show_render_stats
+from profiles import DEFAULT_PROFILE, ENCODING_PROFILES, get_profile
+from progress import RenderProgress
+from seeding import resolve_seed
 
 # Custom CSS for better UI
-st.markdown("""
+CUSTOM_CSS = """
 <style>
 .main-header {
     font-size: 2.5rem;
@@ -42,7 +34,19 @@ st.markdown("""
     margin: 0.5rem 0;
 }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+def setup_page():
+    """Configure the page (kept out of import time so render workers can import this module)"""
+    # Page config
+    st.set_page_config(
+        page_title="AI Shorts Generator",
+        page_icon="🎬",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 class AIVideoGenerator:
     def __init__(self):
@@ -52,7 +56,7 @@ class AIVideoGenerator:
             'leonardo': 'https://cloud.leonardo.ai/api/rest/v1/generations-motion'
         }
         
-    def generate_engaging_script(self, prompt):
+    def generate_engaging_script(self, prompt, rng=None):
         """Generate engaging script based on prompt"""
         script_templates = {
             'finance': [
@@ -79,71 +83,91 @@ class AIVideoGenerator:
         elif any(word in prompt.lower() for word in ['ai', 'tech', 'technology', 'future']):
             category = 'tech'
             
-        return np.random.choice(script_templates[category])
+        rng = rng if rng is not None else random.Random(resolve_seed())
+        return rng.choice(script_templates[category])
     
     def create_text_clip(self, text, duration=3, position='center', fontsize=60):
         """Create text overlay clip"""
-        # Create text clip
-        txt_clip = TextClip(text, 
-                           fontsize=fontsize,
-                           color='white',
-                           font='Arial-Bold',
-                           stroke_color='black',
-                           stroke_width=2)
+        return self.create_text_layer(text, 0, duration, position, fontsize).clip()
+    
+    def create_text_layer(self, text, start=0, duration=3, position='center', fontsize=60):
+        """Create a timed text overlay for the compositor"""
+        from compositor import Layer
+        from text_cache import get_text_cache
+        from transforms import StaticSprite
+        
+        # Create text sprite from the cached raster
+        raster = get_text_cache().get(text, 
+                                      fontsize=fontsize,
+                                      color='white',
+                                      font='Arial-Bold',
+                                      stroke_color='black',
+                                      stroke_width=2)
         
-        txt_clip = txt_clip.set_duration(duration).set_position(position)
-        return txt_clip
+        return Layer(StaticSprite(raster), start, duration, position)
+    
+    def narration_cues(self, script):
+        """Spoken lines, timed like the overlays in create_shorts_video"""
+        return [
+            (0, 5, script),
+            (5, 6, "Step 1: Understanding the basics"),
+            (12, 6, "Step 2: Apply this technique"),
+            (19, 6, "Step 3: See AMAZING results!"),
+            (25, 5, "Follow for more tips!")
+        ]
     
     def add_engagement_elements(self, video_clip):
         """Add engagement elements like arrows, emojis, transitions"""
-        # Add zoom effect
-        video_with_zoom = video_clip.resize(lambda t: 1 + 0.02*t)
+        from transforms import AffineAnimation
         
-        # Add fade transitions
-        video_with_fade = video_with_zoom.crossfadein(0.5).crossfadeout(0.5)
+        # Add zoom effect and fade transitions in a single warp per frame
+        animation = AffineAnimation(zoom=lambda t: 1 + 0.02*t, fade_in=0.5, fade_out=0.5)
         
-        return video_with_fade
+        return animation.apply_to(video_clip)
     
-    def generate_background_video(self, prompt, style="cinematic"):
+    def generate_background_video(self, prompt, style="cinematic", progress=None):
         """Generate or select background video based on prompt"""
+        from backgrounds import PulseBackground, get_background_cache
+        from moviepy.editor import VideoClip
+        
         # For demo, create a colorful gradient background
         duration = 30  # 30 seconds
         
-        def make_frame(t):
-            # Create animated gradient background
-            color1 = np.array([255, 100, 100])  # Red
-            color2 = np.array([100, 100, 255])  # Blue
-            
-            # Animate between colors
-            ratio = (np.sin(t * 0.5) + 1) / 2
-            color = color1 * (1 - ratio) + color2 * ratio
-            
-            frame = np.ones((720, 720, 3)) * color.reshape(1, 1, 3)
-            return frame.astype(np.uint8)
+        # Animate between red and blue; one loop is rendered once and cached
+        background = PulseBackground(((255, 100, 100), (100, 100, 255)))
+        make_frame = get_background_cache().get(background, fps=30, progress=progress).make_frame
         
         bg_clip = VideoClip(make_frame, duration=duration)
         return bg_clip
     
-    def create_shorts_video(self, prompt, style="viral"):
+    def create_shorts_video(self, prompt, style="viral", progress=None, script=None):
         """Main function to create 720p shorts video"""
+        from compositor import TimelineCompositor
+        
+        progress = RenderProgress.wrap(progress)
         try:
-            # Generate engaging script
-            script = self.generate_engaging_script(prompt)
+            # Generate engaging script (unless already chosen by the caller)
+            progress('script', 0)
+            if script is None:
+                script = self.generate_engaging_script(prompt)
+            progress('script', 1)
             
             # Create background video
-            bg_video = self.generate_background_video(prompt, style)
+            bg_video = self.generate_background_video(prompt, style, progress)
             
             # Create text overlays with timing
-            text_clips = []
+            progress('text', 0)
+            text_layers = []
             
             # Title text (0-5 seconds)
-            title_clip = self.create_text_clip(
+            title_layer = self.create_text_layer(
                 script, 
+                start=0,
                 duration=5, 
                 position=('center', 200),
                 fontsize=45
             )
-            text_clips.append(title_clip)
+            text_layers.append(title_layer)
             
             # Main content text (5-25 seconds)
             content_parts = [
@@ -154,31 +178,32 @@ class AIVideoGenerator:
             
             for i, content in enumerate(content_parts):
                 start_time = 5 + i * 7
-                content_clip = self.create_text_clip(
+                content_layer = self.create_text_layer(
                     content,
+                    start=start_time,
                     duration=6,
                     position=('center', 400),
                     fontsize=35
-                ).set_start(start_time)
-                text_clips.append(content_clip)
+                )
+                text_layers.append(content_layer)
             
             # Call-to-action (25-30 seconds)
-            cta_clip = self.create_text_clip(
+            cta_layer = self.create_text_layer(
                 "FOLLOW for more tips! 👆",
+                start=25,
                 duration=5,
                 position=('center', 600),
                 fontsize=40
-            ).set_start(25)
-            text_clips.append(cta_clip)
+            )
+            text_layers.append(cta_layer)
+            progress('text', 1)
             
             # Add engagement elements
             bg_video_enhanced = self.add_engagement_elements(bg_video)
             
-            # Combine all elements
-            final_video = CompositeVideoClip([bg_video_enhanced] + text_clips)
-            
-            # Ensure 720p resolution
-            final_video = final_video.resize((720, 720))
+            # Combine all elements in one pass at 720p, without a final resize
+            compositor = TimelineCompositor(bg_video_enhanced.get_frame, text_layers, 30, (720, 720))
+            final_video = compositor.as_clip()
             
             return final_video, script
             
@@ -186,7 +211,71 @@ class AIVideoGenerator:
             st.error(f"Error creating video: {str(e)}")
             return None, None
 
+# Stateless, so one instance serves every job in a worker process
+GENERATOR = AIVideoGenerator()
+
+def render_job(params, progress, preview=None):
+    """Job queue handler: render and encode a short in a worker process"""
+    from audio import get_audio_pipeline
+    from encoder import encode_clip
+    from preview import render_preview
+    from render_cache import encode_thumbnail, get_render_cache, render_key
+    
+    progress = RenderProgress(progress)
+    generator = GENERATOR
+    style = params.get('style', 'viral')
+    profile = get_profile(params.get('profile'))
+    seed = resolve_seed(params.get('seed'))
+    script = generator.generate_engaging_script(params['prompt'], random.Random(seed))
+    
+    # The video only depends on the chosen script line and the style
+    cache = get_render_cache()
+    audio_pipeline = get_audio_pipeline() if params.get('music') else None
+    key = render_key({'script': script}, {'renderer': 'app', 'style': style, 'fps': 30,
+                                          'audio': audio_pipeline.render_tag if audio_pipeline else None,
+                                          'encoding': profile._asdict()})
+    cached = cache.get(key)
+    if cached is not None:
+        progress('cached', 1)
+        return cached.video, dict(cached.metadata, seed=seed, cache_hit=True)
+    
+    video, script = generator.create_shorts_video(params['prompt'], style, progress, script)
+    if not video:
+        raise RuntimeError("Failed to generate video")
+    if preview is not None:
+        preview(render_preview(video.get_frame, video.duration))
+    mix = None
+    if audio_pipeline:
+        # Music bed plus narration, muxed by ffmpeg in the same pass as the video
+        progress('audio', 0)
+        mix = audio_pipeline.mix_tagged(generator.narration_cues(script), 30, 'upbeat')
+        progress('audio', 1)
+    video_bytes = encode_clip(video, fps=30, progress=progress, audio=mix.path if mix else None, profile=profile)
+    metadata = {'script': script, 'seed': seed}
+    # Narration that fell back to music only is not cached under the narrated key
+    if mix is None or mix.tag == audio_pipeline.render_tag:
+        cache.put(key, video_bytes, encode_thumbnail(video.get_frame(2.0)), metadata)
+    return video_bytes, dict(metadata, cache_hit=False)
+
+def show_result(job, video_bytes):
+    """Finished render: the script, the player and a download button"""
+    st.success("✅ Video generated successfully!")
+    show_render_stats(job['metadata'])
+    
+    # Display generated script
+    st.subheader("📜 Generated Script")
+    st.info(job['metadata']['script'])
+    
+    # Display video
+    st.subheader("🎬 Your Generated Short")
+    st.video(video_bytes, format="video/mp4")
+    
+    # Download button
+    download_video(video_bytes, "📥 Download Video", use_container_width=True)
+
 def main():
+    setup_page()
+    
     # Header
     st.markdown('<h1 class="main-header">🎬 AI Shorts Generator</h1>', unsafe_allow_html=True)
     st.markdown('<p style="text-align: center; font-size: 1.2rem; color: #666;">Create engaging 720p short videos in 30 seconds with AI</p>', unsafe_allow_html=True)
@@ -211,6 +300,23 @@ def main():
         add_music = st.checkbox("Add Background Music", value=True)
         add_effects = st.checkbox("Add Visual Effects", value=True)
         
+        # Encoder speed / file size trade-off (see profiles.py)
+        profiles = sorted(ENCODING_PROFILES)
+        quality = st.selectbox("Encoding Profile", profiles, index=profiles.index(DEFAULT_PROFILE),
+                               help="preview encodes fastest, archive gives the best quality per byte")
+        
+        # Same prompt + seed always renders the same video
+        seed = st.number_input("Seed", min_value=0, value=0, step=1,
+                               help="Change the seed to get a different variation of the same prompt")
+        
+        # Render cache effectiveness across all workers
+        cache_stats = get_engine().cache_stats()
+        st.caption(f"⚡ Render cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+        first_pixel = get_engine().first_pixel_stats()
+        if first_pixel['jobs']:
+            st.caption(f"👀 Time to first pixel: {first_pixel['median']:.1f}s median, "
+                       f"{first_pixel['p95']:.1f}s p95")
+        
     # Main content
     col1, col2 = st.columns([2, 1])
     
@@ -242,62 +348,24 @@ def main():
         # Generate button
         if st.button("🚀 Generate Short Video", type="primary", use_container_width=True):
             if prompt:
-                with st.spinner("🎬 Creating your viral short... This may take a few moments!"):
-                    generator = AIVideoGenerator()
-                    
-                    # Progress bar
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    
-                    # Simulate progress
-                    for i in range(100):
-                        time.sleep(0.1)
-                        progress_bar.progress(i + 1)
-                        if i < 20:
-                            status_text.text("🤖 AI analyzing your prompt...")
-                        elif i < 50:
-                            status_text.text("🎨 Generating visual content...")
-                        elif i < 80:
-                            status_text.text("✨ Adding engagement elements...")
-                        else:
-                            status_text.text("🎬 Finalizing your short...")
-                    
-                    # Generate video
-                    video, script = generator.create_shorts_video(prompt, style.lower())
-                    
-                    if video:
-                        st.success("✅ Video generated successfully!")
-                        
-                        # Display generated script
-                        st.subheader("📜 Generated Script")
-                        st.info(script)
-                        
-                        # Save video to temporary file
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_file:
-                            video_path = tmp_file.name
-                            video.write_videofile(video_path, fps=30, audio=False, verbose=False, logger=None)
-                        
-                        # Display video
-                        st.subheader("🎬 Your Generated Short")
-                        st.video(video_path)
-                        
-                        # Download button
-                        with open(video_path, "rb") as video_file:
-                            st.download_button(
-                                label="📥 Download Video",
-                                data=video_file.read(),
-                                file_name=f"short_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4",
-                                mime="video/mp4",
-                                use_container_width=True
-                            )
-                        
-                        # Clean up
-                        os.unlink(video_path)
-                        
-                    else:
-                        st.error("❌ Failed to generate video. Please try again.")
+                # Queue the render; a worker process picks it up and reports
+                # its real progress, which show_job polls below
+                try:
+                    st.session_state.job_id = get_engine().submit('app', {
+                        'prompt': prompt,
+                        'style': style.lower(),
+                        'seed': int(seed),
+                        'music': add_music,
+                        'profile': quality
+                    })
+                except QueueFullError:
+                    st.error("🚦 Too many videos in the queue right now. Please try again in a minute.")
             else:
                 st.warning("⚠️ Please enter a prompt to generate your video.")
+        
+        # Status, preview and download of the current render
+        if 'job_id' in st.session_state:
+            show_job(st.session_state.job_id, show_result)
     
     with col2:
         st.header("📊 Features")
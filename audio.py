@@ -0,0 +1,329 @@
+import glob
+import hashlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import wave
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import cache_path
+from encoder import ffmpeg_binary
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 44100
+# Bump when mixing or synthesis changes, so stale mixes are not reused
+AUDIO_VERSION = 1
+
+AUDIO_EXTENSIONS = ('wav', 'mp3', 'ogg', 'flac', 'm4a')
+MUSIC_DIR = os.getenv('AI_SHORTS_MUSIC_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'music'))
+
+# Music type for each script category
+CATEGORY_MUSIC = {
+    'finance': 'corporate',
+    'tech': 'electronic',
+    'lifestyle': 'chill',
+    'motivation': 'epic',
+}
+
+# Procedural fallback stems: tempo and chord roots (Hz) per music type
+SYNTH_STYLES = {
+    'upbeat': (124, [261.63, 392.00, 440.00, 349.23]),
+    'corporate': (110, [293.66, 246.94, 196.00, 220.00]),
+    'electronic': (128, [220.00, 174.61, 261.63, 196.00]),
+    'chill': (90, [174.61, 220.00, 164.81, 196.00]),
+    'epic': (100, [146.83, 116.54, 174.61, 130.81]),
+}
+
+# Seconds a TTS engine may take per phrase before the mix falls back to music only,
+# so a stalled network call cannot hang a render worker
+TTS_TIMEOUT = float(os.getenv('AI_SHORTS_TTS_TIMEOUT', '15'))
+
+# (start, duration, text) narration cue
+Cue = Tuple[float, float, str]
+
+
+class Mix(NamedTuple):
+    """A mixed WAV and what it contains: the TTS engine that narrated it, or 'music'"""
+    path: str
+    tag: str
+
+
+def decode_audio(source, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode a file path or encoded bytes to mono float32 samples with ffmpeg"""
+    data = None
+    if isinstance(source, (bytes, bytearray)):
+        data, source = bytes(source), 'pipe:0'
+    command = [ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-i', source,
+               '-f', 'f32le', '-ac', '1', '-ar', str(sample_rate), 'pipe:1']
+    result = subprocess.run(command, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', 'replace').strip()
+        raise RuntimeError(f"ffmpeg could not decode audio: {message}")
+    return np.frombuffer(result.stdout, dtype=np.float32).copy()
+
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int = SAMPLE_RATE):
+    """Write mono float samples as 16-bit PCM WAV"""
+    pcm = (np.clip(samples, -1, 1) * 32767).astype('<i2')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with wave.open(tmp_path, 'wb') as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(sample_rate)
+        handle.writeframes(pcm.tobytes())
+    os.replace(tmp_path, path)
+
+
+def tts_standin(text: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Offline stand-in voice for tests: one harmonic, enveloped tone per syllable"""
+    seed = int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:8], 16)
+    rng = np.random.default_rng(seed)
+    syllable = int(0.16 * sample_rate)
+    t = np.arange(syllable) / sample_rate
+    envelope = np.sin(np.pi * np.arange(syllable) / syllable) ** 2
+    gap = np.zeros(int(0.07 * sample_rate), dtype=np.float32)
+
+    pieces = []
+    for word in text.split():
+        for _ in range(max(1, len(re.findall(r'[aeiouy]+', word.lower())))):
+            pitch = 110 + 50 * rng.random()
+            tone = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 5))
+            pieces.append((0.3 * tone * envelope).astype(np.float32))
+        pieces.append(gap)
+    return np.concatenate(pieces) if pieces else gap
+
+
+def tts_espeak(text: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Speech from a local espeak / espeak-ng binary"""
+    binary = shutil.which('espeak-ng') or shutil.which('espeak')
+    if binary is None:
+        raise RuntimeError("espeak is not installed")
+    result = subprocess.run([binary, '-v', 'en-us', '-s', '175', '--stdout', text],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, timeout=TTS_TIMEOUT)
+    return decode_audio(result.stdout, sample_rate)
+
+
+def tts_gtts(text: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Speech from Google Translate's TTS endpoint (needs gTTS and network access)"""
+    from gtts import gTTS
+
+    buffer = io.BytesIO()
+    gTTS(text, lang='en', timeout=TTS_TIMEOUT).write_to_fp(buffer)
+    return decode_audio(buffer.getvalue(), sample_rate)
+
+
+TTS_ENGINES = {
+    'standin': tts_standin,
+    'espeak': tts_espeak,
+    'gtts': tts_gtts,
+}
+
+
+# Real speech engines, in order of preference: offline first, since gTTS
+# availability only means the package imports, not that Google is reachable.
+# The stand-in is never picked by default
+DEFAULT_TTS_ENGINES = ('espeak', 'gtts')
+
+
+def tts_available(engine: str) -> bool:
+    if engine == 'gtts':
+        return importlib.util.find_spec('gtts') is not None
+    if engine == 'espeak':
+        return bool(shutil.which('espeak-ng') or shutil.which('espeak'))
+    return engine in TTS_ENGINES
+
+
+def default_tts() -> Optional[str]:
+    """TTS engine from AI_SHORTS_TTS ('standin' in tests), else espeak or gTTS when
+    available, else None: mixes then carry the music bed only"""
+    engine = os.getenv('AI_SHORTS_TTS')
+    if engine:
+        return engine
+    return next((engine for engine in DEFAULT_TTS_ENGINES if tts_available(engine)), None)
+
+
+def synthesize_stem(music_type: str, duration: float, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Procedural backing loop (pad chords plus a kick) used when no local stem exists"""
+    bpm, roots = SYNTH_STYLES.get(music_type, SYNTH_STYLES['upbeat'])
+    beat = int(sample_rate * 60 / bpm)
+    bar = 4 * beat
+    t = np.arange(bar) / sample_rate
+
+    # Pad: root, fifth and octave of each chord, faded in and out per bar
+    bar_envelope = np.minimum(1, np.minimum(t, t[::-1]) * 8)
+    bars = []
+    for root in roots:
+        chord = sum(np.sin(2 * np.pi * root * ratio * t) for ratio in (1, 1.5, 2)) / 3
+        bars.append(0.5 * chord * bar_envelope)
+    loop = np.concatenate(bars)
+
+    # Kick on every beat: a fast pitch drop with exponential decay
+    kick_t = np.arange(int(0.15 * sample_rate)) / sample_rate
+    kick = np.sin(2 * np.pi * (60 + 90 * np.exp(-kick_t * 30)) * kick_t) * np.exp(-kick_t * 25)
+    for start in range(0, len(loop), beat):
+        end = min(start + len(kick), len(loop))
+        loop[start:end] += 0.6 * kick[:end - start]
+
+    total = int(duration * sample_rate)
+    return np.resize(loop, total).astype(np.float32)
+
+
+class AudioPipeline:
+    """Music stems + TTS narration mixed into one WAV per script.
+
+    Decoded/resampled stems, synthesized phrases and finished mixes are
+    all stored under ``directory`` keyed by content hash, so each is
+    produced once and reused by later renders and other processes.  The
+    mix is a file ffmpeg can take as a second input, letting the encoder
+    mux it in the same pass as the video.  Without a TTS engine (``tts`` is
+    None), or when the engine fails or times out (TTS_TIMEOUT), mixes are
+    music only.
+    """
+
+    def __init__(self, directory: Optional[str] = None, tts: Optional[str] = None,
+                 sample_rate: int = SAMPLE_RATE, music_dir: str = MUSIC_DIR):
+        self.directory = directory or cache_path('audio')
+        self.tts = tts or default_tts()
+        self.sample_rate = sample_rate
+        self.music_dir = music_dir
+        for subdirectory in ('stems', 'phrases', 'mixes'):
+            os.makedirs(os.path.join(self.directory, subdirectory), exist_ok=True)
+
+    @property
+    def render_tag(self) -> str:
+        """What narrated mixes contain, for render cache keys: the TTS engine, or 'music' without one.
+
+        A mix whose narration failed is music only; see mix_tagged.
+        """
+        return self.tts or 'music'
+
+    @staticmethod
+    def _hash(*parts) -> str:
+        return hashlib.sha256(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+
+    def _cached_samples(self, kind: str, key: str, build) -> np.ndarray:
+        path = os.path.join(self.directory, kind, f'{key}.npy')
+        try:
+            return np.load(path)
+        except (OSError, ValueError):
+            pass
+        samples = np.asarray(build(), dtype=np.float32)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as handle:
+            np.save(handle, samples)
+        os.replace(tmp_path, path)
+        return samples
+
+    def stem_files(self, music_type: str) -> List[str]:
+        """Local stems for a music type: music_dir/<type>/* or music_dir/<type>*.<ext>"""
+        files = []
+        for extension in AUDIO_EXTENSIONS:
+            files += glob.glob(os.path.join(self.music_dir, music_type, f'*.{extension}'))
+            files += glob.glob(os.path.join(self.music_dir, f'{music_type}*.{extension}'))
+        return sorted(set(files))
+
+    def stem(self, music_type: str, duration: float) -> Tuple[str, np.ndarray]:
+        """(content key, samples) of the music bed, looped to `duration`"""
+        files = self.stem_files(music_type)
+        if not files:
+            key = self._hash('synth', music_type, duration, self.sample_rate, AUDIO_VERSION)
+            return key, self._cached_samples(
+                'stems', key, lambda: synthesize_stem(music_type, duration, self.sample_rate))
+
+        # Stems of one type are summed; each decoded file is cached by its bytes
+        total = int(duration * self.sample_rate)
+        mix = np.zeros(total, dtype=np.float32)
+        keys = []
+        for path in files:
+            with open(path, 'rb') as handle:
+                key = self._hash('file', hashlib.sha256(handle.read()).hexdigest(), self.sample_rate)
+            keys.append(key)
+            samples = self._cached_samples('stems', key, lambda: decode_audio(path, self.sample_rate))
+            if len(samples):
+                mix += np.resize(samples, total)
+        return self._hash(keys, duration), mix
+
+    def phrase(self, text: str) -> Tuple[str, np.ndarray]:
+        """(content key, samples) of `text` spoken by the configured TTS engine"""
+        key = self._hash('tts', self.tts, text, self.sample_rate, AUDIO_VERSION)
+        return key, self._cached_samples('phrases', key, lambda: TTS_ENGINES[self.tts](text, self.sample_rate))
+
+    def mix(self, cues: Sequence[Cue], duration: float, music_type: Optional[str] = 'upbeat',
+            narration: bool = True, music_gain: float = 0.35, duck_gain: float = 0.12,
+            voice_gain: float = 0.9) -> str:
+        """Path of a WAV with the music bed (ducked under speech) and narration cues"""
+        return self.mix_tagged(cues, duration, music_type, narration, music_gain, duck_gain, voice_gain).path
+
+    def mix_tagged(self, cues: Sequence[Cue], duration: float, music_type: Optional[str] = 'upbeat',
+                   narration: bool = True, music_gain: float = 0.35, duck_gain: float = 0.12,
+                   voice_gain: float = 0.9) -> Mix:
+        """Like mix, with the tag of what was actually mixed: 'music' when narration fell back"""
+        narration = narration and self.tts is not None and bool(cues)
+        stems = [(path, os.path.getmtime(path), os.path.getsize(path))
+                 for path in (self.stem_files(music_type) if music_type else [])]
+        key = self._hash(AUDIO_VERSION, self.tts, list(cues) if narration else [], duration, music_type,
+                         music_gain, duck_gain, voice_gain, self.sample_rate, stems)
+        path = os.path.join(self.directory, 'mixes', f'{key}.wav')
+        tag = self.tts if narration else 'music'
+        if os.path.exists(path):
+            return Mix(path, tag)
+
+        total = int(duration * self.sample_rate)
+        voice = np.zeros(total, dtype=np.float32)
+        if narration:
+            try:
+                phrases = [self.phrase(text)[1] for _, _, text in cues]
+            except Exception:
+                # No voice beats a failed render; the 'music' tag keeps it out of narrated cache entries
+                logger.warning("TTS engine %r failed, mixing music only", self.tts, exc_info=True)
+                return self.mix_tagged(cues, duration, music_type, False, music_gain, duck_gain, voice_gain)
+            for (start, length, text), samples in zip(cues, phrases):
+                begin = int(start * self.sample_rate)
+                # Each line stops at the end of its cue, with a short fade out
+                end = min(begin + len(samples), begin + int(length * self.sample_rate), total)
+                segment = samples[:end - begin].copy()
+                fade = min(len(segment), int(0.05 * self.sample_rate))
+                if fade:
+                    segment[-fade:] *= np.linspace(1, 0, fade, dtype=np.float32)
+                voice[begin:end] += segment
+
+        mix = voice_gain * voice
+        if music_type:
+            _, music = self.stem(music_type, duration)
+            # Duck the music wherever narration is playing (smoothed over 50 ms)
+            active = (np.abs(voice) > 1e-3).astype(np.float32)
+            window = max(1, int(0.05 * self.sample_rate))
+            active = np.minimum(np.convolve(active, np.ones(window, dtype=np.float32), 'same'), 1)
+            gain = music_gain - (music_gain - duck_gain) * active
+            mix = mix + music[:total] * gain
+
+        # Peak-normalize and fade the tail so the loop point is not audible
+        peak = np.max(np.abs(mix)) if len(mix) else 0
+        if peak > 0.98:
+            mix *= 0.98 / peak
+        tail = min(total, self.sample_rate)
+        mix[total - tail:] *= np.linspace(1, 0, tail, dtype=np.float32)
+        write_wav(path, mix, self.sample_rate)
+        return Mix(path, tag)
+
+
+_default_pipeline = None
+_default_pipeline_lock = threading.Lock()
+
+
+def get_audio_pipeline() -> AudioPipeline:
+    """Process-wide audio pipeline stored under the shared cache directory"""
+    global _default_pipeline
+    with _default_pipeline_lock:
+        if _default_pipeline is None:
+            _default_pipeline = AudioPipeline()
+        return _default_pipeline
@@ -0,0 +1,326 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from noise import get_noise_bank
+from progress import ProgressCallback, RenderProgress
+from seeding import resolve_seed
+
+# Category color schemes shared by the animated backgrounds
+COLOR_SCHEMES: Dict[str, List[Tuple[int, int, int]]] = {
+    'finance': [(34, 139, 34), (0, 100, 0), (50, 205, 50)],  # Green money theme
+    'tech': [(0, 191, 255), (138, 43, 226), (75, 0, 130)],   # Blue/purple tech theme
+    'lifestyle': [(255, 182, 193), (255, 160, 122), (255, 105, 180)], # Warm lifestyle
+    'motivation': [(255, 69, 0), (255, 140, 0), (255, 215, 0)]  # Orange/gold energy
+}
+
+# Wave pattern constants: sin((x + y + t * WAVE_SPEED) * WAVE_FREQUENCY)
+WAVE_SPEED = 50
+WAVE_FREQUENCY = 0.02
+WAVE_AMPLITUDE = 0.3
+WAVE_OFFSET = 0.7
+NOISE_LEVEL = 10
+
+# Frames searched on either side of the analytic period for a seamless loop
+LOOP_SEARCH = 2
+
+
+@lru_cache(maxsize=16)
+def diagonal_phase_table(width: int, height: int) -> np.ndarray:
+    """Phase of the wave along the x + y diagonal, computed once per size"""
+    table = np.arange(width + height - 1, dtype=np.float32) * WAVE_FREQUENCY
+    table.setflags(write=False)
+    return table
+
+
+class DynamicBackground:
+    """Animated category gradient with a moving diagonal wave and noise texture.
+
+    The wave only depends on ``x + y``, so each frame is computed as one
+    row of ``width + height - 1`` colors and expanded to the full frame
+    through a zero-copy sliding window.  Frames are written into buffers
+    owned by the instance; the returned array is only valid until the next
+    call to ``make_frame``.
+    """
+
+    def __init__(self, category: str, duration: float = 30, size: Tuple[int, int] = (720, 720),
+                 seed: Optional[int] = None):
+        self.category = category
+        self.duration = duration
+        self.size = size
+        self.colors = np.array(COLOR_SCHEMES.get(category, COLOR_SCHEMES['lifestyle']), dtype=np.float32)
+        self.seed = resolve_seed(seed)
+        self._noise = get_noise_bank(size, NOISE_LEVEL)
+
+        width, height = size
+        self._phase = diagonal_phase_table(width, height)
+        self._wave = np.empty(self._phase.shape, dtype=np.float32)
+        self._profile = np.empty((self._phase.size, 3), dtype=np.uint8)
+        self._work = np.empty((height, width, 3), dtype=np.int16)
+        self._frame = np.empty((height, width, 3), dtype=np.uint8)
+
+    def base_color(self, t: float) -> np.ndarray:
+        """Blend between the scheme colors for time t"""
+        count = len(self.colors)
+        progress = (t / self.duration) % 1
+        color_index = int((progress * count) % count)
+        next_color_index = (color_index + 1) % count
+        blend_ratio = (progress * count) % 1
+        return self.colors[color_index] * (1 - blend_ratio) + self.colors[next_color_index] * blend_ratio
+
+    def make_profile(self, t: float, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Colors along the x + y diagonal for time t, as uint8 (L, 3)"""
+        if out is None:
+            out = self._profile
+        wave = self._wave
+        np.add(self._phase, np.float32(t * WAVE_SPEED * WAVE_FREQUENCY), out=wave)
+        np.sin(wave, out=wave)
+        wave *= WAVE_AMPLITUDE
+        wave += WAVE_OFFSET
+        np.multiply(wave[:, None], self.base_color(t)[None, :], out=out, casting='unsafe')
+        return out
+
+    def expand_profile(self, profile: np.ndarray, t: float = 0) -> np.ndarray:
+        """Expand a diagonal profile to a full frame and add the noise texture for time t"""
+        width, height = self.size
+        # Row y of the frame is profile[y:y + width]
+        rows = np.lib.stride_tricks.as_strided(
+            profile,
+            shape=(height, width, 3),
+            strides=(profile.strides[0], profile.strides[0], profile.strides[1]),
+            writeable=False,
+        )
+        # A window into the shared texture bank, keyed on (seed, millisecond)
+        # so any process renders the same frame
+        noise = self._noise.noise(self.seed, int(round(t * 1000)))
+        # Per-channel adds avoid a slow broadcast over the 3-wide inner axis
+        for channel in range(3):
+            np.add(rows[:, :, channel], noise, out=self._work[:, :, channel])
+        np.clip(self._work, 0, 255, out=self._work)
+        np.copyto(self._frame, self._work, casting='unsafe')
+        return self._frame
+
+    def make_frame(self, t: float) -> np.ndarray:
+        """Render the frame at time t"""
+        return self.expand_profile(self.make_profile(t), t)
+
+    # Periodic source interface used by BackgroundCache
+    @property
+    def cache_key(self) -> Tuple:
+        return ('dynamic', self.category, self.size, self.duration)
+
+    @property
+    def period(self) -> float:
+        # The color cycle spans the whole clip, so one period is one clip
+        return self.duration
+
+    def render_entry(self, t: float) -> np.ndarray:
+        return self.make_profile(t, out=np.empty_like(self._profile))
+
+    def expand(self, entry: np.ndarray, t: float = 0) -> np.ndarray:
+        return self.expand_profile(entry, t)
+
+
+class PulseBackground:
+    """Solid color that swings between two colors: ratio = (sin(t * speed) + 1) / 2"""
+
+    def __init__(self, colors: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
+                 size: Tuple[int, int] = (720, 720), speed: float = 0.5):
+        self.colors = tuple(tuple(int(c) for c in color) for color in colors)
+        self.size = size
+        self.speed = speed
+        width, height = size
+        self._row = np.empty((width, 3), dtype=np.uint8)
+        self._frame = np.empty((height, width, 3), dtype=np.uint8)
+        self._color = None
+
+    @property
+    def cache_key(self) -> Tuple:
+        return ('pulse', self.colors, self.size, self.speed)
+
+    @property
+    def period(self) -> float:
+        return 2 * np.pi / self.speed
+
+    def render_entry(self, t: float) -> np.ndarray:
+        color1, color2 = np.array(self.colors, dtype=np.float64)
+        ratio = (np.sin(t * self.speed) + 1) / 2
+        return (color1 * (1 - ratio) + color2 * ratio).astype(np.uint8)
+
+    def static_key(self, entry: np.ndarray) -> bytes:
+        """Frames with equal entries are identical (there is no per-frame noise)"""
+        return entry.tobytes()
+
+    def expand(self, entry: np.ndarray, t: float = 0) -> np.ndarray:
+        if self._color is None or not np.array_equal(self._color, entry):
+            # Broadcasting a whole row is much faster than a 3-wide color
+            self._row[:] = entry
+            self._frame[:] = self._row
+            self._color = np.array(entry)
+        return self._frame
+
+    def make_frame(self, t: float) -> np.ndarray:
+        return self.expand(self.render_entry(t))
+
+
+def detect_loop(entries: np.ndarray, tolerance: int = 1, lags: Optional[range] = None) -> Optional[int]:
+    """Smallest lag (in frames) after which `entries` repeat, or None if they never do"""
+    count = len(entries)
+    signed = entries.astype(np.int16)
+    for lag in lags if lags is not None else range(1, count):
+        if 0 < lag < count and np.abs(signed[lag:] - signed[:count - lag]).max() <= tolerance:
+            return lag
+    return None
+
+
+class CachedBackground:
+    """Frame source that serves a background from one precomputed period"""
+
+    def __init__(self, source, entries: np.ndarray, fps: float):
+        self.source = source
+        self.entries = entries
+        self.fps = fps
+
+    @property
+    def period_frames(self) -> int:
+        return len(self.entries)
+
+    def make_frame(self, t: float) -> np.ndarray:
+        index = int(round(t * self.fps)) % len(self.entries)
+        return self.source.expand(self.entries[index], t)
+
+    def frame_key(self, t: float) -> Optional[bytes]:
+        """Key equal for identical frames, or None when every frame may differ
+        (sources without ``static_key``, e.g. noisy ones)"""
+        static_key = getattr(self.source, 'static_key', None)
+        if static_key is None:
+            return None
+        return static_key(self.entries[int(round(t * self.fps)) % len(self.entries)])
+
+
+class BackgroundCache:
+    """Bounded LRU of per-frame background entries, one period per key.
+
+    Sources describe a periodic background through ``cache_key``,
+    ``period`` (seconds), ``render_entry(t)`` and ``expand(entry, t)``.  The
+    first request for a (source, fps) pair renders one period of entries;
+    later requests index into it.  With a ``directory`` the periods are
+    stored as ``.npy`` files and memory-mapped, so they survive restarts
+    and are shared between processes.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, directory: Optional[str] = None,
+                 seam_tolerance: int = 1):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.seam_tolerance = seam_tolerance
+        self._entries: 'OrderedDict[Hashable, np.ndarray]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, source, fps: float = 30, progress: Optional[ProgressCallback] = None) -> CachedBackground:
+        """Return a frame source for `source` at `fps`, rendering a period on first use"""
+        progress = RenderProgress.wrap(progress)
+        key = source.cache_key + (fps,)
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                progress('background', 1)
+                return CachedBackground(source, entries, fps)
+            self.misses += 1
+
+        entries = self._load(key)
+        if entries is None:
+            entries = self.render_period(source, fps, progress)
+            entries = self._store(key, entries)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entries
+                self._bytes += entries.nbytes
+                self._evict()
+        progress('background', 1)
+        return CachedBackground(source, entries, fps)
+
+    def render_period(self, source, fps: float, progress: Optional[ProgressCallback] = None) -> np.ndarray:
+        """Render one loop of entries, snapping the loop point to a seamless frame"""
+        progress = RenderProgress.wrap(progress)
+        frames = max(1, int(round(source.period * fps)))
+        total = frames + LOOP_SEARCH
+        rendered = []
+        for i in range(total):
+            rendered.append(source.render_entry(i / fps))
+            progress('background', i + 1, total)
+        entries = np.stack(rendered)
+        # The analytic period rarely lands exactly on a frame boundary, so
+        # look for the nearby lag where the loop closes within tolerance.
+        loop = detect_loop(entries, self.seam_tolerance,
+                           range(max(1, frames - LOOP_SEARCH), frames + LOOP_SEARCH))
+        return entries[:loop or frames]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _path(self, key: Hashable) -> str:
+        name = '_'.join(str(part) for part in key)
+        safe = ''.join(c if c.isalnum() or c in '-.' else '_' for c in name)
+        return os.path.join(self.directory, f"{safe}.npy")
+
+    def _load(self, key: Hashable) -> Optional[np.ndarray]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key: Hashable, entries: np.ndarray) -> np.ndarray:
+        if not self.directory:
+            return entries
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as handle:
+            np.save(handle, entries)
+        os.replace(tmp_path, path)
+        return np.load(path, mmap_mode='r')
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, entries = self._entries.popitem(last=False)
+            self._bytes -= entries.nbytes
+            if self.directory:
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_background_cache() -> BackgroundCache:
+    """Process-wide background cache, capped at AI_SHORTS_BACKGROUND_CACHE_MB
+    (set AI_SHORTS_BACKGROUND_CACHE_DIR to memory-map it from disk)"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            max_mb = float(os.getenv('AI_SHORTS_BACKGROUND_CACHE_MB', '256'))
+            _default_cache = BackgroundCache(max_bytes=int(max_mb * 1024 * 1024),
+                                             directory=os.getenv('AI_SHORTS_BACKGROUND_CACHE_DIR') or None)
+        return _default_cache
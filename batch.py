@@ -0,0 +1,101 @@
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+from backgrounds import BackgroundCache
+from config import cache_path
+
+# Engine owned by each worker process, reused by every job it runs
+_engine = None
+
+
+def _init_worker():
+    global _engine
+    from ai_generator import AIVideoEngine
+
+    # Backgrounds are memory-mapped from disk so every worker shares one
+    # copy; text rasters already live in the shared on-disk cache.
+    _engine = AIVideoEngine(background_cache=BackgroundCache(directory=cache_path('backgrounds')))
+
+
+def slugify(text: str, max_length: int = 40) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+    return slug[:max_length].rstrip('-') or 'short'
+
+
+def render_job(index: int, prompt: str, platforms: Sequence[str], output_dir: str, fps: int = 30,
+               seed: Optional[int] = None, audio: bool = True, profile: Optional[str] = None) -> Dict:
+    """Worker: render one prompt and fan it out to every platform"""
+    if _engine is None:
+        _init_worker()
+    started = time.perf_counter()
+    script_data = _engine.generate_viral_script(prompt, seed=seed)
+
+    # All platforms come from one composition pass; each render is
+    # content-addressed, so repeated prompts that resolve to the same
+    # script are copied from the render cache
+    renders = _engine.render_platforms(script_data, platforms, fps=fps, audio=audio, profile=profile)
+    outputs, platform_metadata = {}, {}
+    for platform, render in renders.items():
+        path = os.path.join(output_dir, f"{index:04d}_{slugify(prompt)}_{platform}.mp4")
+        with open(path, 'wb') as handle:
+            handle.write(render.video)
+        outputs[platform] = path
+        # Size, length, encoding and cache hit come from the render itself
+        platform_metadata[platform] = {key: value for key, value in render.metadata.items() if key != 'script'}
+
+    metadata = {'script': script_data, 'category': script_data['category'], 'seed': script_data.get('seed'),
+                'engagement_score': script_data['estimated_engagement'], 'platforms': platform_metadata,
+                'outputs': outputs}
+    metadata_path = os.path.join(output_dir, f"{index:04d}_{slugify(prompt)}.json")
+    with open(metadata_path, 'w') as handle:
+        json.dump(metadata, handle, indent=2, default=str)
+
+    return {
+        'index': index,
+        'prompt': prompt,
+        'paths': outputs,
+        'metadata_path': metadata_path,
+        'metadata': metadata,
+        'render_seconds': time.perf_counter() - started,
+    }
+
+
+def generate_batch(prompts: Iterable[str], platforms: Sequence[str] = ('instagram',),
+                   output_dir: str = 'shorts', workers: Optional[int] = None,
+                   fps: int = 30, seed: Optional[int] = None, audio: bool = True,
+                   profile: Optional[str] = None) -> Iterator[Dict]:
+    """Render many prompts on a process pool, yielding results as they finish.
+
+    Each result carries the output paths, the render metadata and the
+    running batch throughput in videos per minute.  A prompt that fails
+    yields a result with an ``error`` instead, and the batch carries on.
+    With a `seed`, prompt i is rendered with ``seed + i`` so the whole
+    batch is reproducible.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    prompts = list(prompts)
+    started = time.perf_counter()
+    completed = succeeded = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(render_job, i, prompt, list(platforms), output_dir, fps,
+                               None if seed is None else seed + i, audio, profile): (i, prompt)
+                   for i, prompt in enumerate(prompts)}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+                succeeded += 1
+            except Exception as e:
+                index, prompt = futures[future]
+                result = {'index': index, 'prompt': prompt, 'error': f"{type(e).__name__}: {e}"}
+            completed += 1
+            elapsed = time.perf_counter() - started
+            result.update(
+                completed=completed,
+                total=len(prompts),
+                videos_per_minute=succeeded * len(platforms) / elapsed * 60,
+            )
+            yield result
@@ -0,0 +1,427 @@
+"""Benchmarks for the render hot paths and the whole pipeline.
+
+Usage:
+    python benchmark.py backgrounds [--frames 90] [--size 720x720]
+    python benchmark.py noise [--frames 90] [--size 720x720]
+    python benchmark.py imports [--repeat 5]
+    python benchmark.py encode [--frames 90] [--size 720x720] [--profiles preview publish archive]
+    python benchmark.py pipeline [--sizes 720x720 720x1280] [--durations 2 5] [--seed 1] [--runs 3]
+
+Every suite runs offline on the CPU with fixed seeds.  ``--output`` writes
+the results as JSON.  A run is compared against a baseline results file:
+``--baseline``, else the suite's checked-in ``benchmarks/<suite>.json``
+when it exists.  Any timing that got worse than the baseline by more than
+``--tolerance``, or that the run no longer produces, is reported and fails
+the run (exit status 1).  CI runs the pipeline suite with its defaults,
+keeping the median of three runs against machine noise:
+
+    python benchmark.py pipeline --runs 3
+
+Baselines are machine-specific, so each records the machine it ran on
+(Python, platform and CPU count).  A checked-in baseline from another
+machine is skipped with a warning; an explicit ``--baseline`` from another
+machine fails the run unless ``--any-machine`` is given.  After an
+intended change in speed, or on a new CI machine, record a new one from
+that machine and commit it:
+
+    python benchmark.py pipeline --runs 3 --no-baseline --output benchmarks/pipeline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backgrounds import COLOR_SCHEMES, NOISE_LEVEL, BackgroundCache, DynamicBackground, PulseBackground
+from encoder import FFmpegEncoder
+from noise import NoiseBank
+from profiles import ENCODING_PROFILES
+
+
+def legacy_dynamic_frame(t: float, category: str = 'tech', duration: float = 30,
+                         size: Tuple[int, int] = (720, 720)) -> np.ndarray:
+    """Reference copy of the original per-frame background renderer"""
+    colors = COLOR_SCHEMES.get(category, COLOR_SCHEMES['lifestyle'])
+    progress = (t / duration) % 1
+    color_index = int((progress * len(colors)) % len(colors))
+    next_color_index = (color_index + 1) % len(colors)
+    blend_ratio = (progress * len(colors)) % 1
+    base_color = np.array(colors[color_index]) * (1 - blend_ratio) + np.array(colors[next_color_index]) * blend_ratio
+
+    width, height = size
+    y, x = np.ogrid[:height, :width]
+    wave = np.sin((x + y + t * 50) * 0.02) * 0.3 + 0.7
+    frame = np.zeros((height, width, 3))
+    for i in range(3):
+        frame[:, :, i] = base_color[i] * wave
+    noise = np.random.random((height, width, 1)) * 20 - 10
+    frame += noise
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def time_frames(make_frame: Callable[[float], np.ndarray], frames: int, fps: int = 30) -> float:
+    """Average milliseconds per frame over `frames` consecutive frames"""
+    make_frame(0)  # warm up
+    start = time.perf_counter()
+    for i in range(frames):
+        make_frame(i / fps)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def median_ms(function: Callable[[], object], repeat: int = 5) -> float:
+    """Median wall time of `function()` in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def bench_backgrounds(frames: int = 90, size: Tuple[int, int] = (720, 720), seed: int = 1) -> Dict[str, float]:
+    """Compare the legacy and precomputed dynamic background renderers"""
+    background = DynamicBackground('tech', 30, size, seed=seed)
+    results = {
+        'legacy_ms_per_frame': time_frames(lambda t: legacy_dynamic_frame(t, 'tech', 30, size), frames),
+        'dynamic_ms_per_frame': time_frames(background.make_frame, frames),
+    }
+    results['speedup'] = results['legacy_ms_per_frame'] / results['dynamic_ms_per_frame']
+    return results
+
+
+def bench_noise(frames: int = 90, size: Tuple[int, int] = (720, 720)) -> Dict[str, float]:
+    """Compare per-frame full-frame RNG with windows into the noise texture bank"""
+    width, height = size
+    rng = np.random.default_rng(0)
+    bank = NoiseBank(size, NOISE_LEVEL)
+    results = {
+        'legacy_ms_per_frame': time_frames(lambda t: np.random.random((height, width, 1)) * 20 - 10, frames),
+        'rng_int16_ms_per_frame': time_frames(
+            lambda t: rng.integers(-NOISE_LEVEL, NOISE_LEVEL, size=(height, width), dtype=np.int16), frames),
+        'bank_ms_per_frame': time_frames(lambda t: bank.noise(0, int(round(t * 1000))), frames),
+        'bank_mb': bank.nbytes / 1024 ** 2,
+    }
+    results['speedup'] = results['legacy_ms_per_frame'] / results['bank_ms_per_frame']
+    return results
+
+
+# Modules on the cold-start path, and the heavy ones they should not pull in
+STARTUP_MODULES = ('scripts', 'ai_generator', 'jobs', 'app', 'simple_app')
+HEAVY_MODULES = ('numpy', 'PIL', 'moviepy')
+IMPORT_PROBE = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed * 1000, ','.join(heavy) or '-')
+'''
+
+
+def time_import(module: str, repeat: int = 5) -> Tuple[float, str]:
+    """Median cold import time (ms) of `module` in fresh interpreters, and the heavy modules it loaded"""
+    times, heavy = [], '-'
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True)
+        elapsed, heavy = result.stdout.split()
+        times.append(float(elapsed))
+    return statistics.median(times), heavy
+
+
+def bench_imports(modules: Sequence[str] = STARTUP_MODULES, repeat: int = 5) -> Dict[str, float]:
+    """Cold import time of the startup modules, against moviepy.editor as a reference"""
+    results = {}
+    for module in ('moviepy.editor',) + tuple(modules):
+        elapsed, heavy = time_import(module, repeat)
+        results[f'{module}_import_ms'] = elapsed
+        if module != 'moviepy.editor':
+            print(f"{module}: loads {heavy}")
+    return results
+
+
+def composed_frames(frames: int = 90, size: Tuple[int, int] = (720, 720), fps: int = 30,
+                    seed: int = 1) -> List[np.ndarray]:
+    """`frames` frames of a fixed-seed short, composed up front so only encoding is timed"""
+    from ai_generator import AIVideoEngine
+
+    engine = AIVideoEngine()
+    script = engine.generate_viral_script("How to make money with AI in 2024", seed=seed)
+    compositor = engine.build_compositor(script, size=size)
+    return [compositor.make_frame(i / fps).copy() for i in range(frames)]
+
+
+def bench_encode(frames: int = 90, size: Tuple[int, int] = (720, 720),
+                 profiles: Sequence[str] = tuple(ENCODING_PROFILES), fps: int = 30) -> Dict[str, float]:
+    """Encode speed and output size of each encoding profile on the same frames"""
+    clip = composed_frames(frames, size, fps)
+    results = {}
+    for name in profiles:
+        encoder = FFmpegEncoder(size, fps, name)
+        start = time.perf_counter()
+        video = encoder.encode(clip)
+        elapsed = time.perf_counter() - start
+        results[f'{name}_encode_fps'] = frames / elapsed
+        results[f'{name}_kb'] = len(video) / 1024
+        results[f'{name}_kbps'] = len(video) * 8 / 1000 / (frames / fps)
+    return results
+
+
+BENCH_PROMPT = "How to make money with AI in 2024"
+PIPELINE_SIZES = ((720, 720), (720, 1280))
+PIPELINE_DURATIONS = (2.0, 5.0)
+
+
+def offline_engine():
+    """Engine with fresh in-memory caches: every run starts cold and never touches disk or the network"""
+    from ai_generator import AIVideoEngine
+    from text_cache import TextRasterCache
+
+    return AIVideoEngine(background_cache=BackgroundCache(), text_cache=TextRasterCache())
+
+
+def background_generators(category: str, size: Tuple[int, int], seed: int) -> Dict[str, object]:
+    """The background of each renderer: the engine's, app.py's and simple_app.py's (its 'tech' colors)"""
+    return {
+        'engine_background': DynamicBackground(category, 30, size, seed=seed),
+        'app_background': PulseBackground(((255, 100, 100), (100, 100, 255)), size),
+        'simple_background': PulseBackground(((0, 191, 255), (138, 43, 226)), size),
+    }
+
+
+def script_texts(script: Dict) -> List[Tuple[str, str]]:
+    """(layout element, text) of every overlay of a script"""
+    texts = [('hook', script['hook']), ('opening', script['opening'])]
+    texts += [('main_point', point) for point in script['main_points']]
+    texts += [('retention_hook', script['retention_hook']), ('call_to_action', script['call_to_action'])]
+    return texts
+
+
+def bench_size(size: Tuple[int, int], fps: int = 30, seed: int = 1, repeat: int = 5) -> Dict[str, float]:
+    """Duration-independent hot paths at one canvas size"""
+    from layout import SLOTS, Layout
+    from text_cache import TextRasterCache
+
+    engine = offline_engine()
+    script = engine.generate_viral_script(BENCH_PROMPT, seed=seed)
+    results = {}
+    for name, source in background_generators(script['category'], size, seed).items():
+        results[f'{name}_period_ms'] = median_ms(lambda: BackgroundCache().render_period(source, fps), repeat)
+        results[f'{name}_ms_per_frame'] = time_frames(BackgroundCache().get(source, fps).make_frame, 90, fps)
+
+    layout = Layout(size)
+    styles = [(text, layout.style(SLOTS[element].style)) for element, text in script_texts(script)]
+
+    def rasterize():
+        cache = TextRasterCache()
+        for text, style in styles:
+            cache.get(text, **style)
+    results['text_raster_ms'] = median_ms(rasterize, repeat)
+
+    clip = engine.build_compositor(script, size=size).as_clip()
+    results['thumbnail_ms'] = median_ms(lambda: engine.generate_thumbnail(clip), repeat)
+    return results
+
+
+def bench_duration(size: Tuple[int, int], duration: float, fps: int = 30, seed: int = 1) -> Dict[str, float]:
+    """Per-frame hot paths over `duration` seconds, and one end-to-end render of that length"""
+    from moviepy.editor import VideoClip
+
+    from fanout import Variant, render_variants
+
+    frames = max(1, int(round(duration * fps)))
+    engine = offline_engine()
+    script = engine.generate_viral_script(BENCH_PROMPT, seed=seed)
+    background = DynamicBackground(script['category'], 30, size, seed=seed)
+    cached = engine.background_cache.get(background, fps)
+    effects = engine.add_viral_elements(VideoClip(cached.make_frame, duration=30))
+    compositor = engine.build_compositor(script, size=size)
+    results = {
+        'effects_ms_per_frame': time_frames(effects.get_frame, frames, fps),
+        'compose_ms_per_frame': time_frames(compositor.make_frame, frames, fps),
+    }
+
+    clip = [compositor.make_frame(i / fps).copy() for i in range(frames)]
+    start = time.perf_counter()
+    FFmpegEncoder(size, fps, 'publish').encode(clip)
+    results['encode_fps'] = frames / (time.perf_counter() - start)
+    del clip
+
+    # Script to MP4 with cold caches (silent: narration needs the network)
+    start = time.perf_counter()
+    engine = offline_engine()
+    script = engine.generate_viral_script(BENCH_PROMPT, seed=seed)
+    compositor = engine.build_compositor(script, size=size)
+    engine.generate_thumbnail(compositor.as_clip())
+    render_variants([compositor], [Variant(size, 'pad', frames)], fps, profile='publish')
+    elapsed = time.perf_counter() - start
+    results['end_to_end_s'] = elapsed
+    results['end_to_end_fps'] = frames / elapsed
+    return results
+
+
+def bench_pipeline(sizes: Sequence[Tuple[int, int]] = PIPELINE_SIZES,
+                   durations: Sequence[float] = PIPELINE_DURATIONS, fps: int = 30, seed: int = 1,
+                   repeat: int = 5) -> Dict[str, float]:
+    """Every render hot path in isolation, plus end-to-end renders, per canvas size and clip duration"""
+    from ai_generator import AIVideoEngine
+
+    engine = AIVideoEngine()
+    results = {'script_ms': median_ms(lambda: engine.generate_viral_script(BENCH_PROMPT, seed=seed), repeat)}
+    for width, height in sizes:
+        case = f'{width}x{height}'
+        for name, value in bench_size((width, height), fps, seed, repeat).items():
+            results[f'{case}.{name}'] = value
+        for duration in durations:
+            for name, value in bench_duration((width, height), duration, fps, seed).items():
+                results[f'{case}_{duration:g}s.{name}'] = value
+    return results
+
+
+def metric_direction(name: str) -> int:
+    """1 if higher is better, -1 if lower is better, 0 for metrics that are not compared"""
+    if name.endswith(('_fps', 'speedup')):
+        return 1
+    if '_ms' in name or name.endswith('_s'):
+        return -1
+    return 0
+
+
+# Millisecond timings below this in both runs are too noisy to compare
+MIN_COMPARED_MS = 1.0
+
+# Checked-in baselines, one results file per suite
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+
+
+def default_baseline(suite: str) -> str:
+    return os.path.join(BASELINE_DIR, f'{suite}.json')
+
+
+def machine_info() -> Dict:
+    """The machine results are recorded on; timings only compare on the same one"""
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def machine_mismatch(recorded: Optional[Dict], current: Dict) -> List[str]:
+    """How the machine a baseline was recorded on differs from `current` (empty when they match)"""
+    if not recorded:
+        return ["the baseline does not record its machine"]
+    return [f"{name} {recorded.get(name)} there, {value} here" for name, value in current.items()
+            if recorded.get(name) != value]
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float,
+            min_ms: float = MIN_COMPARED_MS) -> List[str]:
+    """Timings in `results` that are worse than `baseline` by more than `tolerance` (a fraction),
+    and timings of `baseline` missing from `results`"""
+    regressions = [f"{name}: {previous:.2f} -> missing from the results"
+                   for name, previous in baseline.items() if metric_direction(name) and name not in results]
+    for name, value in results.items():
+        direction, previous = metric_direction(name), baseline.get(name)
+        if not direction or not previous:
+            continue
+        if '_ms' in name and max(value, previous) < min_ms:
+            continue
+        worse = (value - previous) / previous * -direction
+        if worse > tolerance:
+            regressions.append(f"{name}: {previous:.2f} -> {value:.2f} ({worse:.0%} worse)")
+    return regressions
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render pipeline benchmarks")
+    parser.add_argument('suite', choices=['backgrounds', 'noise', 'imports', 'encode', 'pipeline'])
+    parser.add_argument('--frames', type=int, default=90)
+    parser.add_argument('--size', type=parse_size, default=(720, 720))
+    parser.add_argument('--sizes', type=parse_size, nargs='+', default=list(PIPELINE_SIZES))
+    parser.add_argument('--durations', type=float, nargs='+', default=list(PIPELINE_DURATIONS),
+                        help="Clip lengths (seconds) of the pipeline suite's per-frame and end-to-end runs")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Repetitions per timing (fresh interpreters for imports)")
+    parser.add_argument('--profiles', nargs='+', choices=sorted(ENCODING_PROFILES), default=list(ENCODING_PROFILES))
+    parser.add_argument('--runs', type=int, default=1,
+                        help="Run the suite this many times and keep each timing's median")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', help="Results JSON to compare against; regressions fail the run "
+                                           "(default: benchmarks/<suite>.json, if it exists)")
+    parser.add_argument('--no-baseline', action='store_true', help="Do not compare against any baseline")
+    parser.add_argument('--any-machine', action='store_true',
+                        help="Compare against a baseline even if it was recorded on another machine")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown against the baseline, as a fraction")
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(max(1, args.runs)):
+        np.random.seed(args.seed)
+        if args.suite == 'backgrounds':
+            runs.append(bench_backgrounds(args.frames, args.size, args.seed))
+        elif args.suite == 'noise':
+            runs.append(bench_noise(args.frames, args.size))
+        elif args.suite == 'imports':
+            runs.append(bench_imports(repeat=args.repeat))
+        elif args.suite == 'encode':
+            runs.append(bench_encode(args.frames, args.size, args.profiles))
+        elif args.suite == 'pipeline':
+            runs.append(bench_pipeline(args.sizes, args.durations, seed=args.seed, repeat=args.repeat))
+    results = {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+
+    for name, value in results.items():
+        print(f"{name}: {value:.2f}")
+
+    if args.output:
+        report = {
+            'suite': args.suite,
+            'created_at': datetime.now().isoformat(),
+            'machine': machine_info(),
+            'args': {name: value for name, value in vars(args).items()
+                     if name not in ('output', 'baseline', 'no_baseline', 'any_machine', 'tolerance')},
+            'results': results,
+        }
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+    baseline_path = args.baseline
+    if baseline_path is None and os.path.exists(default_baseline(args.suite)):
+        baseline_path = default_baseline(args.suite)
+    if baseline_path and not args.no_baseline:
+        with open(baseline_path) as handle:
+            recorded = json.load(handle)
+        mismatch = [] if args.any_machine else machine_mismatch(recorded.get('machine'), machine_info())
+        if mismatch:
+            message = f"{baseline_path} was recorded on another machine ({'; '.join(mismatch)})"
+            if args.baseline is not None:
+                sys.exit(f"FAIL: {message}; record a baseline here or pass --any-machine")
+            print(f"SKIP: not comparing, {message}", file=sys.stderr)
+            return
+        baseline = recorded['results']
+        shared = [name for name in results if name in baseline and metric_direction(name)]
+        if not shared:
+            sys.exit(f"FAIL: no timings in common with {baseline_path}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"FAIL: {len(regressions)} timings regressed by more than {args.tolerance:.0%} "
+                  f"or went missing against {baseline_path} ({len(shared)} compared):", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"OK: {len(shared)} timings within {args.tolerance:.0%} of {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+from bisect import bisect_right
+from typing import Callable, Hashable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+Position = Union[str, Tuple[Union[str, int, float], Union[str, int, float]]]
+
+
+class Layer:
+    """A sprite placed on the canvas between `start` and `start + duration`.
+
+    Sprites expose ``frame(t) -> (rgb, alpha)`` with t relative to the
+    layer start (see ``transforms.StaticSprite`` / ``ScaledSprite``).
+    Positions follow moviepy: pixels or 'left'/'center'/'right' and
+    'top'/'center'/'bottom' for the top-left corner of the sprite.
+    """
+
+    def __init__(self, sprite, start: float, duration: float, position: Position = ('center', 'center')):
+        self.sprite = sprite
+        self.start = start
+        self.duration = duration
+        self.position = ('center', 'center') if position == 'center' else position
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+    def offset(self, sprite_size: Tuple[int, int], canvas_size: Tuple[int, int]) -> Tuple[int, int]:
+        """Top-left corner of the sprite on the canvas"""
+        offset = []
+        for value, sprite_dim, canvas_dim, (low, high) in zip(
+                self.position, sprite_size, canvas_size, (('left', 'right'), ('top', 'bottom'))):
+            if value == low:
+                value = 0
+            elif value == 'center':
+                value = (canvas_dim - sprite_dim) / 2
+            elif value == high:
+                value = canvas_dim - sprite_dim
+            offset.append(int(value))
+        return offset[0], offset[1]
+
+    def clip(self):
+        """The layer as a positioned moviepy clip"""
+        return self.sprite.clip().set_start(self.start).set_duration(self.duration).set_position(self.position)
+
+
+class TimelineCompositor:
+    """Single-pass compositor for a fixed overlay timeline.
+
+    The active layers for each time span are precomputed from the layer
+    boundaries, so a frame only looks at the layers on screen.  Each layer
+    is alpha-blended over its own bounding box in a preallocated uint8
+    canvas; the background is only resampled when its size differs from
+    the canvas.  The returned frame is valid until the next call.
+
+    With a ``background_key(t)`` (see ``CachedBackground.frame_key``) the
+    compositor works incrementally while the background key stays the
+    same: only the bounding boxes of layers that appeared, disappeared or
+    changed sprite frame or position are restored from a copy of the
+    background and re-blended (``patched_frames``), and a frame with no
+    such layer returns the previous canvas as is (``reused_frames``).
+    Frames composed from scratch are counted in ``composed_frames``.
+
+    Blending works in one float32 scratch buffer grown to the largest
+    sprite, so composing a frame allocates no frame-sized temporaries.
+    """
+
+    def __init__(self, background: Callable[[float], np.ndarray], layers: Sequence[Layer],
+                 duration: float, size: Tuple[int, int] = (720, 720),
+                 background_key: Optional[Callable[[float], Optional[Hashable]]] = None):
+        self.background = background
+        self.layers = list(layers)
+        self.duration = duration
+        self.size = size
+        self.background_key = background_key
+        width, height = size
+        self._canvas = np.empty((height, width, 3), dtype=np.uint8)
+        self._scratch = np.empty(0, dtype=np.float32)
+
+        # What the canvas currently shows: background key plus each layer's
+        # (layer, sprite ids, offset) and box.  The sprites are kept alive so their ids
+        # cannot be recycled while the state refers to them.
+        self._background_copy: Optional[np.ndarray] = None
+        self._key = None
+        self._state = None
+        self._state_sprites = None
+        self.reused = False
+        self.composed_frames = 0
+        self.patched_frames = 0
+        self.reused_frames = 0
+
+        # Interval index: boundaries[i] <= t < boundaries[i + 1] -> active[i]
+        self._boundaries = sorted({0.0} | {float(layer.start) for layer in self.layers}
+                                  | {float(layer.end) for layer in self.layers})
+        self._active = [
+            [layer for layer in self.layers if layer.start <= begin < layer.end]
+            for begin in self._boundaries
+        ]
+
+    @property
+    def boundaries(self) -> List[float]:
+        """Times where the set of active layers changes, within the clip"""
+        return [t for t in self._boundaries if 0 <= t <= self.duration]
+
+    def active_layers(self, t: float) -> List[Layer]:
+        index = bisect_right(self._boundaries, t) - 1
+        return self._active[index] if index >= 0 else []
+
+    def make_frame(self, t: float) -> np.ndarray:
+        """Compose the frame at time t, redrawing only what changed since the last frame"""
+        canvas = self._canvas
+        sprites = []
+        state = {}
+        for layer in self.active_layers(t):
+            rgb, alpha = layer.sprite.frame(t - layer.start)
+            offset = layer.offset((rgb.shape[1], rgb.shape[0]), self.size)
+            sprites.append((rgb, alpha, offset))
+            state[id(layer), id(rgb), id(alpha), offset] = self.box(rgb, offset)
+            if rgb.size > self._scratch.size:
+                self._scratch = np.empty(rgb.size, dtype=np.float32)
+
+        key = self.background_key(t) if self.background_key is not None else None
+        incremental = key is not None and key == self._key and self._state is not None
+        dirty = [box for item, box in (self._state.items() ^ state.items()) if box] if incremental else []
+        self._key, self._state, self._state_sprites = key, state, sprites
+
+        self.reused = incremental and not dirty
+        if self.reused:
+            self.reused_frames += 1
+            return canvas
+
+        if incremental:
+            # Same background: restore and re-blend only the changed boxes
+            self.patched_frames += 1
+            for x0, y0, x1, y1 in dirty:
+                canvas[y0:y1, x0:x1] = self._background_copy[y0:y1, x0:x1]
+                for rgb, alpha, offset in sprites:
+                    self.blend(canvas, rgb, alpha, offset, (x0, y0, x1, y1), self._scratch)
+            return canvas
+
+        self.composed_frames += 1
+        frame = self.background(t)
+        if frame.shape[:2] != canvas.shape[:2]:
+            frame = np.asarray(Image.fromarray(frame).resize(self.size, Image.BILINEAR))
+        np.copyto(canvas, frame, casting='unsafe')
+        if key is not None:
+            if self._background_copy is None:
+                self._background_copy = np.empty_like(canvas)
+            np.copyto(self._background_copy, canvas)
+
+        for rgb, alpha, offset in sprites:
+            self.blend(canvas, rgb, alpha, offset, scratch=self._scratch)
+        return canvas
+
+    def box(self, rgb: np.ndarray, offset: Tuple[int, int]) -> Optional[Tuple[int, int, int, int]]:
+        """(x0, y0, x1, y1) of a sprite on the canvas, or None when it is off screen"""
+        x, y = offset
+        width, height = self.size
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + rgb.shape[1], width), min(y + rgb.shape[0], height)
+        return (x0, y0, x1, y1) if x0 < x1 and y0 < y1 else None
+
+    @staticmethod
+    def blend(canvas: np.ndarray, rgb: np.ndarray, alpha: np.ndarray, offset: Tuple[int, int],
+              bounds: Optional[Tuple[int, int, int, int]] = None, scratch: Optional[np.ndarray] = None):
+        """Alpha-blend a sprite into the canvas, clipped to the canvas (or to `bounds`).
+
+        `scratch` is a flat float32 work buffer, used when it is large enough.
+        """
+        x, y = offset
+        height, width = canvas.shape[:2]
+        left, top, right, bottom = bounds or (0, 0, width, height)
+        x0, y0 = max(x, left), max(y, top)
+        x1, y1 = min(x + rgb.shape[1], right), min(y + rgb.shape[0], bottom)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        region = canvas[y0:y1, x0:x1]
+        sprite = rgb[y0 - y:y1 - y, x0 - x:x1 - x]
+        weight = alpha[y0 - y:y1 - y, x0 - x:x1 - x, None]
+        if scratch is not None and scratch.size >= region.size:
+            blended = scratch[:region.size].reshape(region.shape)
+        else:
+            blended = np.empty(region.shape, dtype=np.float32)
+        # region + (sprite - region) * weight, computed in place
+        np.subtract(sprite, region, out=blended, dtype=np.float32)
+        blended *= weight
+        blended += region
+        np.copyto(region, blended, casting='unsafe')
+
+    def as_clip(self):
+        """moviepy VideoClip backed by the compositor, usable with write_videofile.
+
+        The clip keeps the compositor as ``clip.compositor`` for its frame statistics.
+        """
+        from moviepy.editor import VideoClip
+
+        clip = VideoClip(self.make_frame, duration=self.duration)
+        clip.compositor = self
+        return clip
@@ -0,0 +1,11 @@
+import os
+
+# Root directory for on-disk caches (text rasters, renders, audio stems)
+CACHE_ROOT = os.getenv('AI_SHORTS_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'ai-shorts'))
+
+
+def cache_path(*parts: str) -> str:
+    """Path of a cache subdirectory, created on first use"""
+    path = os.path.join(CACHE_ROOT, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,192 @@
+import io
+import subprocess
+import threading
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from profiles import EncodingProfile, get_profile
+from progress import ProgressCallback, RenderProgress
+
+# Fragmented MP4 can be written to a pipe: no seeking back to patch the moov atom
+FRAGMENTED_MP4_FLAGS = 'frag_keyframe+empty_moov+default_base_moof'
+CHUNK_SIZE = 256 * 1024
+
+
+@lru_cache(maxsize=1)
+def ffmpeg_binary() -> str:
+    """Path of the ffmpeg executable (the one bundled with imageio-ffmpeg if available)"""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return 'ffmpeg'
+
+
+class FFmpegEncoder:
+    """Streams raw RGB frames into an ffmpeg subprocess.
+
+    Frames go to ffmpeg's stdin and the encoded video comes back on stdout
+    as fragmented MP4, so nothing touches the disk unless an output path
+    is given.  Video settings come from an encoding ``profile`` (see
+    ``profiles``).  An optional ``audio`` file is muxed (as AAC) in the
+    same ffmpeg pass, cut to the video's ``duration`` when that is known
+    (``-shortest`` makes ffmpeg hold back video frames until the streams
+    line up, which costs hundreds of MB on long full HD renders).
+    """
+
+    def __init__(self, size: Tuple[int, int], fps: float = 30,
+                 profile: Union[str, EncodingProfile, None] = None, output_args: Sequence[str] = (),
+                 audio: Optional[str] = None, audio_bitrate: str = '128k', duration: Optional[float] = None):
+        self.size = size
+        self.fps = fps
+        self.profile = get_profile(profile)
+        self.output_args = list(output_args)
+        self.audio = audio
+        self.audio_bitrate = audio_bitrate
+        self.duration = duration
+
+    def command(self, output: Optional[str] = None) -> List[str]:
+        width, height = self.size
+        command = [
+            ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}',
+            '-r', str(self.fps), '-i', 'pipe:0',
+        ]
+        if self.audio:
+            trim = ['-t', f'{self.duration:.3f}'] if self.duration else []
+            command += trim + ['-i', self.audio, '-map', '0:v:0', '-map', '1:a:0',
+                               '-c:a', 'aac', '-b:a', self.audio_bitrate]
+            if not trim:
+                command += ['-shortest']
+        else:
+            command += ['-an']
+        command += self.profile.output_args(self.fps) + self.output_args
+        if output is None:
+            command += ['-movflags', FRAGMENTED_MP4_FLAGS, '-f', 'mp4', 'pipe:1']
+        elif self.profile.faststart:
+            command += ['-movflags', '+faststart', output]
+        else:
+            command += [output]
+        return command
+
+    def stream(self, frames: Iterable[np.ndarray], chunk_size: int = CHUNK_SIZE,
+               progress: Optional[ProgressCallback] = None, total_frames: Optional[int] = None) -> Iterator[bytes]:
+        """Encode `frames` and yield the fragmented MP4 in chunks as it is produced"""
+        progress = RenderProgress.wrap(progress)
+        process = subprocess.Popen(self.command(), stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        errors = []
+        writer = threading.Thread(target=self._write_frames, args=(process, frames, errors, progress, total_frames),
+                                  daemon=True)
+        stderr = io.BytesIO()
+        stderr_reader = threading.Thread(target=lambda: stderr.write(process.stderr.read()), daemon=True)
+        writer.start()
+        stderr_reader.start()
+        finished = False
+        try:
+            while True:
+                chunk = process.stdout.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+            finished = True
+        finally:
+            if not finished:
+                # The consumer stopped early; unblock the writer thread
+                process.kill()
+            writer.join()
+            process.stdout.close()
+            process.wait()
+            stderr_reader.join()
+        self._check(process, errors, stderr.getvalue())
+        progress('mux', 1)
+
+    def encode(self, frames: Iterable[np.ndarray], output: Optional[str] = None,
+               progress: Optional[ProgressCallback] = None, total_frames: Optional[int] = None) -> bytes:
+        """Encode `frames` into MP4 bytes, or into `output` (returning b'') when a path is given"""
+        progress = RenderProgress.wrap(progress)
+        if output is None:
+            return b''.join(self.stream(frames, progress=progress, total_frames=total_frames))
+
+        process = subprocess.Popen(self.command(output), stdin=subprocess.PIPE,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        errors = []
+        stderr = io.BytesIO()
+        stderr_reader = threading.Thread(target=lambda: stderr.write(process.stderr.read()), daemon=True)
+        stderr_reader.start()
+        self._write_frames(process, frames, errors, progress, total_frames)
+        process.wait()
+        stderr_reader.join()
+        self._check(process, errors, stderr.getvalue())
+        progress('mux', 1)
+        return b''
+
+    def _write_frames(self, process: subprocess.Popen, frames: Iterable[np.ndarray], errors: list,
+                      progress: RenderProgress, total_frames: Optional[int]):
+        width, height = self.size
+        total = total_frames or 0
+        try:
+            progress('frames', 0, total)
+            for count, frame in enumerate(frames, 1):
+                if frame.shape[:2] != (height, width):
+                    raise ValueError(f"Frame size {frame.shape[1]}x{frame.shape[0]} "
+                                     f"does not match encoder size {width}x{height}")
+                process.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).data)
+                progress('frames', count, max(total, count))
+            # ffmpeg flushes the encoder and writes the container once stdin closes
+            progress('mux', 0)
+        except BrokenPipeError:
+            pass  # ffmpeg exited early; its stderr explains why
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    @staticmethod
+    def _check(process: subprocess.Popen, errors: list, stderr: bytes):
+        if errors:
+            raise errors[0]
+        if process.returncode != 0:
+            message = stderr.decode('utf-8', 'replace').strip()
+            raise RuntimeError(f"ffmpeg exited with code {process.returncode}: {message}")
+
+
+def clip_frames(clip, fps: float) -> Iterator[np.ndarray]:
+    """uint8 frames of a moviepy clip at `fps`"""
+    return clip.iter_frames(fps=fps, dtype='uint8')
+
+
+def clip_frame_count(clip, fps: float) -> int:
+    """Number of frames `clip_frames` yields"""
+    return int(clip.duration * fps)
+
+
+def clip_audio_file(clip) -> Optional[str]:
+    """Source file of a clip's audio track, if it was set from a file"""
+    return getattr(clip.audio, 'filename', None) if clip.audio is not None else None
+
+
+def encode_clip(clip, fps: float = 30, output: Optional[str] = None,
+                progress: Optional[ProgressCallback] = None, audio: Optional[str] = None,
+                profile: Union[str, EncodingProfile, None] = None) -> bytes:
+    """Encode a moviepy clip (and an audio file, or the clip's own file-backed
+    audio) to MP4 bytes without temporary files"""
+    audio = audio or clip_audio_file(clip)
+    encoder = FFmpegEncoder(tuple(clip.size), fps, profile, audio=audio,
+                            duration=clip_frame_count(clip, fps) / fps)
+    return encoder.encode(clip_frames(clip, fps), output, progress, clip_frame_count(clip, fps))
+
+
+def stream_clip(clip, fps: float = 30, chunk_size: int = CHUNK_SIZE,
+                progress: Optional[ProgressCallback] = None, audio: Optional[str] = None,
+                profile: Union[str, EncodingProfile, None] = None) -> Iterator[bytes]:
+    """Encode a moviepy clip and yield MP4 chunks as ffmpeg produces them"""
+    audio = audio or clip_audio_file(clip)
+    encoder = FFmpegEncoder(tuple(clip.size), fps, profile, audio=audio,
+                            duration=clip_frame_count(clip, fps) / fps)
+    return encoder.stream(clip_frames(clip, fps), chunk_size, progress, clip_frame_count(clip, fps))
@@ -0,0 +1,117 @@
+"""Process-wide render engine shared by every Streamlit session.
+
+``ShortsEngine`` owns the job queue and a bounded pool of render worker
+processes; the UI only submits and polls.  Each worker warms its caches
+once at startup (``warm_render_caches``) and keeps them for every job it
+runs, within the memory caps below.
+
+Environment:
+    AI_SHORTS_WORKERS               render worker processes (default 2)
+    AI_SHORTS_MAX_PENDING           queued jobs accepted before refusing (default 50)
+    AI_SHORTS_BACKGROUND_CACHE_MB   per-worker background cache cap (default 256)
+    AI_SHORTS_TEXT_CACHE_ENTRIES    per-worker in-memory text rasters (default 256)
+    AI_SHORTS_TEXT_CACHE_MB         shared on-disk text rasters (default 256)
+    AI_SHORTS_NOISE_BANK_MB         per-worker noise texture bank (default 8)
+    AI_SHORTS_JOB_RETENTION_HOURS   finished jobs and their MP4/GIF results kept (default 24)
+"""
+import os
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+from jobs import RUNNING, JobQueue, WorkerPool
+
+CATEGORIES = ('finance', 'tech', 'lifestyle', 'motivation')
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the render queue already holds `max_pending` jobs"""
+
+
+class ShortsEngine:
+    """Job queue plus a bounded render worker pool, safe to share between threads"""
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 queue: Optional[JobQueue] = None):
+        self.workers = workers or int(os.getenv('AI_SHORTS_WORKERS', '2'))
+        self.max_pending = max_pending or int(os.getenv('AI_SHORTS_MAX_PENDING', '50'))
+        self.queue = queue or JobQueue()
+        self.pool = WorkerPool(self.queue, self.workers)
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self) -> 'ShortsEngine':
+        with self._lock:
+            if not self._started:
+                self.pool.start()
+                self._started = True
+        return self
+
+    def submit(self, kind: str, params: Dict) -> str:
+        """Queue a render, restarting dead workers; refuses when the queue is full"""
+        with self._lock:
+            if self.queue.pending_count() >= self.max_pending:
+                raise QueueFullError(f"{self.max_pending} renders are already waiting")
+            self.pool.ensure_running()
+            return self.queue.submit(kind, params)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Status of a job; polling a running job also recovers it if its worker died"""
+        job = self.queue.get(job_id)
+        if job is not None and job['status'] == RUNNING:
+            with self._lock:
+                if self._started and self.pool.ensure_running():
+                    job = self.queue.get(job_id)
+        return job
+
+    def read_result(self, job_id: str) -> Optional[bytes]:
+        return self.queue.read_result(job_id)
+
+    def read_preview(self, job_id: str) -> Optional[bytes]:
+        return self.queue.read_preview(job_id)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.queue.cache_stats()
+
+    def first_pixel_stats(self) -> Dict[str, float]:
+        return self.queue.first_pixel_stats()
+
+    def stop(self):
+        with self._lock:
+            self.pool.stop()
+            self._started = False
+
+
+_engine: Optional[ShortsEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_shorts_engine() -> ShortsEngine:
+    """The started process-wide engine (Streamlit apps wrap this in st.cache_resource)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ShortsEngine().start()
+        return _engine
+
+
+def warm_render_caches(sizes: Sequence[Tuple[int, int]] = ((720, 720), (720, 1280)), fps: int = 30):
+    """Load what every render needs up front, so the first job in a worker is not a cold one"""
+    from backgrounds import NOISE_LEVEL, DynamicBackground, diagonal_phase_table, get_background_cache
+    from encoder import ffmpeg_binary
+    from layout import TEXT_STYLES, Layout
+    from noise import get_noise_bank
+    from text_cache import FONT_FILES, load_font
+
+    ffmpeg_binary()
+    fontsizes = {42, 60} | {Layout(size).style(name)['fontsize'] for size in sizes for name in TEXT_STYLES}
+    for font in FONT_FILES:
+        for fontsize in sorted(fontsizes):
+            load_font(font, fontsize)
+
+    # One period per category and canvas is a few MB of diagonal profiles
+    cache = get_background_cache()
+    for size in sizes:
+        diagonal_phase_table(*size)
+        get_noise_bank(size, NOISE_LEVEL)
+        for category in CATEGORIES:
+            cache.get(DynamicBackground(category, 30, size), fps)
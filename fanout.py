@@ -0,0 +1,314 @@
+"""Multi-platform fan-out rendering.
+
+The timeline is composed once per frame for each distinct canvas size
+(see ``layout``), so every platform gets frames laid out natively at its
+own size; a variant without a matching canvas is derived by scaling,
+padding or cropping.  Each distinct variant is piped into its own ffmpeg
+process.  Encoders run concurrently, so N deliverables cost one
+composition pass plus N (parallel) encodes instead of N full renders.
+Platforms that resolve to the same variant share one encode.
+
+Composed frames are copied into a fixed ``FramePool`` per canvas, so the
+number of frames in flight (and the frame memory) is capped however far
+the encoders fall behind.
+"""
+import os
+import queue
+import threading
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from encoder import FFmpegEncoder
+from profiles import EncodingProfile
+from progress import ProgressCallback, RenderProgress
+
+if TYPE_CHECKING:
+    from profiling import RenderProfiler
+
+# 'fit' only applies when a platform is derived from a canvas of another size
+PLATFORM_SPECS = {
+    'instagram': {'size': (720, 720), 'fps': 30, 'duration': 30, 'fit': 'pad'},
+    'tiktok': {'size': (720, 1280), 'fps': 30, 'duration': 30, 'fit': 'pad'},
+    'youtube_shorts': {'size': (720, 1280), 'fps': 30, 'duration': 60, 'fit': 'pad'},
+    'youtube_shorts_hd': {'size': (1080, 1920), 'fps': 30, 'duration': 60, 'fit': 'pad'},
+    'facebook': {'size': (720, 720), 'fps': 30, 'duration': 30, 'fit': 'pad'},
+}
+
+FIT_MODES = ('scale', 'pad', 'crop')
+
+# Composed frames buffered per encoder before composition waits for it
+QUEUE_SIZE = 8
+# Frame buffers per canvas: the queued frames plus the ones being written and composed
+FRAMES_IN_FLIGHT = QUEUE_SIZE + 2
+# Memory-bounded renders cut frames in flight down to this (one composing,
+# one queued, one being written) before cutting ffmpeg threads per encoder
+BOUNDED_FRAMES_IN_FLIGHT = 3
+BOUNDED_ENCODER_THREADS = 1
+
+# Peak memory model used to fit a render into a budget, in MB and in RGB
+# frames of each canvas / output size (measured at 1080x1920, publish
+# profile): the process baseline, each compositor's working set on top of
+# its pooled frames (background, sprites, warp temporaries), and each
+# ffmpeg encoder's base plus x264 per-thread buffers
+PROCESS_BASE_MB = 130
+CANVAS_FRAMES = 20
+ENCODER_BASE_FRAMES = 26
+ENCODER_THREAD_FRAMES = 11
+
+
+class Variant(NamedTuple):
+    """One encoded deliverable: output size, fit mode and length in frames"""
+    size: Tuple[int, int]
+    fit: str
+    frames: int
+
+
+def platform_spec(platform: str) -> Dict:
+    return PLATFORM_SPECS.get(platform, PLATFORM_SPECS['instagram'])
+
+
+def platform_variant(platform: str, duration: float, fps: float) -> Variant:
+    """The variant a platform needs from a composition of `duration` seconds"""
+    spec = platform_spec(platform)
+    return Variant(spec['size'], spec['fit'], int(round(min(duration, spec['duration']) * fps)))
+
+
+def fit_frame(frame: np.ndarray, size: Tuple[int, int], fit: str = 'scale',
+              fill: Tuple[int, int, int] = (0, 0, 0)) -> np.ndarray:
+    """Derive a `size` frame: 'scale' stretches, 'pad' letterboxes, 'crop' fills and center-crops"""
+    if fit not in FIT_MODES:
+        raise ValueError(f"Unknown fit mode {fit!r}; expected one of {FIT_MODES}")
+    width, height = size
+    source_height, source_width = frame.shape[:2]
+    if (source_width, source_height) == (width, height):
+        return frame
+    image = Image.fromarray(frame)
+    if fit == 'scale':
+        return np.asarray(image.resize(size, Image.BILINEAR))
+
+    scale = (min if fit == 'pad' else max)(width / source_width, height / source_height)
+    scaled_width, scaled_height = max(1, round(source_width * scale)), max(1, round(source_height * scale))
+    if (scaled_width, scaled_height) != (source_width, source_height):
+        frame = np.asarray(image.resize((scaled_width, scaled_height), Image.BILINEAR))
+    if fit == 'crop':
+        x, y = (scaled_width - width) // 2, (scaled_height - height) // 2
+        return frame[y:y + height, x:x + width]
+
+    canvas = np.empty((height, width, 3), dtype=np.uint8)
+    canvas[:] = fill
+    x, y = (width - scaled_width) // 2, (height - scaled_height) // 2
+    canvas[y:y + scaled_height, x:x + scaled_width] = frame
+    return canvas
+
+
+def frame_mb(size: Tuple[int, int]) -> float:
+    return size[0] * size[1] * 3 / 1024 ** 2
+
+
+def estimate_memory(canvases: Sequence[Tuple[int, int]], variants: Sequence[Variant],
+                    frames_in_flight: int, threads: int) -> float:
+    """Estimated peak MB of rendering `variants` from compositors of the `canvases` sizes"""
+    return (PROCESS_BASE_MB
+            + sum(frame_mb(size) for size in canvases) * (CANVAS_FRAMES + frames_in_flight)
+            + sum(frame_mb(variant.size) for variant in variants) * (ENCODER_BASE_FRAMES
+                                                                      + threads * ENCODER_THREAD_FRAMES))
+
+
+def fit_memory_budget(budget_mb: float, canvases: Sequence[Tuple[int, int]], variants: Sequence[Variant],
+                      threads: int = 0) -> Tuple[int, int]:
+    """(frames in flight, ffmpeg threads) whose estimated peak fits `budget_mb`.
+
+    Frames in flight are cut first, down to BOUNDED_FRAMES_IN_FLIGHT, then
+    encoder threads (0: every core), then frames down to the pool minimum.
+    `threads` is returned unchanged when it did not have to be cut.
+    """
+    frames, fitted = FRAMES_IN_FLIGHT, threads or os.cpu_count() or 1
+    while estimate_memory(canvases, variants, frames, fitted) > budget_mb:
+        if frames > BOUNDED_FRAMES_IN_FLIGHT:
+            frames -= 1
+        elif fitted > BOUNDED_ENCODER_THREADS:
+            fitted -= 1
+        elif frames > 2:
+            frames -= 1
+        else:
+            break  # Smallest settings; the render is still held to the budget while it runs
+    return frames, fitted if fitted != (threads or os.cpu_count() or 1) else threads
+
+
+class FramePool:
+    """Preallocated frame buffers shared by a compositor and its encoders.
+
+    ``acquire`` waits for a free buffer, so composition never runs more
+    than ``count`` frames ahead of the slowest encoder and no frame memory
+    is allocated per frame.  A buffer returns to the pool once every
+    holder has released it.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], count: int = FRAMES_IN_FLIGHT):
+        # One buffer holds the last frame (re-sent while unchanged), another takes the next
+        self.buffers = [np.empty(shape, dtype=np.uint8) for _ in range(max(2, count))]
+        self._holders = [0] * len(self.buffers)
+        self._free: queue.Queue = queue.Queue()
+        for slot in range(len(self.buffers)):
+            self._free.put(slot)
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self.buffers)
+
+    def acquire(self, frame: np.ndarray) -> int:
+        """Copy `frame` into a free buffer, held once by the caller, and return its slot"""
+        slot = self._free.get()
+        np.copyto(self.buffers[slot], frame)
+        self._holders[slot] = 1
+        return slot
+
+    def retain(self, slot: int):
+        with self._lock:
+            self._holders[slot] += 1
+
+    def release(self, slot: int):
+        with self._lock:
+            self._holders[slot] -= 1
+            free = self._holders[slot] == 0
+        if free:
+            self._free.put(slot)
+
+
+def _encode_variant(variant: Variant, pool: FramePool, frames_queue: queue.Queue, fps: float,
+                    audio: Optional[str], profile: Union[str, EncodingProfile, None], results: Dict,
+                    errors: List, profiler: Optional['RenderProfiler'] = None):
+    """Encoder thread: fit queued frames to the variant and pipe them into ffmpeg"""
+    finished = threading.Event()
+
+    def frames() -> Iterator[np.ndarray]:
+        while True:
+            slot = frames_queue.get()
+            if slot is None:
+                finished.set()
+                return
+            try:
+                yield fit_frame(pool.buffers[slot], variant.size, variant.fit)
+            finally:
+                # Written to ffmpeg (or abandoned), so the buffer can be reused
+                pool.release(slot)
+
+    source = frames()
+    try:
+        stream = source
+        if profiler is not None:
+            stream = profiler.timed_iter(f"encode {variant.size[0]}x{variant.size[1]}", stream)
+        results[variant] = FFmpegEncoder(variant.size, fps, profile, audio=audio,
+                                         duration=variant.frames / fps).encode(stream)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        # If ffmpeg stopped early, release its frame and keep draining so
+        # composition never blocks on this queue or on the pool
+        source.close()
+        while not finished.is_set():
+            slot = frames_queue.get()
+            if slot is None:
+                finished.set()
+            else:
+                pool.release(slot)
+
+
+def _variant_source(compositors: Sequence, variant: Variant, fps: float):
+    """The compositor that best matches a variant's size and length"""
+    def length(compositor) -> int:
+        return int(round(compositor.duration * fps))
+
+    for matches in (lambda compositor: tuple(compositor.size) == tuple(variant.size)
+                    and length(compositor) == variant.frames,
+                    lambda compositor: length(compositor) == variant.frames,
+                    lambda compositor: tuple(compositor.size) == tuple(variant.size)):
+        source = next((compositor for compositor in compositors if matches(compositor)), None)
+        if source is not None:
+            return source
+    return compositors[0]
+
+
+def render_variants(compositors: Sequence, variants: Sequence[Variant], fps: float = 30,
+                    audio: Union[str, Dict[Variant, str], None] = None,
+                    progress: Optional[ProgressCallback] = None, queue_size: int = QUEUE_SIZE,
+                    profile: Union[str, EncodingProfile, None] = None,
+                    profiler: Optional['RenderProfiler'] = None,
+                    frames_in_flight: int = FRAMES_IN_FLIGHT,
+                    stop: Optional[threading.Event] = None) -> Dict[Variant, bytes]:
+    """Compose each frame once per canvas and encode every distinct variant from it in parallel.
+
+    A variant is fed by the compositor of its own size and length, else by
+    one of its length (so its timeline is complete), else by one of its
+    size, else by the first one.  `audio` is one file for every variant or
+    a file per variant.  At most `frames_in_flight` composed frames per
+    canvas are buffered.  With a `profiler`, composing and encoding each
+    frame are timed per canvas size.  Setting `stop` ends composition early,
+    leaving the videos incomplete.
+    """
+    progress = RenderProgress.wrap(progress)
+    variants = sorted(set(variants))
+    sources = [_variant_source(compositors, variant, fps) for variant in variants]
+    audio_files = {variant: audio.get(variant) if isinstance(audio, dict) else audio for variant in variants}
+    compose = {id(source): source.make_frame for source in sources}
+    if profiler is not None:
+        compose = {id(source): profiler.timed(f"compose {source.size[0]}x{source.size[1]}", source.make_frame)
+                   for source in sources}
+    # One pool per distinct compositor, however many variants it feeds
+    pools = {}
+    for source in sources:
+        if id(source) not in pools:
+            pools[id(source)] = FramePool((source.size[1], source.size[0], 3), frames_in_flight)
+    queues = [queue.Queue(maxsize=queue_size) for _ in variants]
+    results: Dict[Variant, bytes] = {}
+    errors: List[Exception] = []
+    threads = [threading.Thread(target=_encode_variant,
+                                args=(variant, pools[id(source)], frames_queue, fps, audio_files[variant], profile,
+                                      results, errors, profiler),
+                                daemon=True)
+               for variant, source, frames_queue in zip(variants, sources, queues)]
+    for thread in threads:
+        thread.start()
+
+    total = max(variant.frames for variant in variants)
+    closed = set()
+    previous: Dict[int, int] = {}
+    try:
+        progress('frames', 0, total)
+        for index in range(total):
+            if stop is not None and stop.is_set():
+                break
+            # Compositors reuse their canvas; one pooled copy per canvas is shared
+            # read-only by its encoders, and an unchanged frame re-sends the previous copy
+            frames = {}
+            for position, (variant, source, frames_queue) in enumerate(zip(variants, sources, queues)):
+                pool = pools[id(source)]
+                if index < variant.frames:
+                    if id(source) not in frames:
+                        frame = compose[id(source)](index / fps)
+                        if not (getattr(source, 'reused', False) and id(source) in previous):
+                            slot = pool.acquire(frame)
+                            if id(source) in previous:
+                                pool.release(previous[id(source)])
+                            previous[id(source)] = slot
+                        frames[id(source)] = previous[id(source)]
+                    pool.retain(frames[id(source)])
+                    frames_queue.put(frames[id(source)])
+                elif position not in closed:
+                    frames_queue.put(None)
+                    closed.add(position)
+            progress('frames', index + 1, total)
+        progress('mux', 0)
+    finally:
+        for position, frames_queue in enumerate(queues):
+            if position not in closed:
+                frames_queue.put(None)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    progress('mux', 1)
+    return results
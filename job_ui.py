@@ -0,0 +1,71 @@
+"""Streamlit pieces shared by app.py and simple_app.py.
+
+Both apps submit renders to the process-wide engine and poll the job:
+``show_job`` shows its queue position, progress and keyframe preview
+until it finishes, then hands the stored video to the app's own
+``show_result``.
+"""
+import time
+from datetime import datetime
+from typing import Callable, Dict
+
+import streamlit as st
+
+from engine import ShortsEngine, get_shorts_engine
+from jobs import DONE, QUEUED, RUNNING
+
+
+@st.cache_resource
+def get_engine() -> ShortsEngine:
+    """Render engine (queue + bounded worker pool with warm caches) shared by every session of this server"""
+    return get_shorts_engine()
+
+
+def show_job(job_id: str, show_result: Callable[[Dict, bytes], None],
+             working: str = "🎬 Creating your viral short...",
+             preview_caption: str = "👀 Preview: the full-quality video replaces it when ready",
+             failed: str = "❌ Failed to generate video. Please try again."):
+    """Show the status of a submitted render, polling until it finishes;
+    `show_result(job, video_bytes)` then shows the finished video"""
+    engine = get_engine()
+    job = engine.get(job_id)
+    if job is None:
+        return
+
+    if job['status'] in (QUEUED, RUNNING):
+        if job['status'] == QUEUED:
+            st.info(f"⏳ Waiting for a free renderer ({job['position']} ahead of you)...")
+        st.progress(job['progress'])
+        st.write(job['stage'] or working)
+        # Keyframe preview while the full-quality render finishes
+        preview = engine.read_preview(job_id) if job['preview_path'] else None
+        if preview:
+            st.image(preview, caption=preview_caption)
+        time.sleep(1)
+        st.rerun()
+
+    elif job['status'] == DONE:
+        # The stored result feeds both the player and the download button
+        show_result(job, engine.read_result(job_id))
+
+    else:
+        st.error(failed)
+
+
+def show_render_stats(metadata: Dict):
+    """Caption saying how much of the render was skipped"""
+    if metadata.get('cache_hit'):
+        st.caption("⚡ Served instantly from the render cache")
+    elif metadata.get('deduplicated_frames'):
+        st.caption(f"♻️ {metadata['deduplicated_frames']} unchanged frames reused instead of recomposed")
+
+
+def download_video(video_bytes: bytes, label: str, name: str = 'short', **options):
+    """Download button for a finished video, named after the time of the download"""
+    st.download_button(
+        label=label,
+        data=video_bytes,
+        file_name=f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4",
+        mime="video/mp4",
+        **options
+    )
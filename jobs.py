@@ -0,0 +1,414 @@
+"""SQLite-backed render job queue with a local worker pool.
+
+The Streamlit apps submit jobs and poll their status; worker processes
+claim queued jobs, call the render handler registered for the job kind
+and store the encoded MP4 under the results directory.
+
+Workers delete finished jobs and their results once they are older than
+the retention period (``AI_SHORTS_JOB_RETENTION_HOURS``, default 24).
+
+Run standalone workers with:
+    python jobs.py worker --workers 2
+"""
+import argparse
+import atexit
+import importlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import cache_path
+
+# Job kind -> "module:function" handler, imported lazily by the worker.
+# Handlers take (params, progress, preview) and return (mp4_bytes, metadata);
+# they may call preview(gif_bytes) once, before the full render is done.
+JOB_HANDLERS = {
+    'shorts': 'jobs:render_engine_short',
+    'app': 'app:render_job',
+    'simple_app': 'simple_app:render_job',
+}
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+# Claims of a job whose worker died before it is failed instead of requeued
+# (a render that keeps crashing or OOM-killing its worker)
+MAX_ATTEMPTS = 3
+
+# Seconds between a worker's sweeps of expired jobs
+PURGE_INTERVAL = 600
+
+
+def job_retention() -> float:
+    """Seconds finished jobs and their results are kept"""
+    return float(os.getenv('AI_SHORTS_JOB_RETENTION_HOURS', '24')) * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    stage TEXT NOT NULL DEFAULT '',
+    result_path TEXT,
+    preview_path TEXT,
+    preview_at REAL,
+    metadata TEXT,
+    error TEXT,
+    worker_pid INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+# Columns added after the first release, for queues created before them
+MIGRATIONS = {
+    'preview_path': 'ALTER TABLE jobs ADD COLUMN preview_path TEXT',
+    'preview_at': 'ALTER TABLE jobs ADD COLUMN preview_at REAL',
+    'attempts': 'ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0',
+}
+
+
+class JobQueue:
+    """Render jobs stored in a SQLite database shared by the UI and the workers"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or cache_path('jobs')
+        self.path = os.path.join(self.directory, 'jobs.db')
+        self.results_dir = os.path.join(self.directory, 'results')
+        os.makedirs(self.results_dir, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+            columns = {row['name'] for row in connection.execute('PRAGMA table_info(jobs)')}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    connection.execute(statement)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Autocommit connection per call, so the queue can be shared by threads
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            yield connection
+        finally:
+            connection.close()
+
+    def submit(self, kind: str, params: Dict) -> str:
+        """Queue a job and return its id"""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT INTO jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, kind, json.dumps(params), QUEUED, time.time()))
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Status record of a job, or None if it does not exist"""
+        with self._connect() as connection:
+            row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['metadata'] = json.loads(job['metadata']) if job['metadata'] else None
+        job['position'] = self.queue_position(job_id) if job['status'] == QUEUED else 0
+        return job
+
+    def pending_count(self) -> int:
+        """Number of jobs waiting for a worker"""
+        with self._connect() as connection:
+            return connection.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (QUEUED,)).fetchone()[0]
+
+    def queue_position(self, job_id: str) -> int:
+        """Number of queued jobs ahead of `job_id`"""
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < '
+                '(SELECT created_at FROM jobs WHERE id = ?)', (QUEUED, job_id)).fetchone()
+        return row[0]
+
+    def claim(self) -> Optional[Dict]:
+        """Atomically take the oldest queued job for this process"""
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = connection.execute(
+                    'SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1', (QUEUED,)).fetchone()
+                if row is not None:
+                    connection.execute(
+                        'UPDATE jobs SET status = ?, worker_pid = ?, started_at = ?, attempts = attempts + 1 '
+                        'WHERE id = ?',
+                        (RUNNING, os.getpid(), time.time(), row['id']))
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+        return self.get(row['id']) if row is not None else None
+
+    def update_progress(self, job_id: str, progress: float, stage: str = ''):
+        with self._connect() as connection:
+            connection.execute('UPDATE jobs SET progress = ?, stage = ? WHERE id = ?',
+                               (max(0.0, min(progress, 1.0)), stage, job_id))
+
+    def complete(self, job_id: str, video: bytes, metadata: Optional[Dict] = None):
+        """Store the encoded result and mark the job done"""
+        path = os.path.join(self.results_dir, f'{job_id}.mp4')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as handle:
+            handle.write(video)
+        os.replace(tmp_path, path)
+        with self._connect() as connection:
+            connection.execute(
+                'UPDATE jobs SET status = ?, progress = 1, stage = ?, result_path = ?, metadata = ?, '
+                'finished_at = ? WHERE id = ?',
+                (DONE, 'done', path, json.dumps(metadata or {}, default=str), time.time(), job_id))
+
+    def store_preview(self, job_id: str, preview: bytes):
+        """Store a job's instant preview (animated GIF) and record when the first pixel was ready"""
+        path = os.path.join(self.results_dir, f'{job_id}.gif')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as handle:
+            handle.write(preview)
+        os.replace(tmp_path, path)
+        with self._connect() as connection:
+            connection.execute('UPDATE jobs SET preview_path = ?, preview_at = ? WHERE id = ?',
+                               (path, time.time(), job_id))
+
+    def read_preview(self, job_id: str) -> Optional[bytes]:
+        """Preview GIF of a job, once its worker has published one"""
+        job = self.get(job_id)
+        if job is None or not job['preview_path']:
+            return None
+        try:
+            with open(job['preview_path'], 'rb') as handle:
+                return handle.read()
+        except FileNotFoundError:
+            return None
+
+    def first_pixel_stats(self, last: int = 100) -> Dict[str, float]:
+        """Seconds from submit until the user could see something (preview or
+        finished video), over the last `last` finished jobs"""
+        with self._connect() as connection:
+            rows = connection.execute(
+                'SELECT MIN(COALESCE(preview_at, finished_at), finished_at) - created_at AS seconds FROM jobs '
+                'WHERE status = ? ORDER BY finished_at DESC LIMIT ?', (DONE, last)).fetchall()
+        seconds = sorted(row['seconds'] for row in rows)
+        if not seconds:
+            return {'jobs': 0, 'median': 0.0, 'p95': 0.0}
+        return {
+            'jobs': len(seconds),
+            'median': seconds[len(seconds) // 2],
+            'p95': seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))],
+        }
+
+    def fail(self, job_id: str, error: str):
+        with self._connect() as connection:
+            connection.execute('UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                               (FAILED, error, time.time(), job_id))
+
+    def read_result(self, job_id: str) -> Optional[bytes]:
+        """Encoded MP4 of a finished job"""
+        job = self.get(job_id)
+        if job is None or job['status'] != DONE:
+            return None
+        with open(job['result_path'], 'rb') as handle:
+            return handle.read()
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Render cache hits and misses over the finished jobs, across all workers"""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT json_extract(metadata, '$.cache_hit') AS hit, COUNT(*) AS jobs FROM jobs "
+                "WHERE status = ? AND json_extract(metadata, '$.cache_hit') IS NOT NULL GROUP BY hit",
+                (DONE,)).fetchall()
+        counts = {row['hit']: row['jobs'] for row in rows}
+        return {'hits': counts.get(1, 0), 'misses': counts.get(0, 0)}
+
+    def requeue_stale(self, max_attempts: int = MAX_ATTEMPTS) -> int:
+        """Put running jobs whose worker process has died back in the queue,
+        or fail them once they have taken down `max_attempts` workers"""
+        with self._connect() as connection:
+            rows = connection.execute('SELECT id, worker_pid, attempts FROM jobs WHERE status = ?',
+                                      (RUNNING,)).fetchall()
+            stale = [row for row in rows if not _pid_alive(row['worker_pid'])]
+            for row in stale:
+                if row['attempts'] >= max_attempts:
+                    connection.execute(
+                        'UPDATE jobs SET status = ?, worker_pid = NULL, error = ?, finished_at = ? WHERE id = ?',
+                        (FAILED, f"Worker exited during the render ({row['attempts']} attempts)", time.time(),
+                         row['id']))
+                else:
+                    connection.execute(
+                        'UPDATE jobs SET status = ?, worker_pid = NULL, progress = 0, stage = ? WHERE id = ?',
+                        (QUEUED, '', row['id']))
+        return len(stale)
+
+    def purge(self, older_than: float = 24 * 3600) -> int:
+        """Delete finished jobs and their results older than `older_than` seconds"""
+        cutoff = time.time() - older_than
+        with self._connect() as connection:
+            rows = connection.execute('SELECT id, result_path, preview_path FROM jobs '
+                                      'WHERE status IN (?, ?) AND finished_at < ?',
+                                      (DONE, FAILED, cutoff)).fetchall()
+            for row in rows:
+                for path in (row['result_path'], row['preview_path']):
+                    if path:
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            pass  # Purged by another worker
+                connection.execute('DELETE FROM jobs WHERE id = ?', (row['id'],))
+        return len(rows)
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def load_handler(kind: str) -> Callable[..., Tuple[bytes, Dict]]:
+    module_name, function_name = JOB_HANDLERS[kind].split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+# Engine reused by every job this worker process runs
+_engine = None
+
+
+def render_engine_short(params: Dict, progress: Callable[[float, str], None],
+                        preview: Optional[Callable[[bytes], None]] = None) -> Tuple[bytes, Dict]:
+    """Job handler: render a prompt with AIVideoEngine"""
+    global _engine
+    if _engine is None:
+        from ai_generator import AIVideoEngine
+        _engine = AIVideoEngine()
+    render = _engine.render_short(params['prompt'], params.get('style', 'viral'),
+                                 params.get('platform', 'instagram'), params.get('fps', 30), progress,
+                                 params.get('seed'), params.get('audio', True), params.get('profile'), preview,
+                                 duration=params.get('duration', 30))
+    return render.video, render.metadata
+
+
+def run_worker(queue: JobQueue, poll_interval: float = 0.5, max_jobs: Optional[int] = None,
+               retention: Optional[float] = None):
+    """Claim and run jobs until `max_jobs` have been processed (forever by default),
+    purging jobs finished more than `retention` seconds ago every PURGE_INTERVAL"""
+    from engine import warm_render_caches
+
+    try:
+        warm_render_caches()
+    except Exception:
+        traceback.print_exc()  # A cold cache only costs time
+
+    retention = job_retention() if retention is None else retention
+    processed = 0
+    last_purge: Optional[float] = None
+    while max_jobs is None or processed < max_jobs:
+        if last_purge is None or time.monotonic() - last_purge >= PURGE_INTERVAL:
+            last_purge = time.monotonic()
+            try:
+                queue.purge(retention)
+            except Exception:
+                traceback.print_exc()  # Disk usage is not worth losing a worker over
+        job = queue.claim()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        job_id = job['id']
+        try:
+            handler = load_handler(job['kind'])
+            video, metadata = handler(job['params'],
+                                      lambda fraction, stage='': queue.update_progress(job_id, fraction, stage),
+                                      lambda preview: queue.store_preview(job_id, preview))
+            queue.complete(job_id, video, metadata)
+        except Exception as e:
+            traceback.print_exc()
+            queue.fail(job_id, f"{type(e).__name__}: {e}")
+        processed += 1
+
+
+class WorkerPool:
+    """Local worker processes serving a JobQueue"""
+
+    def __init__(self, queue: JobQueue, workers: int = 2):
+        self.queue = queue
+        self.workers = workers
+        self.processes: List[subprocess.Popen] = []
+
+    def _spawn(self) -> subprocess.Popen:
+        script = os.path.abspath(__file__)
+        return subprocess.Popen([sys.executable, script, 'worker', '--directory', self.queue.directory],
+                                cwd=os.path.dirname(script))
+
+    def start(self):
+        self.queue.requeue_stale()
+        self.processes = [self._spawn() for _ in range(self.workers)]
+        atexit.register(self.stop)
+        return self
+
+    def ensure_running(self) -> int:
+        """Restart workers that have exited and requeue the jobs they were running"""
+        for i, process in enumerate(self.processes):
+            # poll() also reaps the exited worker, so its pid no longer looks alive
+            if process.poll() is not None:
+                self.processes[i] = self._spawn()
+        return self.queue.requeue_stale()
+
+    def stop(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.processes = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render job workers")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    worker = subcommands.add_parser('worker', help="Run render workers")
+    worker.add_argument('--directory', default=None, help="Job queue directory")
+    worker.add_argument('--workers', type=int, default=1)
+    worker.add_argument('--poll-interval', type=float, default=0.5)
+    args = parser.parse_args()
+
+    queue = JobQueue(args.directory)
+    if args.workers > 1:
+        pool = WorkerPool(queue, args.workers).start()
+        try:
+            while True:
+                time.sleep(5)
+                pool.ensure_running()
+        except KeyboardInterrupt:
+            pool.stop()
+    else:
+        run_worker(queue, args.poll_interval)
+
+
+if __name__ == "__main__":
+    main()
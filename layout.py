@@ -0,0 +1,73 @@
+"""Resolution-independent overlay layout.
+
+Overlay slots are specified relative to the canvas: vertical positions
+as a fraction of its height, font sizes, stroke widths and the wrap
+width as fractions of its width.  ``Layout`` resolves them to pixels for
+one canvas, so every platform is composed natively at its own size
+instead of being stretched from a square render.  At 720 pixels wide the
+resolved font sizes match the original hand-tuned values.
+"""
+from typing import Dict, NamedTuple, Tuple, Union
+
+# Original layout was tuned on a 720 x 720 canvas
+REFERENCE_SIZE = (720, 720)
+
+
+class Slot(NamedTuple):
+    """Where a script element goes: 'center' or a width fraction for x, a height fraction for y"""
+    x: Union[str, float]
+    y: float
+    style: str
+
+
+# Text styles with sizes as fractions of the canvas width
+TEXT_STYLES: Dict[str, Dict] = {
+    'title': {'fontsize': 50 / 720, 'color': 'white', 'font': 'Arial-Bold',
+              'stroke_color': 'black', 'stroke_width': 3 / 720},
+    'subtitle': {'fontsize': 35 / 720, 'color': 'yellow', 'font': 'Arial',
+                 'stroke_color': 'black', 'stroke_width': 2 / 720},
+    'content': {'fontsize': 40 / 720, 'color': 'white', 'font': 'Arial-Bold',
+                'stroke_color': 'red', 'stroke_width': 2 / 720},
+    'cta': {'fontsize': 45 / 720, 'color': 'lime', 'font': 'Arial-Bold',
+            'stroke_color': 'black', 'stroke_width': 3 / 720},
+}
+
+# Script element slots; main point i moves down by POINT_STEP per point
+SLOTS: Dict[str, Slot] = {
+    'hook': Slot('center', 150 / 720, 'title'),
+    'opening': Slot('center', 350 / 720, 'subtitle'),
+    'main_point': Slot('center', 400 / 720, 'content'),
+    'retention_hook': Slot('center', 200 / 720, 'subtitle'),
+    'call_to_action': Slot('center', 600 / 720, 'cta'),
+}
+POINT_STEP = 50 / 720
+
+# Text wraps to this fraction of the canvas width
+WRAP_WIDTH = 0.9
+
+
+class Layout:
+    """Resolves relative slots and text styles to pixels for one canvas size"""
+
+    def __init__(self, size: Tuple[int, int] = REFERENCE_SIZE):
+        self.size = tuple(size)
+
+    def position(self, element: str, index: int = 0) -> Tuple[Union[str, int], int]:
+        """Pixel position of a script element (`index` picks the main point)"""
+        width, height = self.size
+        slot = SLOTS[element]
+        x = slot.x if isinstance(slot.x, str) else int(round(slot.x * width))
+        return x, int(round((slot.y + index * POINT_STEP) * height))
+
+    def style(self, name: str) -> Dict:
+        """Text style with pixel font size, stroke width and wrap width"""
+        width = self.size[0]
+        style = dict(TEXT_STYLES.get(name, TEXT_STYLES['content']))
+        style['fontsize'] = max(1, int(round(style['fontsize'] * width)))
+        style['stroke_width'] = int(round(style['stroke_width'] * width))
+        style['wrap_width'] = int(round(WRAP_WIDTH * width))
+        return style
+
+    def element(self, element: str, index: int = 0) -> Tuple[Tuple[Union[str, int], int], Dict]:
+        """(position, text style) of a script element"""
+        return self.position(element, index), self.style(SLOTS[element].style)
@@ -0,0 +1,67 @@
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from seeding import make_rng
+
+# Noise textures repeat every NOISE_TILE pixels; per-frame offsets pick a window
+NOISE_TILE = 128
+# Fixed seed for the bank itself, so every process builds identical textures
+BANK_SEED = 0x5EED
+DEFAULT_BANK_MB = 8
+
+
+class NoiseBank:
+    """Precomputed tileable int8 noise textures for one frame size.
+
+    A few random ``tile x tile`` textures are drawn once and tiled out to
+    ``(height + tile, width + tile)``.  A frame's noise is then a zero-copy
+    window into one of them, chosen by texture index and (dx, dy) offset,
+    so each frame costs three random draws instead of one per pixel.  The
+    number of textures follows the memory budget ``max_bytes``.
+    """
+
+    def __init__(self, size: Tuple[int, int], level: int = 10, tile: int = NOISE_TILE,
+                 max_bytes: int = DEFAULT_BANK_MB * 1024 * 1024, seed: int = BANK_SEED):
+        self.size = size
+        self.level = level
+        self.tile = tile
+        width, height = size
+        shape = (height + tile, width + tile)
+        count = max(1, max_bytes // (shape[0] * shape[1]))
+
+        rng = np.random.default_rng(seed)
+        reps = (shape[0] // tile + 1, shape[1] // tile + 1)
+        self.textures = [
+            np.ascontiguousarray(np.tile(rng.integers(-level, level, size=(tile, tile), dtype=np.int8), reps)
+                                 [:shape[0], :shape[1]])
+            for _ in range(count)
+        ]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(texture.nbytes for texture in self.textures)
+
+    def noise(self, seed: int, key: int) -> np.ndarray:
+        """(height, width) int8 noise for frame `key` of a render seeded with `seed`"""
+        index, dy, dx = make_rng(seed, key).integers(0, (len(self.textures), self.tile, self.tile))
+        width, height = self.size
+        return self.textures[index][dy:dy + height, dx:dx + width]
+
+
+_banks: Dict[Tuple, NoiseBank] = {}
+_banks_lock = threading.Lock()
+
+
+def get_noise_bank(size: Tuple[int, int], level: int = 10, max_bytes: Optional[int] = None) -> NoiseBank:
+    """Process-wide noise bank for a frame size (budget from AI_SHORTS_NOISE_BANK_MB)"""
+    if max_bytes is None:
+        max_bytes = int(float(os.getenv('AI_SHORTS_NOISE_BANK_MB', DEFAULT_BANK_MB)) * 1024 * 1024)
+    key = (tuple(size), level, max_bytes)
+    with _banks_lock:
+        bank = _banks.get(key)
+        if bank is None:
+            bank = _banks[key] = NoiseBank(size, level, max_bytes=max_bytes)
+        return bank
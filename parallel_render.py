@@ -0,0 +1,96 @@
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from encoder import FRAGMENTED_MP4_FLAGS, FFmpegEncoder, ffmpeg_binary
+from profiles import EncodingProfile, get_profile
+from progress import ProgressCallback, RenderProgress
+
+
+def plan_segments(total_frames: int, boundaries: Sequence[int], workers: int) -> List[Tuple[int, int]]:
+    """Split [0, total_frames) at the timeline boundaries, then halve the
+    longest segments until there is at least one segment per worker"""
+    cuts = sorted({0, total_frames} | {b for b in boundaries if 0 < b < total_frames})
+    segments = list(zip(cuts[:-1], cuts[1:]))
+    while len(segments) < workers:
+        longest = max(segments, key=lambda segment: segment[1] - segment[0])
+        start, end = longest
+        if end - start < 2:
+            break
+        middle = (start + end) // 2
+        index = segments.index(longest)
+        segments[index:index + 1] = [(start, middle), (middle, end)]
+    return segments
+
+
+def render_segment(script_data: Dict, start_frame: int, end_frame: int, fps: int, path: str,
+                   profile: Optional[EncodingProfile] = None) -> str:
+    """Worker: rebuild the timeline from the script and encode one frame range"""
+    from ai_generator import AIVideoEngine
+
+    compositor = AIVideoEngine().build_compositor(script_data)
+    frames = (compositor.make_frame(i / fps) for i in range(start_frame, end_frame))
+    FFmpegEncoder(compositor.size, fps, profile).encode(frames, output=path)
+    return path
+
+
+def concat_segments(paths: Sequence[str], output: Optional[str] = None, audio: Optional[str] = None) -> bytes:
+    """Join encoded segments with ffmpeg stream copy (no video re-encode), muxing in `audio` if given"""
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as listing:
+        for path in paths:
+            listing.write(f"file '{path}'\n")
+    try:
+        command = [ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y',
+                   '-f', 'concat', '-safe', '0', '-i', listing.name]
+        if audio:
+            command += ['-i', audio, '-map', '0:v:0', '-map', '1:a:0', '-c:a', 'aac', '-b:a', '128k', '-shortest']
+        command += ['-c:v', 'copy']
+        if output is None:
+            command += ['-movflags', FRAGMENTED_MP4_FLAGS, '-f', 'mp4', 'pipe:1']
+        else:
+            command += ['-movflags', '+faststart', output]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            message = result.stderr.decode('utf-8', 'replace').strip()
+            raise RuntimeError(f"ffmpeg concat failed: {message}")
+        return result.stdout
+    finally:
+        os.unlink(listing.name)
+
+
+def render_parallel(engine, script_data: Dict, fps: int = 30, workers: Optional[int] = None,
+                    output: Optional[str] = None, progress: Optional[ProgressCallback] = None,
+                    audio: Optional[str] = None, profile: Union[str, EncodingProfile, None] = None) -> bytes:
+    """Render a script's timeline in segments across a process pool.
+
+    Each worker rebuilds the composition from the (picklable) script and
+    encodes its frame range to its own file; the segments are then
+    concatenated with stream copy, so the output has exactly the same
+    frames and encoder settings as a serial render.  An `audio` file is
+    muxed during the concat pass.
+    """
+    progress = RenderProgress.wrap(progress)
+    profile = get_profile(profile)
+    workers = workers or os.cpu_count() or 1
+    compositor = engine.build_compositor(script_data, progress)
+    total_frames = int(round(compositor.duration * fps))
+    boundaries = [int(round(t * fps)) for t in compositor.boundaries]
+    segments = plan_segments(total_frames, boundaries, workers)
+
+    with tempfile.TemporaryDirectory(prefix='ai-shorts-segments-') as directory:
+        paths = [os.path.join(directory, f'segment_{i:03d}.mp4') for i in range(len(segments))]
+        with ProcessPoolExecutor(max_workers=min(workers, len(segments))) as pool:
+            futures = {pool.submit(render_segment, script_data, start, end, fps, path, profile): end - start
+                       for (start, end), path in zip(segments, paths)}
+            done_frames = 0
+            progress('frames', 0, total_frames)
+            for future in as_completed(futures):
+                future.result()
+                done_frames += futures[future]
+                progress('frames', done_frames, total_frames)
+        progress('mux', 0)
+        video = concat_segments(paths, output, audio)
+        progress('mux', 1)
+        return video
@@ -0,0 +1,38 @@
+"""Instant previews shown while the full-quality render runs.
+
+A preview is an animated GIF of a few keyframes spread over the clip,
+at reduced width: a handful of composed frames instead of a full encode,
+so it is ready in a fraction of a second.  Workers publish it before the
+full render starts (see ``JobQueue.store_preview``) and the UI swaps in
+the MP4 once it is done.
+"""
+import io
+from typing import Callable, List
+
+import numpy as np
+from PIL import Image
+
+PREVIEW_FRAMES = 10
+PREVIEW_WIDTH = 360
+# How long each keyframe stays on screen
+PREVIEW_FRAME_MS = 600
+
+
+def preview_times(duration: float, count: int = PREVIEW_FRAMES) -> List[float]:
+    """Keyframe times: the middle of `count` equal slices of the clip"""
+    return [(i + 0.5) * duration / count for i in range(count)]
+
+
+def render_preview(make_frame: Callable[[float], np.ndarray], duration: float, count: int = PREVIEW_FRAMES,
+                   width: int = PREVIEW_WIDTH, frame_ms: int = PREVIEW_FRAME_MS) -> bytes:
+    """Animated GIF of `count` keyframes of a clip, scaled down to `width` pixels wide"""
+    images = []
+    for t in preview_times(duration, count):
+        image = Image.fromarray(make_frame(t))
+        if image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.BILINEAR)
+        images.append(image.quantize(method=Image.Quantize.FASTOCTREE))
+
+    buffer = io.BytesIO()
+    images[0].save(buffer, 'GIF', save_all=True, append_images=images[1:], duration=frame_ms, loop=0)
+    return buffer.getvalue()
@@ -0,0 +1,60 @@
+"""Named encoding profiles.
+
+A profile is the full set of encoder knobs for one delivery target, so
+latency can be traded against bitrate per deployment without touching
+the render code:
+
+    preview   fastest encode, larger files; for drafts and in-app playback
+    publish   balanced default for uploads to the platforms
+    archive   slow, near-transparent master copy
+
+Settings are codec-level (libx264 preset / CRF), not tied to a GPU or CPU
+model, so a profile produces the same stream on any machine.  The default
+profile comes from AI_SHORTS_ENCODING_PROFILE (``publish`` if unset).
+"""
+import os
+from typing import Dict, List, NamedTuple, Optional, Union
+
+
+class EncodingProfile(NamedTuple):
+    """Encoder settings; None leaves the codec default"""
+    codec: str = 'libx264'
+    preset: str = 'medium'
+    crf: Optional[int] = 23
+    tune: Optional[str] = None  # e.g. 'animation', 'stillimage', 'zerolatency'
+    threads: int = 0  # 0 lets the encoder use every core
+    keyframe_interval: Optional[float] = None  # seconds between keyframes
+    pixel_format: str = 'yuv420p'
+    faststart: bool = True  # move the moov atom up front in file outputs
+
+    def output_args(self, fps: float) -> List[str]:
+        """ffmpeg output options for the video stream"""
+        args = ['-c:v', self.codec, '-pix_fmt', self.pixel_format, '-preset', self.preset,
+                '-threads', str(self.threads)]
+        if self.crf is not None:
+            args += ['-crf', str(self.crf)]
+        if self.tune:
+            args += ['-tune', self.tune]
+        if self.keyframe_interval:
+            args += ['-g', str(max(1, int(round(self.keyframe_interval * fps))))]
+        return args
+
+
+ENCODING_PROFILES: Dict[str, EncodingProfile] = {
+    'preview': EncodingProfile(preset='ultrafast', crf=30, tune='zerolatency', keyframe_interval=1),
+    'publish': EncodingProfile(preset='veryfast', crf=23, tune='animation', keyframe_interval=2),
+    'archive': EncodingProfile(preset='slow', crf=17, tune='animation'),
+}
+
+DEFAULT_PROFILE = 'publish'
+
+
+def get_profile(profile: Union[str, EncodingProfile, None] = None) -> EncodingProfile:
+    """Resolve a profile name (or None for the configured default) to its settings"""
+    if isinstance(profile, EncodingProfile):
+        return profile
+    name = profile or os.getenv('AI_SHORTS_ENCODING_PROFILE', DEFAULT_PROFILE)
+    try:
+        return ENCODING_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown encoding profile {name!r}; expected one of {sorted(ENCODING_PROFILES)}") from None
@@ -0,0 +1,222 @@
+"""Opt-in render profiling.
+
+A ``RenderProfiler`` passed to a render records:
+
+    stages   wall and CPU time of each pipeline stage (the progress.STAGES
+             of the render plus 'setup', 'preview', 'thumbnail' and 'store';
+             'setup' holds the deferred render-stack imports and cache
+             setup, so 'script' only times script generation)
+    frames   per-call timings of the frame hot paths as p50 / p95 / p99
+             histograms, per canvas size: 'compose' (one output frame),
+             'background', 'effects' (zoom / rotation / fade warp), 'blend'
+             (one overlay) and 'encode' (piping one frame into ffmpeg)
+    memory   peak resident set size of this process and of its ffmpeg
+             children, sampled by a background thread (``MemoryMonitor``,
+             which renders also use on their own to report peak memory
+             and to hold themselves to a memory budget)
+
+Stages follow the render's own progress reports (``RenderProgress``
+switches the profiler's stage), so the pipeline needs no extra timing
+code; frame timers wrap callables (``timed``) or frame iterators
+(``timed_iter``).  ``report()`` returns plain JSON-serializable data.
+
+CPU times are process-wide, so a stage that encodes in background threads
+is charged for them; ffmpeg runs in child processes and its CPU time is
+reported separately once the encoders have exited.
+"""
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+import psutil
+
+T = TypeVar('T')
+
+# Seconds between memory samples
+MEMORY_INTERVAL = 0.05
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def _children_cpu() -> float:
+    """CPU seconds of waited-for child processes (ffmpeg)"""
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    """Raised when a render goes over its memory budget"""
+
+
+class MemoryMonitor:
+    """Peak resident set size of this process and of its children (ffmpeg) while running.
+
+    With a `limit_mb`, ``exceeded`` is set as soon as a sample of both
+    together goes over it.  RSS is process-wide, so renders running
+    concurrently in the same process share their peaks.
+    """
+
+    def __init__(self, interval: float = MEMORY_INTERVAL, limit_mb: Optional[float] = None):
+        self.interval = interval
+        self.limit_mb = limit_mb
+        self.peak_rss = 0
+        self.peak_children_rss = 0
+        self.exceeded = threading.Event()
+        self._process = psutil.Process()
+        self._stopped = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self) -> 'MemoryMonitor':
+        self._stopped.clear()
+        self.sample()
+        self._sampler = threading.Thread(target=self._watch, daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        self.sample()
+
+    def __enter__(self) -> 'MemoryMonitor':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def sample(self):
+        try:
+            rss = self._process.memory_info().rss
+            children = sum(child.memory_info().rss for child in self._process.children(recursive=True))
+        except psutil.Error:
+            # A child exited between listing and sampling
+            return
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_children_rss = max(self.peak_children_rss, children)
+        if self.limit_mb is not None and rss + children > self.limit_mb * 1024 ** 2:
+            self.exceeded.set()
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def report(self) -> Dict[str, float]:
+        """Peaks in MB"""
+        return {'peak_rss_mb': round(self.peak_rss / 1024 ** 2, 1),
+                'peak_ffmpeg_rss_mb': round(self.peak_children_rss / 1024 ** 2, 1)}
+
+
+class RenderProfiler:
+    """Per-stage and per-frame timings plus peak memory of one render"""
+
+    def __init__(self, interval: float = MEMORY_INTERVAL):
+        # stage -> [wall seconds, CPU seconds, times entered]
+        self.stages: Dict[str, List[float]] = {}
+        self.timings: Dict[str, List[float]] = {}
+        self.memory = MemoryMonitor(interval)
+        self._stage: Optional[str] = None
+        self._stage_start = (0.0, 0.0)
+        self._lock = threading.Lock()
+        self._started = None
+        self._finished = None
+
+    def start(self) -> 'RenderProfiler':
+        self._started = (time.perf_counter(), time.process_time(), _children_cpu())
+        self._finished = None
+        self.memory.start()
+        return self
+
+    def stop(self):
+        self.enter(None)
+        self.memory.stop()
+        self._finished = (time.perf_counter(), time.process_time(), _children_cpu())
+
+    def __enter__(self) -> 'RenderProfiler':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def enter(self, stage: Optional[str]):
+        """Make `stage` the current stage (None ends the current one)"""
+        if stage == self._stage:
+            return
+        now = (time.perf_counter(), time.process_time())
+        with self._lock:
+            if self._stage is not None:
+                totals = self.stages.setdefault(self._stage, [0.0, 0.0, 0])
+                totals[0] += now[0] - self._stage_start[0]
+                totals[1] += now[1] - self._stage_start[1]
+                totals[2] += 1
+            self._stage, self._stage_start = stage, now
+
+    def timed(self, name: str, function: Callable[..., T]) -> Callable[..., T]:
+        """`function`, recording the duration of every call under `name`"""
+        timings = self.timings.setdefault(name, [])
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timings.append(time.perf_counter() - start)
+        return wrapper
+
+    def timed_iter(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """`items`, recording how long the consumer spends on each one under `name`"""
+        timings = self.timings.setdefault(name, [])
+        for item in items:
+            start = time.perf_counter()
+            yield item
+            timings.append(time.perf_counter() - start)
+
+    def report(self) -> Dict:
+        """Stage, frame and memory statistics as JSON-serializable data"""
+        if self._started is None:
+            raise RuntimeError("Profiler was never started")
+        finished = self._finished or (time.perf_counter(), time.process_time(), _children_cpu())
+        stages = {name: {'wall_s': round(wall, 4), 'cpu_s': round(cpu, 4), 'count': count}
+                  for name, (wall, cpu, count) in self.stages.items()}
+
+        frames = {}
+        for name, timings in self.timings.items():
+            if not timings:
+                continue
+            ordered = sorted(timings)
+            stats = {'count': len(ordered), 'total_s': round(sum(ordered), 4),
+                     'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3)}
+            for q in PERCENTILES:
+                stats[f'p{q}_ms'] = round(percentile(ordered, q) * 1000, 3)
+            stats['max_ms'] = round(ordered[-1] * 1000, 3)
+            frames[name] = stats
+
+        return {
+            'wall_s': round(finished[0] - self._started[0], 4),
+            'cpu_s': round(finished[1] - self._started[1], 4),
+            'ffmpeg_cpu_s': round(finished[2] - self._started[2], 4),
+            'stages': stages,
+            'frames': frames,
+            'memory': self.memory.report(),
+        }
+
+
+def format_report(report: Dict) -> str:
+    """Human-readable summary of a profiler report"""
+    lines = [f"Total: {report['wall_s']:.2f} s wall, {report['cpu_s']:.2f} s CPU, "
+             f"{report['ffmpeg_cpu_s']:.2f} s ffmpeg CPU"]
+    for name, stage in report['stages'].items():
+        lines.append(f"  {name:<12} {stage['wall_s']:8.3f} s wall {stage['cpu_s']:8.3f} s CPU")
+    for name, stats in report['frames'].items():
+        lines.append(f"  {name:<18} n={stats['count']:<5} p50 {stats['p50_ms']:7.2f} ms  "
+                     f"p95 {stats['p95_ms']:7.2f} ms  p99 {stats['p99_ms']:7.2f} ms")
+    memory = report['memory']
+    lines.append(f"Peak RSS: {memory['peak_rss_mb']:.1f} MB (ffmpeg {memory['peak_ffmpeg_rss_mb']:.1f} MB)")
+    return '\n'.join(lines)
@@ -0,0 +1,75 @@
+"""Render progress reporting.
+
+Progress callbacks take ``(fraction, stage)``: the overall fraction of the
+render in [0, 1] and a short description of the current stage.
+``RenderProgress`` maps per-stage counts (e.g. frames encoded out of the
+total) onto that overall range, so every part of the pipeline can report
+in its own units.  With a ``profiler`` (see profiling.py) the same stage
+reports also delimit the profiler's stage timings.
+"""
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from profiling import RenderProfiler
+
+ProgressCallback = Callable[[float, str], None]
+
+# Share of the overall progress bar taken by each render stage
+STAGES: Dict[str, Tuple[float, float]] = {
+    'script': (0.0, 0.02),
+    'background': (0.02, 0.15),
+    'text': (0.15, 0.2),
+    'audio': (0.2, 0.25),
+    'frames': (0.25, 0.97),
+    'mux': (0.97, 1.0),
+    'cached': (1.0, 1.0),
+}
+
+STAGE_LABELS = {
+    'script': "🤖 Writing the script",
+    'background': "🎨 Rendering the background",
+    'text': "✍️ Rasterizing text overlays",
+    'audio': "🎵 Mixing music and narration",
+    'frames': "🎬 Encoding frames",
+    'mux': "📦 Muxing the MP4",
+    'cached': "⚡ Served from the render cache",
+}
+
+# Intermediate updates closer together than this are dropped
+MIN_INTERVAL = 0.2
+
+
+class RenderProgress:
+    """Maps stage-local progress onto one overall (fraction, stage) callback"""
+
+    def __init__(self, callback: Optional[ProgressCallback] = None, min_interval: float = MIN_INTERVAL,
+                 profiler: Optional['RenderProfiler'] = None):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.profiler = profiler
+        self._last_report = 0.0
+
+    @classmethod
+    def wrap(cls, progress: Union['RenderProgress', ProgressCallback, None]) -> 'RenderProgress':
+        """Accept either a RenderProgress or a plain callback (or None)"""
+        return progress if isinstance(progress, RenderProgress) else cls(progress)
+
+    def __call__(self, stage: str, done: int = 0, total: int = 1):
+        """Report `done` out of `total` units of work in `stage`"""
+        if self.profiler is not None:
+            self.profiler.enter(stage)
+        if self.callback is None:
+            return
+        # Stage starts and ends always go through; updates in between are throttled
+        now = time.monotonic()
+        if 0 < done < total and now - self._last_report < self.min_interval:
+            return
+        self._last_report = now
+
+        begin, end = STAGES[stage]
+        fraction = begin + (end - begin) * (min(done / total, 1.0) if total else 1.0)
+        label = STAGE_LABELS[stage]
+        if total > 1:
+            label = f"{label} ({done}/{total})"
+        self.callback(fraction, label)
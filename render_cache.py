@@ -0,0 +1,136 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+from PIL import Image
+
+from config import cache_path
+
+# Bump when the rendering pipeline changes, so stale outputs are not served
+RENDER_VERSION = 4
+
+
+class CachedRender(NamedTuple):
+    video: bytes
+    thumbnail: bytes
+    metadata: Dict
+
+
+def render_key(script: Dict, params: Dict) -> str:
+    """Content hash of a resolved script plus the render parameters"""
+    payload = json.dumps({'version': RENDER_VERSION, 'script': script, 'params': params},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def encode_thumbnail(frame: np.ndarray, quality: int = 90) -> bytes:
+    """JPEG bytes of an RGB frame"""
+    buffer = io.BytesIO()
+    Image.fromarray(frame).save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+class RenderCache:
+    """Content-addressed store of finished renders (MP4, thumbnail, metadata).
+
+    Entries live under ``directory/<key[:2]>/<key>.*`` and are evicted
+    least-recently-used first (by file mtime, refreshed on every hit) once
+    the total size exceeds ``max_bytes``.  The directory can be shared by
+    several processes.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 2 * 1024 ** 3):
+        self.directory = directory or cache_path('renders')
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str, extension: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.{extension}')
+
+    def get(self, key: str) -> Optional[CachedRender]:
+        """Stored render for `key`, or None"""
+        paths = [self._path(key, extension) for extension in ('mp4', 'jpg', 'json')]
+        try:
+            contents = []
+            for path in paths:
+                with open(path, 'rb') as handle:
+                    contents.append(handle.read())
+            for path in paths:
+                os.utime(path)  # Mark as recently used
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        video, thumbnail, metadata = contents
+        return CachedRender(video, thumbnail, json.loads(metadata))
+
+    def put(self, key: str, video: bytes, thumbnail: bytes, metadata: Optional[Dict] = None):
+        """Store a render; the metadata file is written last and marks the entry complete"""
+        os.makedirs(os.path.join(self.directory, key[:2]), exist_ok=True)
+        contents = {
+            'mp4': video,
+            'jpg': thumbnail,
+            'json': json.dumps(metadata or {}, default=str).encode('utf-8'),
+        }
+        for extension, data in contents.items():
+            path = self._path(key, extension)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        # Whole entries go together: sort by mtime, then drop every file of the key
+        for _, _, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            key = os.path.basename(path).split('.')[0]
+            for extension in ('json', 'mp4', 'jpg'):
+                entry_path = self._path(key, extension)
+                try:
+                    size = os.path.getsize(entry_path)
+                    os.remove(entry_path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+_default_cache: Optional[RenderCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    """Process-wide render cache, bounded by AI_SHORTS_RENDER_CACHE_MB"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            max_mb = int(os.getenv('AI_SHORTS_RENDER_CACHE_MB', '2048'))
+            _default_cache = RenderCache(max_bytes=max_mb * 1024 * 1024)
+        return _default_cache
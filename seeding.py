@@ -0,0 +1,24 @@
+"""Per-request random state.
+
+Every render is driven by one integer seed: script choices draw from a
+``random.Random`` seeded with it, and per-frame noise derives its own
+numpy stream from (seed, frame), so a render is reproducible no matter how
+its frames are split across processes.  The seed is recorded in the
+render metadata.  numpy is only imported once a Generator is needed.
+"""
+import secrets
+from typing import Optional
+
+
+def resolve_seed(seed: Optional[int] = None) -> int:
+    """`seed`, or a fresh random 32-bit seed when None"""
+    if seed is not None:
+        return int(seed)
+    return secrets.randbits(32)
+
+
+def make_rng(seed: int, *keys: int):
+    """Independent numpy Generator for `seed` and an optional stream key (e.g. a frame index)"""
+    import numpy as np
+
+    return np.random.default_rng([seed, *keys])
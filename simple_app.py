@@ -1,23 +1,17 @@
 import streamlit as st
-import time
-import base64
-from datetime import datetime
-import tempfile
-import os
-from moviepy.editor import *
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+import math
+import random
 
-# Page configuration - Mobile friendly
-st.set_page_config(
-    page_title="🎬 AI Shorts Maker",
-    page_icon="🎬",
-    layout="centered",
-    initial_sidebar_state="collapsed"
-)
+# The render stack (numpy, PIL, moviepy, ffmpeg) is imported inside the
+# render functions, which run in the job workers, so the UI starts fast
+from engine import QueueFullError
+from job_ui import download_video, get_engine, show_job, show_render_stats
+from profiles import get_profile
+from progress import RenderProgress
+from seeding import resolve_seed
 
 # Enhanced CSS for mobile-friendly design
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     /* Hide Streamlit branding */
     #MainMenu {visibility: hidden;}
@@ -118,7 +112,19 @@ st.markdown("""
         }
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+def setup_page():
+    """Configure the page (kept out of import time so render workers can import this module)"""
+    # Page configuration - Mobile friendly
+    st.set_page_config(
+        page_title="🎬 AI Shorts Maker",
+        page_icon="🎬",
+        layout="centered",
+        initial_sidebar_state="collapsed"
+    )
+    
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 class SimpleVideoMaker:
     def __init__(self):
@@ -157,36 +163,40 @@ class SimpleVideoMaker:
         else:
             return 'lifestyle'
     
-    def create_simple_video(self, user_prompt, selected_template=None):
+    def create_simple_video(self, user_prompt, selected_template=None, progress=None, rng=None):
+        from backgrounds import PulseBackground, get_background_cache
+        from compositor import Layer, TimelineCompositor
+        from moviepy.editor import VideoClip
+        from text_cache import get_text_cache
+        from transforms import make_sprite
+        
+        progress = RenderProgress.wrap(progress)
         try:
             # Determine category and template
+            progress('script', 0)
             category = self.detect_category(user_prompt)
             
             if selected_template:
                 hook = selected_template
             else:
-                hook = np.random.choice(self.viral_templates[category])
+                rng = rng if rng is not None else random.Random(resolve_seed())
+                hook = rng.choice(self.viral_templates[category])
+            progress('script', 1)
             
             # Create colorful background
-            def make_gradient_frame(t):
-                colors = {
-                    'money': [(34, 139, 34), (0, 100, 0)],    # Green
-                    'tech': [(0, 191, 255), (138, 43, 226)],   # Blue-Purple
-                    'motivation': [(255, 69, 0), (255, 140, 0)], # Orange
-                    'lifestyle': [(255, 182, 193), (255, 160, 122)] # Pink-Orange
-                }
-                
-                color1, color2 = colors[category]
-                
-                # Smooth color transition
-                ratio = (np.sin(t * 0.5) + 1) / 2
-                final_color = tuple(int(c1 * (1-ratio) + c2 * ratio) for c1, c2 in zip(color1, color2))
-                
-                frame = np.full((720, 720, 3), final_color, dtype=np.uint8)
-                return frame
+            colors = {
+                'money': [(34, 139, 34), (0, 100, 0)],    # Green
+                'tech': [(0, 191, 255), (138, 43, 226)],   # Blue-Purple
+                'motivation': [(255, 69, 0), (255, 140, 0)], # Orange
+                'lifestyle': [(255, 182, 193), (255, 160, 122)] # Pink-Orange
+            }
+            
+            # Smooth color transition, rendered once per category and cached
+            background = PulseBackground(colors[category])
+            cached_background = get_background_cache().get(background, fps=30, progress=progress)
             
             # Create 30-second background
-            bg_clip = VideoClip(make_gradient_frame, duration=30)
+            bg_clip = VideoClip(cached_background.make_frame, duration=30)
             
             # Create text clips with perfect timing
             texts = [
@@ -197,25 +207,29 @@ class SimpleVideoMaker:
                 {"text": "Follow for more tips! 👆", "start": 20, "duration": 10, "size": 42, "pos": (360, 550)}
             ]
             
-            text_clips = []
-            for text_info in texts:
-                txt_clip = TextClip(
+            text_cache = get_text_cache()
+            text_layers = []
+            for i, text_info in enumerate(texts):
+                progress('text', i, len(texts))
+                raster = text_cache.get(
                     text_info["text"],
                     fontsize=text_info["size"],
                     color='white',
                     font='Arial-Bold',
                     stroke_color='black',
                     stroke_width=3,
-                    size=(680, None),
-                    method='caption'
-                ).set_duration(text_info["duration"]).set_start(text_info["start"]).set_position('center')
+                    wrap_width=680
+                )
                 
-                # Add subtle animation
-                txt_clip = txt_clip.resize(lambda t: 1 + 0.05 * np.sin(t * 2))
-                text_clips.append(txt_clip)
+                # Add subtle animation from pre-scaled variants
+                sprite = make_sprite(raster, scale=lambda t: 1 + 0.05 * math.sin(t * 2))
+                text_layers.append(Layer(sprite, text_info["start"], text_info["duration"], 'center'))
+            progress('text', len(texts), len(texts))
             
-            # Combine everything
-            final_video = CompositeVideoClip([bg_clip] + text_clips)
+            # Combine everything in one pass; frames where neither the gradient
+            # color nor any text sprite changed reuse the previous canvas
+            final_video = TimelineCompositor(bg_clip.get_frame, text_layers, 30, (720, 720),
+                                             background_key=cached_background.frame_key).as_clip()
             
             return final_video, hook, category
             
@@ -223,7 +237,86 @@ class SimpleVideoMaker:
             st.error(f"Error creating video: {str(e)}")
             return None, None, None
 
+# Stateless, so one instance serves every session and every job in a worker process
+VIDEO_MAKER = SimpleVideoMaker()
+
+def render_job(params, progress, preview=None):
+    """Job queue handler: render and encode a short in a worker process"""
+    from encoder import encode_clip
+    from preview import render_preview
+    from render_cache import encode_thumbnail, get_render_cache, render_key
+    
+    progress = RenderProgress(progress)
+    maker = VIDEO_MAKER
+    prompt = params['prompt']
+    profile = get_profile(params.get('profile'))
+    
+    # Resolve the hook up front: prompt, hook and category fully determine the video
+    category = maker.detect_category(prompt)
+    seed = resolve_seed(params.get('seed'))
+    hook = params.get('template') or random.Random(seed).choice(maker.viral_templates[category])
+    cache = get_render_cache()
+    key = render_key({'prompt': prompt, 'hook': hook, 'category': category},
+                     {'renderer': 'simple_app', 'fps': 30, 'encoding': profile._asdict()})
+    cached = cache.get(key)
+    if cached is not None:
+        progress('cached', 1)
+        return cached.video, dict(cached.metadata, seed=seed, cache_hit=True)
+    
+    video, hook, category = maker.create_simple_video(prompt, hook, progress)
+    if not video:
+        raise RuntimeError("Failed to create video")
+    if preview is not None:
+        preview(render_preview(video.get_frame, video.duration))
+    reused = video.compositor.reused_frames
+    video_bytes = encode_clip(video, fps=30, progress=progress, profile=profile)
+    metadata = {'hook': hook, 'category': category, 'seed': seed,
+                'deduplicated_frames': video.compositor.reused_frames - reused}
+    cache.put(key, video_bytes, encode_thumbnail(video.get_frame(2.0)), metadata)
+    return video_bytes, dict(metadata, cache_hit=False)
+
+def show_result(job, video_bytes):
+    """Finished render: video info, the player, a download button and posting tips"""
+    st.markdown("""
+    <div class="success-box">
+        <h2>🎉 SUCCESS! Your viral short is ready!</h2>
+        <p>Get ready to go viral! 🚀</p>
+    </div>
+    """, unsafe_allow_html=True)
+    show_render_stats(job['metadata'])
+    
+    # Video info
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("📱 Format", "720p Vertical")
+        st.metric("⏱️ Duration", "30 seconds")
+    with col2:
+        st.metric("🎯 Category", job['metadata']['category'].title())
+        st.metric("🔥 Hook Used", "Custom")
+    
+    # Display video
+    st.markdown("### 🎬 Your Viral Short:")
+    st.video(video_bytes, format="video/mp4")
+    
+    # Download section
+    st.markdown("### 📥 Download Your Video:")
+    download_video(video_bytes, "📱 Download for Instagram/TikTok", name='viral_short',
+                   help="Download your video and upload to Instagram Reels, TikTok, YouTube Shorts!")
+    
+    # Social media tips
+    st.markdown("""
+    <div class="feature-card">
+        <h4>📈 Tips to Go Viral:</h4>
+        <p>✅ Post between 7-9 PM for maximum engagement</p>
+        <p>✅ Use trending hashtags in your niche</p>
+        <p>✅ Respond to comments within first hour</p>
+        <p>✅ Cross-post on all platforms (Instagram, TikTok, YouTube)</p>
+    </div>
+    """, unsafe_allow_html=True)
+
 def main():
+    setup_page()
+    
     # Header
     st.markdown("""
     <div class="app-header">
@@ -232,11 +325,8 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Initialize video maker
-    if 'video_maker' not in st.session_state:
-        st.session_state.video_maker = SimpleVideoMaker()
-    
-    video_maker = st.session_state.video_maker
+    # Shared, stateless video maker (no per-session instance needed)
+    video_maker = VIDEO_MAKER
     
     # Simple 3-step process
     st.markdown("""
@@ -278,86 +368,21 @@ def main():
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             if st.button("🎬 CREATE MY VIRAL SHORT!", key="generate_main"):
-                # Show loading animation
-                with st.spinner("✨ Creating your viral masterpiece..."):
-                    
-                    # Progress bar with fun messages
-                    progress_bar = st.progress(0)
-                    status_messages = [
-                        "🤖 AI analyzing your idea...",
-                        "🎨 Designing viral graphics...",
-                        "✨ Adding engagement hooks...",
-                        "🔥 Optimizing for maximum views...",
-                        "🎬 Finalizing your masterpiece..."
-                    ]
-                    
-                    for i in range(100):
-                        time.sleep(0.05)  # Faster progress
-                        progress_bar.progress(i + 1)
-                        
-                        if i % 20 == 0 and i < 80:
-                            st.write(status_messages[i // 20])
-                    
-                    # Create the video
-                    video, hook, detected_category = video_maker.create_simple_video(user_prompt, selected_template)
-                    
-                    if video:
-                        st.markdown("""
-                        <div class="success-box">
-                            <h2>🎉 SUCCESS! Your viral short is ready!</h2>
-                            <p>Get ready to go viral! 🚀</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Video info
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.metric("📱 Format", "720p Vertical")
-                            st.metric("⏱️ Duration", "30 seconds")
-                        with col2:
-                            st.metric("🎯 Category", detected_category.title())
-                            st.metric("🔥 Hook Used", "Custom")
-                        
-                        # Save and display video
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_file:
-                            video_path = tmp_file.name
-                            video.write_videofile(video_path, fps=30, audio=False, verbose=False, logger=None)
-                        
-                        # Display video
-                        st.markdown("### 🎬 Your Viral Short:")
-                        st.video(video_path)
-                        
-                        # Download section
-                        st.markdown("### 📥 Download Your Video:")
-                        with open(video_path, "rb") as video_file:
-                            video_bytes = video_file.read()
-                            
-                        filename = f"viral_short_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
-                        
-                        st.download_button(
-                            label="📱 Download for Instagram/TikTok",
-                            data=video_bytes,
-                            file_name=filename,
-                            mime="video/mp4",
-                            help="Download your video and upload to Instagram Reels, TikTok, YouTube Shorts!"
-                        )
-                        
-                        # Social media tips
-                        st.markdown("""
-                        <div class="feature-card">
-                            <h4>📈 Tips to Go Viral:</h4>
-                            <p>✅ Post between 7-9 PM for maximum engagement</p>
-                            <p>✅ Use trending hashtags in your niche</p>
-                            <p>✅ Respond to comments within first hour</p>
-                            <p>✅ Cross-post on all platforms (Instagram, TikTok, YouTube)</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Cleanup
-                        os.unlink(video_path)
-                        
-                    else:
-                        st.error("❌ Something went wrong. Please try again!")
+                # Queue the render; a worker process picks it up and reports its
+                # real progress, which show_job polls below
+                try:
+                    st.session_state.job_id = get_engine().submit('simple_app', {
+                        'prompt': user_prompt,
+                        'template': selected_template
+                    })
+                except QueueFullError:
+                    st.error("🚦 Lots of people are creating shorts right now. Please try again in a minute!")
+        
+        # Status, preview and download of the current render
+        if 'job_id' in st.session_state:
+            show_job(st.session_state.job_id, show_result, working="✨ Creating your viral masterpiece...",
+                     preview_caption="👀 Sneak peek: your HD video appears here in a moment",
+                     failed="❌ Something went wrong. Please try again!")
     
     # Quick examples section
     if not user_prompt:
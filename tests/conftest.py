@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep on-disk caches out of ~/.cache and narrate offline (config.py reads
+# the cache root at import, so this has to happen before any repo import)
+os.environ['AI_SHORTS_CACHE_DIR'] = tempfile.mkdtemp(prefix='ai-shorts-tests-')
+os.environ['AI_SHORTS_TTS'] = 'standin'
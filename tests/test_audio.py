@@ -0,0 +1,109 @@
+import os
+import sys
+import types
+import wave
+
+import numpy as np
+import pytest
+
+import audio
+from audio import SAMPLE_RATE, AudioPipeline, default_tts, tts_standin
+
+CUES = [(0, 1.5, "Stop scrolling right now"), (1.5, 1.5, "Follow for more tips")]
+
+
+def read_wav(path):
+    with wave.open(path, 'rb') as handle:
+        assert handle.getnchannels() == 1
+        assert handle.getframerate() == SAMPLE_RATE
+        return np.frombuffer(handle.readframes(handle.getnframes()), dtype='<i2')
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    return AudioPipeline(str(tmp_path), tts='standin', music_dir=str(tmp_path / 'no-music'))
+
+
+def test_standin_voice_is_deterministic():
+    assert np.array_equal(tts_standin("Stop scrolling"), tts_standin("Stop scrolling"))
+    assert not np.array_equal(tts_standin("Stop scrolling"), tts_standin("Keep scrolling"))
+
+
+def test_mix_has_the_requested_length(pipeline):
+    samples = read_wav(pipeline.mix(CUES, 3.0, 'upbeat'))
+    assert len(samples) == 3 * SAMPLE_RATE
+    assert np.abs(samples).max() > 0
+
+
+def test_mix_is_cached(pipeline):
+    path = pipeline.mix(CUES, 3.0, 'upbeat')
+    modified = os.path.getmtime(path)
+    assert pipeline.mix(CUES, 3.0, 'upbeat') == path
+    assert os.path.getmtime(path) == modified
+    assert pipeline.mix(CUES[:1], 3.0, 'upbeat') != path
+
+
+def test_narration_is_mixed_over_the_music(pipeline):
+    narrated = read_wav(pipeline.mix(CUES, 3.0, 'upbeat')).astype(np.int32)
+    music = read_wav(pipeline.mix(CUES, 3.0, 'upbeat', narration=False)).astype(np.int32)
+    assert not np.array_equal(narrated, music)
+    voice_only = read_wav(pipeline.mix(CUES, 3.0, None))
+    assert np.abs(voice_only[:SAMPLE_RATE]).max() > 0
+
+
+def test_without_tts_mixes_are_music_only(tmp_path, pipeline):
+    silent = AudioPipeline(str(tmp_path / 'silent'), tts='standin', music_dir=pipeline.music_dir)
+    silent.tts = None
+    assert silent.render_tag == 'music'
+    assert np.array_equal(read_wav(silent.mix(CUES, 3.0, 'upbeat')),
+                          read_wav(pipeline.mix(CUES, 3.0, 'upbeat', narration=False)))
+
+
+def unavailable(text, sample_rate):
+    raise RuntimeError("no network")
+
+
+def test_failing_tts_falls_back_to_music_only(pipeline, monkeypatch):
+    monkeypatch.setitem(audio.TTS_ENGINES, 'standin', unavailable)
+    assert np.array_equal(read_wav(pipeline.mix(CUES, 3.0, 'upbeat')),
+                          read_wav(pipeline.mix(CUES, 3.0, 'upbeat', narration=False)))
+
+
+def test_mix_tag_reports_what_was_mixed(pipeline, monkeypatch, caplog):
+    assert pipeline.mix_tagged(CUES, 3.0, 'upbeat').tag == 'standin'
+    assert pipeline.mix_tagged(CUES, 3.0, 'upbeat', narration=False).tag == 'music'
+    assert pipeline.mix_tagged([], 3.0, 'upbeat').tag == 'music'
+
+    monkeypatch.setitem(audio.TTS_ENGINES, 'standin', unavailable)
+    fallback = pipeline.mix_tagged([(0, 2, "A line that was never spoken")], 3.0, 'upbeat')
+    assert fallback.tag == 'music'
+    assert "TTS engine 'standin' failed" in caplog.text
+
+
+def test_standin_is_never_the_default(monkeypatch):
+    monkeypatch.delenv('AI_SHORTS_TTS', raising=False)
+    monkeypatch.setattr(audio, 'tts_available', lambda engine: False)
+    assert default_tts() is None
+    monkeypatch.setattr(audio, 'tts_available', lambda engine: engine == 'gtts')
+    assert default_tts() == 'gtts'
+    # The offline engine wins: gTTS importing says nothing about the network
+    monkeypatch.setattr(audio, 'tts_available', lambda engine: True)
+    assert default_tts() == 'espeak'
+    monkeypatch.setenv('AI_SHORTS_TTS', 'standin')
+    assert default_tts() == 'standin'
+
+
+def test_gtts_calls_time_out(monkeypatch):
+    requests = []
+
+    class FakeGTTS:
+        def __init__(self, text, lang='en', timeout=None):
+            requests.append(timeout)
+
+        def write_to_fp(self, handle):
+            raise TimeoutError("read timed out")
+
+    monkeypatch.setitem(sys.modules, 'gtts', types.SimpleNamespace(gTTS=FakeGTTS))
+    with pytest.raises(TimeoutError):
+        audio.tts_gtts("Stop scrolling")
+    assert requests == [audio.TTS_TIMEOUT]
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import batch
+from ai_generator import AIVideoEngine
+from audio import AudioPipeline
+from backgrounds import BackgroundCache
+from fanout import PLATFORM_SPECS
+from profiles import get_profile
+from render_cache import RenderCache
+from text_cache import TextRasterCache
+
+PROMPT = "How to make money with AI in 2024"
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = AIVideoEngine(background_cache=BackgroundCache(), text_cache=TextRasterCache(),
+                           render_cache=RenderCache(str(tmp_path / 'renders')),
+                           audio_pipeline=AudioPipeline(str(tmp_path / 'audio'), tts='standin',
+                                                        music_dir=str(tmp_path / 'no-music')),
+                           encoding_profile='preview')
+    monkeypatch.setattr(batch, '_engine', engine)
+    return engine
+
+
+def test_metadata_describes_each_platform_render(engine, tmp_path, monkeypatch):
+    # Short platform limits keep the renders small
+    monkeypatch.setitem(PLATFORM_SPECS, 'instagram', dict(PLATFORM_SPECS['instagram'], duration=1))
+    monkeypatch.setitem(PLATFORM_SPECS, 'tiktok', dict(PLATFORM_SPECS['tiktok'], size=(360, 640), duration=2))
+
+    result = batch.render_job(0, PROMPT, ['instagram', 'tiktok'], str(tmp_path), seed=1, profile='preview')
+    with open(result['metadata_path']) as handle:
+        metadata = json.load(handle)
+    assert metadata == json.loads(json.dumps(result['metadata'], default=str))
+    assert set(metadata['outputs']) == {'instagram', 'tiktok'}
+
+    instagram, tiktok = metadata['platforms']['instagram'], metadata['platforms']['tiktok']
+    assert (instagram['resolution'], instagram['duration']) == ('720x720', 1)
+    assert (tiktok['resolution'], tiktok['duration']) == ('360x640', 2)
+    assert tiktok['encoding'] == get_profile('preview')._asdict()
+    assert instagram['cache_hit'] is False
+
+    again = batch.render_job(1, PROMPT, ['instagram'], str(tmp_path), seed=1, profile='preview')
+    assert again['metadata']['platforms']['instagram']['cache_hit'] is True
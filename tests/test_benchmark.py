@@ -0,0 +1,17 @@
+from benchmark import compare, machine_info, machine_mismatch
+
+
+def test_baseline_machine_must_match():
+    here = machine_info()
+    assert machine_mismatch(dict(here), here) == []
+    assert machine_mismatch(dict(here, cpus=(here['cpus'] or 1) + 1), here) == \
+        [f"cpus {(here['cpus'] or 1) + 1} there, {here['cpus']} here"]
+    assert machine_mismatch(None, here) == ["the baseline does not record its machine"]
+
+
+def test_compare_reports_regressions_and_missing_timings():
+    baseline = {'compose_ms': 10.0, 'encode_ms': 20.0, 'compose_fps': 6.0}
+    assert compare({'compose_ms': 11.0, 'encode_ms': 21.0, 'compose_fps': 5.9}, baseline, 0.25) == []
+    regressions = compare({'compose_ms': 20.0, 'compose_fps': 3.0}, baseline, 0.25)
+    assert len(regressions) == 3
+    assert any(line.startswith('encode_ms') and 'missing' in line for line in regressions)
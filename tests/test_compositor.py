@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+
+from backgrounds import BackgroundCache, PulseBackground
+from compositor import Layer, TimelineCompositor
+from text_cache import TextRasterCache
+from transforms import make_sprite
+
+SIZE = (360, 360)
+
+
+def text_layers(size=SIZE):
+    """Overlapping, animated, static and partly off-screen layers that come and go"""
+    cache = TextRasterCache()
+    style = dict(fontsize=32, color='white', stroke_color='black', stroke_width=2, wrap_width=size[0] - 40)
+    return [
+        Layer(make_sprite(cache.get("Stop scrolling", **style), scale=lambda t: 1 + 0.1 * math.sin(t * 4)),
+              0, 3, ('center', 'top')),
+        Layer(make_sprite(cache.get("In today's video", **style)), 1, 4, 'center'),
+        Layer(make_sprite(cache.get("Follow for more", **style), scale=lambda t: 1 + 0.05 * math.sin(t * 2)),
+              2.5, 5, (-20, 'bottom')),
+        Layer(make_sprite(cache.get("This changes everything", **style)), 4, 2, (size[0] - 60, 100)),
+    ]
+
+
+def assert_matches_full_compose(background, background_key, layers, duration, fps=30):
+    incremental = TimelineCompositor(background, layers, duration, SIZE, background_key=background_key)
+    full = TimelineCompositor(background, layers, duration, SIZE)
+    for index in range(int(duration * fps)):
+        t = index / fps
+        assert np.array_equal(incremental.make_frame(t), full.make_frame(t)), f"frame {index} differs"
+    return incremental
+
+
+def test_incremental_frames_equal_full_compose():
+    # The background changes every second, so patched runs restart from full composes
+    frames = [np.full((SIZE[1], SIZE[0], 3), value, dtype=np.uint8) for value in (40, 90, 140)]
+    frames[1][::7] = 200
+
+    def background(t):
+        return frames[int(t) % len(frames)]
+
+    compositor = assert_matches_full_compose(background, lambda t: int(t) % len(frames), text_layers(), 8)
+    assert compositor.patched_frames > 0
+    assert compositor.reused_frames > 0
+    assert compositor.composed_frames >= 8
+
+
+def test_incremental_frames_equal_full_compose_on_a_cached_background():
+    cached = BackgroundCache().get(PulseBackground(((0, 191, 255), (138, 43, 226)), SIZE), 30)
+    compositor = assert_matches_full_compose(cached.make_frame, cached.frame_key, text_layers(), 30)
+    assert compositor.patched_frames + compositor.reused_frames > 0
+
+
+def test_blend_clips_to_the_canvas_and_bounds():
+    canvas = np.zeros((10, 10, 3), dtype=np.uint8)
+    rgb = np.full((4, 4, 3), 200, dtype=np.uint8)
+    alpha = np.full((4, 4), 0.5, dtype=np.float32)
+    TimelineCompositor.blend(canvas, rgb, alpha, (8, -2))
+    assert canvas[:2, 8:].min() == 100
+    assert canvas[2:].max() == 0 and canvas[:, :8].max() == 0
+
+    canvas[:] = 0
+    TimelineCompositor.blend(canvas, rgb, alpha, (0, 0), bounds=(2, 2, 10, 10), scratch=np.empty(64, np.float32))
+    assert canvas[2:4, 2:4].min() == 100
+    assert canvas[:2].max() == 0 and canvas[:, :2].max() == 0
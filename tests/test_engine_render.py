@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+import audio
+from ai_generator import AIVideoEngine
+from audio import AudioPipeline
+from backgrounds import BackgroundCache, PulseBackground
+from compositor import TimelineCompositor
+from render_cache import RenderCache
+from text_cache import TextRasterCache
+from transforms import AffineAnimation
+
+PROMPT = "How to make money with AI in 2024"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return AIVideoEngine(background_cache=BackgroundCache(), text_cache=TextRasterCache(),
+                         render_cache=RenderCache(str(tmp_path / 'renders')),
+                         audio_pipeline=AudioPipeline(str(tmp_path / 'audio'), tts='standin',
+                                                      music_dir=str(tmp_path / 'no-music')),
+                         encoding_profile='preview')
+
+
+def test_render_fills_the_render_cache(engine):
+    script = engine.generate_viral_script(PROMPT, seed=3)
+    render = engine.render_platforms(script, duration=1)['instagram']
+    assert render.video
+    assert engine.render_platforms(script, duration=1)['instagram'].video == render.video
+    assert engine.render_cache.stats()['hits'] == 1
+
+
+def test_music_only_fallback_is_not_cached(engine, monkeypatch):
+    def unavailable(text, sample_rate):
+        raise RuntimeError("no network")
+
+    monkeypatch.setitem(audio.TTS_ENGINES, 'standin', unavailable)
+    script = engine.generate_viral_script(PROMPT, seed=4)
+    assert engine.render_platforms(script, duration=1)['instagram'].video
+    assert engine.render_cache.stats()['hits'] == 0
+
+    # Once the voice is back, the same request is narrated rather than served the music-only render
+    monkeypatch.undo()
+    engine.render_platforms(script, duration=1)
+    assert engine.render_cache.stats()['hits'] == 0
+
+
+class StaticBackgroundEngine(AIVideoEngine):
+    """Engine whose background only changes slowly and fades in and out, so frames repeat"""
+
+    def cached_background(self, category, duration=30, fps=30, progress=None, seed=None, size=(720, 720)):
+        return self.background_cache.get(PulseBackground(((0, 191, 255), (138, 43, 226)), size, speed=0.05),
+                                         fps, progress)
+
+    def viral_animation(self):
+        return AffineAnimation(fade_in=0.2, fade_out=0.2)
+
+
+def test_render_deduplicates_unchanged_frames(tmp_path):
+    engine = StaticBackgroundEngine(background_cache=BackgroundCache(), text_cache=TextRasterCache(),
+                                    render_cache=RenderCache(str(tmp_path / 'renders')), encoding_profile='preview')
+    script = engine.generate_viral_script(PROMPT, seed=5)
+    render = engine.render_platforms(script, audio=False, duration=2)['instagram']
+    assert render.metadata['deduplicated_frames'] > 0
+
+
+def test_deduplicated_frames_match_a_full_compose(tmp_path):
+    engine = StaticBackgroundEngine(background_cache=BackgroundCache(), text_cache=TextRasterCache())
+    script = engine.generate_viral_script(PROMPT, seed=5)
+    compositor = engine.build_compositor(script, size=(360, 360), duration=4)
+    full = TimelineCompositor(compositor.background, compositor.layers, compositor.duration, compositor.size)
+    for index in range(4 * 30):
+        assert np.array_equal(compositor.make_frame(index / 30), full.make_frame(index / 30)), index
+    assert compositor.reused_frames + compositor.patched_frames > 0
+
+
+def test_dynamic_background_frames_are_never_deduplicated(engine):
+    # Noise and the moving wave change every frame, so frames must not be keyed as repeats
+    compositor = engine.build_compositor(engine.generate_viral_script(PROMPT, seed=5), size=(360, 360), duration=1)
+    for index in range(30):
+        compositor.make_frame(index / 30)
+    assert compositor.composed_frames == 30
+
+
+def test_profile_separates_setup_from_script(engine):
+    from profiling import RenderProfiler
+
+    with RenderProfiler() as profiler:
+        render = engine.render_short(PROMPT, seed=6, profiler=profiler, duration=1)
+    stages = render.metadata['profile']['stages']
+    assert {'script', 'setup', 'frames'} <= set(stages)
+    assert stages['script']['wall_s'] < 0.05
@@ -0,0 +1,126 @@
+import threading
+
+import numpy as np
+import pytest
+
+import fanout
+from fanout import FramePool, Variant, fit_frame, render_variants
+
+FPS = 10
+
+
+class FakeCompositor:
+    """Draws the frame index into a reused canvas"""
+    reused = False
+
+    def __init__(self, size, duration):
+        self.size, self.duration = size, duration
+        self.canvas = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+
+    def make_frame(self, t):
+        self.canvas[:] = int(round(t * FPS)) % 256
+        return self.canvas
+
+
+class FakeEncoder:
+    """Collects copies of the frames; `fail_after` raises like a dead ffmpeg"""
+    fail_after = {}
+    frames = {}
+
+    def __init__(self, size, fps, profile=None, audio=None, duration=None):
+        self.size = size
+
+    def encode(self, frames):
+        collected = FakeEncoder.frames.setdefault(self.size, [])
+        for frame in frames:
+            if len(collected) == FakeEncoder.fail_after.get(self.size):
+                raise RuntimeError("ffmpeg exited")
+            collected.append(frame.copy())
+        return b'video'
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    FakeEncoder.fail_after, FakeEncoder.frames = {}, {}
+    monkeypatch.setattr(fanout, 'FFmpegEncoder', FakeEncoder)
+    created = []
+
+    class RecordedPool(FramePool):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(fanout, 'FramePool', RecordedPool)
+    return created
+
+
+def run(compositors, variants, **kwargs):
+    """render_variants on a thread, so a drain bug fails the test instead of hanging it"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['results'] = render_variants(compositors, variants, fps=FPS, **kwargs)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive(), "render_variants did not finish"
+    return outcome
+
+
+def assert_pool_drained(pool):
+    # Only the last composed frame is still held, by the compositor loop
+    assert pool._free.qsize() == len(pool.buffers) - 1
+    assert sorted(pool._holders) == [0] * (len(pool.buffers) - 1) + [1]
+
+
+def test_frame_pool_reuses_a_buffer_once_every_holder_released_it():
+    pool = FramePool((2, 2, 3), count=2)
+    slot = pool.acquire(np.full((2, 2, 3), 7, dtype=np.uint8))
+    assert pool.buffers[slot].min() == 7
+    pool.retain(slot)
+    pool.release(slot)
+    other = pool.acquire(np.zeros((2, 2, 3), dtype=np.uint8))
+    assert other != slot and pool._free.empty()
+    pool.release(slot)
+    assert pool.acquire(np.zeros((2, 2, 3), dtype=np.uint8)) == slot
+    assert pool.nbytes == 2 * 12
+
+
+def test_every_variant_gets_its_frames(pools):
+    native = Variant((8, 8), 'pad', 20)
+    derived = Variant((4, 8), 'pad', 12)
+    outcome = run([FakeCompositor((8, 8), 2)], [native, derived], frames_in_flight=3, queue_size=2)
+    assert outcome['results'] == {native: b'video', derived: b'video'}
+
+    frames = FakeEncoder.frames
+    assert [int(frame[0, 0, 0]) for frame in frames[native.size]] == list(range(20))
+    expected = [fit_frame(np.full((8, 8, 3), index, dtype=np.uint8), derived.size, 'pad') for index in range(12)]
+    assert all(np.array_equal(frame, want) for frame, want in zip(frames[derived.size], expected))
+    assert len(frames[derived.size]) == 12
+    for pool in pools:
+        assert_pool_drained(pool)
+
+
+def test_failed_encoder_is_drained_without_blocking_the_others(pools):
+    failing = Variant((4, 4), 'pad', 30)
+    healthy = Variant((8, 8), 'pad', 30)
+    FakeEncoder.fail_after = {failing.size: 2}
+    outcome = run([FakeCompositor((8, 8), 3)], [failing, healthy], frames_in_flight=2, queue_size=1)
+
+    assert str(outcome['error']) == "ffmpeg exited"
+    assert len(FakeEncoder.frames[failing.size]) == 2
+    assert [int(frame[0, 0, 0]) for frame in FakeEncoder.frames[healthy.size]] == list(range(30))
+    for pool in pools:
+        assert_pool_drained(pool)
+
+
+def test_stop_ends_composition_early(pools):
+    stop = threading.Event()
+    stop.set()
+    outcome = run([FakeCompositor((8, 8), 3)], [Variant((8, 8), 'pad', 30)], stop=stop)
+    assert outcome['results'] == {Variant((8, 8), 'pad', 30): b'video'}
+    assert FakeEncoder.frames.get((8, 8), []) == []
@@ -0,0 +1,45 @@
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import job_ui
+
+
+def job_page():
+    """Polls a job whose fake engine finishes it on the second status check"""
+    import streamlit as st
+
+    import job_ui
+
+    class FakeEngine:
+        polls = st.session_state.setdefault('polls', [])
+
+        def get(self, job_id):
+            self.polls.append(job_id)
+            status = st.session_state.get('final', 'done') if len(self.polls) > 1 else 'running'
+            return {'status': status, 'position': 0, 'progress': 0.5, 'stage': "🎬 Encoding frames (45/90)",
+                    'preview_path': None, 'metadata': {'cache_hit': True}}
+
+        def read_result(self, job_id):
+            return b'video bytes'
+
+    job_ui.get_engine = FakeEngine
+    job_ui.show_job('job', lambda job, video: st.write(f"result: {len(video)} bytes"), failed="render failed")
+
+
+@pytest.fixture
+def page(monkeypatch):
+    # The page swaps in a fake engine; put the real accessor back afterwards
+    monkeypatch.setattr(job_ui, 'get_engine', job_ui.get_engine)
+    return AppTest.from_function(job_page, default_timeout=10)
+
+
+def test_running_job_is_polled_until_it_finishes(page):
+    page.run()
+    assert page.session_state['polls'] == ['job', 'job']
+    assert [element.value for element in page.markdown] == ["result: 11 bytes"]
+
+
+def test_failed_job_shows_the_apps_message(page):
+    page.session_state['final'] = 'failed'
+    page.run()
+    assert [element.value for element in page.error] == ["render failed"]
@@ -0,0 +1,191 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import engine
+import jobs
+from jobs import DONE, FAILED, MAX_ATTEMPTS, QUEUED, RUNNING, JobQueue, WorkerPool, run_worker
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    # Workers warm the full render stack at startup; these tests do not need it
+    monkeypatch.setattr(engine, 'warm_render_caches', lambda: None)
+    return JobQueue(str(tmp_path / 'jobs'))
+
+
+@pytest.fixture
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def handlers(monkeypatch, **functions):
+    monkeypatch.setattr(jobs, 'load_handler', lambda kind: functions[kind])
+
+
+def test_concurrent_claims_take_each_job_once(queue):
+    submitted = {queue.submit('shorts', {'prompt': f"prompt {i}"}) for i in range(40)}
+    claimed = []
+
+    def claim_all():
+        while True:
+            job = queue.claim()
+            if job is None:
+                return
+            claimed.append(job['id'])
+
+    threads = [threading.Thread(target=claim_all) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(submitted)
+    assert all(queue.get(job_id)['status'] == RUNNING for job_id in submitted)
+    assert queue.pending_count() == 0
+
+
+def test_claims_follow_submission_order(queue):
+    first = queue.submit('shorts', {'prompt': "first"})
+    second = queue.submit('shorts', {'prompt': "second"})
+    assert queue.get(second)['position'] == 1
+    assert queue.claim()['id'] == first
+    assert queue.get(second)['position'] == 0
+
+
+def test_dead_workers_jobs_are_requeued_then_failed(queue, dead_pid):
+    job_id = queue.submit('shorts', {'prompt': "crashes its worker"})
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        assert queue.claim()['attempts'] == attempt
+        queue.update_progress(job_id, 0.5, 'frames')
+        with queue._connect() as connection:
+            connection.execute('UPDATE jobs SET worker_pid = ? WHERE id = ?', (dead_pid, job_id))
+        assert queue.requeue_stale() == 1
+        job = queue.get(job_id)
+        if attempt < MAX_ATTEMPTS:
+            assert (job['status'], job['progress'], job['stage']) == (QUEUED, 0, '')
+
+    assert job['status'] == FAILED
+    assert f"{MAX_ATTEMPTS} attempts" in job['error']
+    assert queue.requeue_stale() == 0
+
+
+def test_live_workers_jobs_are_left_running(queue):
+    job_id = queue.submit('shorts', {'prompt': "still rendering"})
+    queue.claim()
+    assert queue.requeue_stale() == 0
+    assert queue.get(job_id)['status'] == RUNNING
+
+
+def test_restarting_workers_requeues_their_jobs(queue, dead_pid, monkeypatch):
+    pool = WorkerPool(queue, workers=2)
+    spawned = []
+
+    def spawn():
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        spawned.append(process)
+        return process
+
+    monkeypatch.setattr(pool, '_spawn', spawn)
+    pool.processes = [spawn(), spawn()]
+    for process in pool.processes:
+        process.wait()
+
+    job_id = queue.submit('shorts', {'prompt': "orphaned"})
+    queue.claim()
+    with queue._connect() as connection:
+        connection.execute('UPDATE jobs SET worker_pid = ? WHERE id = ?', (dead_pid, job_id))
+
+    assert pool.ensure_running() == 1
+    assert len(spawned) == 4
+    assert queue.get(job_id)['status'] == QUEUED
+    pool.stop()
+
+
+def test_failing_handler_fails_the_job(queue, monkeypatch):
+    def broken(params, progress, preview):
+        raise RuntimeError("no such font")
+
+    handlers(monkeypatch, shorts=broken)
+    job_id = queue.submit('shorts', {'prompt': "broken"})
+    run_worker(queue, poll_interval=0, max_jobs=1)
+
+    job = queue.get(job_id)
+    assert job['status'] == FAILED
+    assert job['error'] == "RuntimeError: no such font"
+    assert job['finished_at'] is not None
+    assert queue.read_result(job_id) is None
+
+
+def test_finished_jobs_store_results_and_previews(queue, monkeypatch):
+    def render(params, progress, preview):
+        preview(b'GIF89a')
+        return b'video ' + params['prompt'].encode(), {'cache_hit': False}
+
+    handlers(monkeypatch, shorts=render)
+    job_id = queue.submit('shorts', {'prompt': "done"})
+    run_worker(queue, poll_interval=0, max_jobs=1)
+
+    job = queue.get(job_id)
+    assert (job['status'], job['progress'], job['stage']) == (DONE, 1, 'done')
+    assert queue.read_result(job_id) == b'video done'
+    assert queue.read_preview(job_id) == b'GIF89a'
+    assert queue.cache_stats() == {'hits': 0, 'misses': 1}
+    assert queue.first_pixel_stats()['jobs'] == 1
+
+
+def test_purge_deletes_expired_jobs_and_their_files(queue, monkeypatch):
+    handlers(monkeypatch, shorts=lambda params, progress, preview: (preview(b'GIF89a'), (b'video', {}))[1])
+    expired, recent = queue.submit('shorts', {'prompt': "old"}), queue.submit('shorts', {'prompt': "new"})
+    run_worker(queue, poll_interval=0, max_jobs=2, retention=3600)
+    running = queue.submit('shorts', {'prompt': "rendering"})
+    queue.claim()
+    paths = [queue.get(expired)['result_path'], queue.get(expired)['preview_path']]
+    with queue._connect() as connection:
+        connection.execute('UPDATE jobs SET finished_at = ? WHERE id = ?', (time.time() - 7200, expired))
+        connection.execute('UPDATE jobs SET created_at = ? WHERE id = ?', (time.time() - 7200, running))
+
+    assert queue.purge(3600) == 1
+    assert queue.get(expired) is None
+    assert not any(os.path.exists(path) for path in paths)
+    assert queue.get(recent)['status'] == DONE
+    assert queue.get(running)['status'] == RUNNING
+    # Files already removed by another worker do not stop the purge
+    with queue._connect() as connection:
+        connection.execute('UPDATE jobs SET finished_at = ? WHERE id = ?', (time.time() - 7200, recent))
+    os.remove(queue.get(recent)['result_path'])
+    assert queue.purge(3600) == 1
+
+
+def test_worker_purges_on_startup(queue, monkeypatch):
+    handlers(monkeypatch, shorts=lambda params, progress, preview: (b'video', {}))
+    job_id = queue.submit('shorts', {'prompt': "old"})
+    run_worker(queue, poll_interval=0, max_jobs=1)
+    with queue._connect() as connection:
+        connection.execute('UPDATE jobs SET finished_at = ? WHERE id = ?', (time.time() - 7200, job_id))
+
+    queue.submit('shorts', {'prompt': "new"})
+    run_worker(queue, poll_interval=0, max_jobs=1, retention=3600)
+    assert queue.get(job_id) is None
+
+
+def test_engine_renders_a_short_through_the_queue(queue, monkeypatch):
+    # A real render with the stand-in voice (AI_SHORTS_TTS=standin, see conftest)
+    monkeypatch.setattr(jobs, '_engine', None)
+    params = {'prompt': "How to make money with AI in 2024", 'seed': 11, 'duration': 1, 'profile': 'preview'}
+    first, second = queue.submit('shorts', params), queue.submit('shorts', params)
+    run_worker(queue, poll_interval=0, max_jobs=2)
+
+    job = queue.get(first)
+    assert job['status'] == DONE, job['error']
+    assert queue.read_result(first)[4:8] == b'ftyp'
+    assert (job['metadata']['duration'], job['metadata']['cache_hit']) == (1, False)
+    assert queue.read_preview(first)[:3] == b'GIF'
+    assert queue.get(second)['metadata']['cache_hit'] is True
+    assert queue.cache_stats() == {'hits': 1, 'misses': 1}
@@ -0,0 +1,58 @@
+import pytest
+
+import engine
+import jobs
+from jobs import JobQueue, run_worker
+from progress import STAGE_LABELS, STAGES, RenderProgress
+
+
+def test_stage_progress_maps_onto_the_overall_bar():
+    reports = []
+    progress = RenderProgress(lambda fraction, label: reports.append((fraction, label)), min_interval=0)
+    progress('script', 0)
+    progress('frames', 45, 90)
+    progress('mux', 1)
+
+    begin, end = STAGES['frames']
+    assert reports[0] == (0.0, STAGE_LABELS['script'])
+    assert reports[1] == (pytest.approx((begin + end) / 2), f"{STAGE_LABELS['frames']} (45/90)")
+    assert reports[2] == (1.0, STAGE_LABELS['mux'])
+
+
+def test_updates_within_a_stage_are_throttled():
+    reports = []
+    progress = RenderProgress(lambda fraction, label: reports.append(fraction), min_interval=60)
+    for done in range(91):
+        progress('frames', done, 90)
+    # Only the stage start and end get through a long interval
+    assert reports == [STAGES['frames'][0], STAGES['frames'][1]]
+
+
+def test_wrap_accepts_callbacks_and_none():
+    progress = RenderProgress()
+    assert RenderProgress.wrap(progress) is progress
+    RenderProgress.wrap(None)('frames', 1, 2)
+
+
+def test_render_progress_reaches_the_job_queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, 'warm_render_caches', lambda: None)
+    monkeypatch.setattr(jobs, '_engine', None)
+    queue = JobQueue(str(tmp_path / 'jobs'))
+    updates = []
+    update_progress = queue.update_progress
+
+    def record(job_id, fraction, stage=''):
+        updates.append((fraction, stage))
+        update_progress(job_id, fraction, stage)
+
+    monkeypatch.setattr(queue, 'update_progress', record)
+    job_id = queue.submit('shorts', {'prompt': "Morning routine tips", 'seed': 2, 'duration': 1,
+                                     'profile': 'preview'})
+    run_worker(queue, poll_interval=0, max_jobs=1)
+
+    fractions = [fraction for fraction, _ in updates]
+    assert fractions == sorted(fractions)
+    stages = {stage.split(' (')[0] for _, stage in updates}
+    assert {STAGE_LABELS[name] for name in ('script', 'background', 'text', 'audio', 'frames', 'mux')} <= stages
+    job = queue.get(job_id)
+    assert (job['progress'], job['stage']) == (1, 'done')
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import render_cache
+from render_cache import RenderCache, render_key
+
+SCRIPT = {'hook': "Stop scrolling", 'main_points': ["one", "two"], 'category': 'tech', 'seed': 7}
+PARAMS = {'renderer': 'engine', 'style': 'viral', 'platform': 'instagram', 'fps': 30, 'audio': None}
+
+
+def test_render_key_is_stable():
+    assert render_key(SCRIPT, PARAMS) == render_key(dict(SCRIPT), dict(PARAMS))
+    # Key order does not matter, only content
+    assert render_key(dict(reversed(list(SCRIPT.items()))), dict(reversed(list(PARAMS.items())))) == \
+        render_key(SCRIPT, PARAMS)
+    assert len(render_key(SCRIPT, PARAMS)) == 64
+
+
+@pytest.mark.parametrize('name, value', [('platform', 'tiktok'), ('fps', 24), ('audio', 'music'),
+                                         ('style', 'minimal')])
+def test_render_key_changes_with_params(name, value):
+    assert render_key(SCRIPT, dict(PARAMS, **{name: value})) != render_key(SCRIPT, PARAMS)
+
+
+def test_render_key_changes_with_script_and_version(monkeypatch):
+    key = render_key(SCRIPT, PARAMS)
+    assert render_key(dict(SCRIPT, seed=8), PARAMS) != key
+    monkeypatch.setattr(render_cache, 'RENDER_VERSION', render_cache.RENDER_VERSION + 1)
+    assert render_key(SCRIPT, PARAMS) != key
+
+
+def entry_files(cache, key):
+    return [cache._path(key, extension) for extension in ('mp4', 'jpg', 'json')]
+
+
+def test_round_trip_and_stats(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    assert cache.get('ab' * 32) is None
+    cache.put('ab' * 32, b'video', b'thumb', {'seed': 1})
+    render = cache.get('ab' * 32)
+    assert render == (b'video', b'thumb', {'seed': 1})
+    assert cache.stats() == {'hits': 1, 'misses': 1}
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    entry_bytes = 1000 + 10 + len(b'{}')
+    cache = RenderCache(str(tmp_path), max_bytes=2 * entry_bytes)
+    keys = [f'{i:02d}' * 32 for i in range(3)]
+    for age, key in zip((300, 200), keys[:2]):
+        cache.put(key, b'v' * 1000, b't' * 10)
+        for path in entry_files(cache, key):
+            os.utime(path, (os.path.getmtime(path) - age,) * 2)
+
+    # A hit makes the oldest entry the most recently used one
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[2], b'v' * 1000, b't' * 10)
+
+    assert cache.get(keys[1]) is None
+    assert not any(os.path.exists(path) for path in entry_files(cache, keys[1]))
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
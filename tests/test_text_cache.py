@@ -0,0 +1,42 @@
+import os
+
+import text_cache
+from text_cache import TextRasterCache
+
+
+def disk_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def test_rasters_are_reused_from_disk(tmp_path):
+    first = TextRasterCache(str(tmp_path))
+    raster = first.get("Stop scrolling", fontsize=30)
+    second = TextRasterCache(str(tmp_path))
+    assert (second.get("Stop scrolling", fontsize=30).rgb == raster.rgb).all()
+    assert (second.hits, second.misses) == (1, 0)
+
+
+def test_stores_do_not_scan_the_directory_each_time(tmp_path, monkeypatch):
+    scans = []
+    walk = os.walk
+    monkeypatch.setattr(text_cache.os, 'walk', lambda *args: scans.append(args) or walk(*args))
+    monkeypatch.setattr(text_cache, 'RESCAN_STORES', 16)
+    cache = TextRasterCache(str(tmp_path), max_entries=4)
+    for index in range(40):
+        cache.get(f"Line {index}", fontsize=20)
+    # One scan on the first store, then one per RESCAN_STORES stores
+    assert scans.count((str(tmp_path),)) == 3
+
+
+def test_disk_use_stays_within_the_limit(tmp_path):
+    cache = TextRasterCache(str(tmp_path), max_entries=4)
+    cache.get("Line 0", fontsize=20)
+    entry = disk_bytes(tmp_path)
+    cache.max_bytes = 5 * entry
+    for index in range(1, 30):
+        cache.get(f"Line {index}", fontsize=20)
+    assert disk_bytes(tmp_path) <= cache.max_bytes + entry
+    # The most recent rasters survive eviction
+    fresh = TextRasterCache(str(tmp_path))
+    fresh.get("Line 29", fontsize=20)
+    assert fresh.misses == 0
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from config import cache_path
+
+# ImageMagick font names used by the generators, mapped to TrueType files
+FONT_FILES = {
+    'Arial-Bold': ['Arial Bold.ttf', 'arialbd.ttf', 'Arial_Bold.ttf',
+                   'LiberationSans-Bold.ttf', 'DejaVuSans-Bold.ttf'],
+    'Arial': ['Arial.ttf', 'arial.ttf', 'LiberationSans-Regular.ttf', 'DejaVuSans.ttf'],
+}
+
+
+class TextRaster(NamedTuple):
+    """Rasterized text: RGB pixels and an 8-bit coverage mask"""
+    rgb: np.ndarray
+    mask: np.ndarray
+
+    @property
+    def size(self):
+        return self.rgb.shape[1], self.rgb.shape[0]
+
+
+@lru_cache(maxsize=64)
+def load_font(font: str, fontsize: int) -> ImageFont.FreeTypeFont:
+    """Resolve an ImageMagick-style font name to a loaded TrueType font"""
+    for candidate in FONT_FILES.get(font, []) + [font]:
+        try:
+            return ImageFont.truetype(candidate, fontsize)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=fontsize)
+    except TypeError:
+        # Pillow < 10.1 only ships a fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def wrap_lines(text: str, font: ImageFont.FreeTypeFont, max_width: float) -> List[str]:
+    """Greedy word wrap so that each line fits within max_width pixels"""
+    lines = []
+    for paragraph in text.split('\n'):
+        line = ''
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and font.getlength(candidate) > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def rasterize_pillow(text: str, font: str = 'Arial-Bold', fontsize: int = 50, color: str = 'white',
+                     stroke_color: Optional[str] = None, stroke_width: int = 0,
+                     wrap_width: Optional[int] = None) -> TextRaster:
+    """Rasterize centered text with Pillow, without calling ImageMagick"""
+    pil_font = load_font(font, fontsize)
+    stroke = stroke_width if stroke_color else 0
+    if wrap_width:
+        lines = wrap_lines(text, pil_font, wrap_width - 2 * stroke)
+    else:
+        lines = text.split('\n')
+
+    ascent, descent = pil_font.getmetrics()
+    line_height = ascent + descent + 2 * stroke
+    line_widths = [pil_font.getlength(line) for line in lines]
+    width = wrap_width or int(np.ceil(max(line_widths))) + 2 * stroke
+    height = line_height * len(lines)
+
+    rgb = Image.new('RGB', (width, height), 'black')
+    mask = Image.new('L', (width, height), 0)
+    rgb_draw = ImageDraw.Draw(rgb)
+    mask_draw = ImageDraw.Draw(mask)
+    for i, (line, line_width) in enumerate(zip(lines, line_widths)):
+        xy = ((width - line_width) / 2, i * line_height + stroke)
+        rgb_draw.text(xy, line, font=pil_font, fill=color,
+                      stroke_width=stroke, stroke_fill=stroke_color)
+        mask_draw.text(xy, line, font=pil_font, fill=255,
+                       stroke_width=stroke, stroke_fill=255)
+    return TextRaster(np.asarray(rgb), np.asarray(mask))
+
+
+def rasterize_imagemagick(text: str, font: str = 'Arial-Bold', fontsize: int = 50, color: str = 'white',
+                          stroke_color: Optional[str] = None, stroke_width: int = 0,
+                          wrap_width: Optional[int] = None) -> TextRaster:
+    """Rasterize text through moviepy's TextClip (ImageMagick)"""
+    from moviepy.editor import TextClip
+
+    kwargs = dict(fontsize=fontsize, color=color, font=font,
+                  stroke_color=stroke_color, stroke_width=stroke_width)
+    if wrap_width:
+        kwargs.update(size=(wrap_width, None), method='caption')
+    clip = TextClip(text, **kwargs)
+    rgb = clip.get_frame(0).astype(np.uint8)
+    mask = np.round(clip.mask.get_frame(0) * 255).astype(np.uint8)
+    return TextRaster(rgb, mask)
+
+
+RASTERIZERS = {
+    'pillow': rasterize_pillow,
+    'imagemagick': rasterize_imagemagick,
+}
+
+
+# Stores between full scans of the cache directory.  In between, its size is
+# tracked from this process's own writes; the scan picks up other processes'
+# writes, and also runs as soon as the tracked size goes over the limit.
+RESCAN_STORES = 256
+
+
+class TextRasterCache:
+    """Content-addressed cache of rasterized text overlays.
+
+    Rasters are keyed by a hash of the text and every style parameter that
+    affects the bitmap.  Hot entries stay in an in-memory LRU; all entries
+    are also written to ``directory`` so they are reused across renders,
+    sessions and processes.  On disk they are evicted least-recently-used
+    first (by file mtime, refreshed on every load) once they take more
+    than ``max_bytes``; the directory is only scanned when the tracked
+    size goes over that, or every ``RESCAN_STORES`` stores.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 256,
+                 rasterizer: str = 'pillow', max_bytes: int = 256 * 1024 ** 2):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.rasterizer = rasterizer
+        self._entries: 'OrderedDict[str, TextRaster]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Bytes on disk as of the last scan plus this process's stores since (None: not scanned yet)
+        self._disk_bytes: Optional[int] = None
+        self._stores_since_scan = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, text: str, font: str = 'Arial-Bold', fontsize: int = 50, color: str = 'white',
+            stroke_color: Optional[str] = None, stroke_width: int = 0,
+            wrap_width: Optional[int] = None) -> str:
+        payload = json.dumps([self.rasterizer, text, font, fontsize, color,
+                              stroke_color, stroke_width, wrap_width])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, text: str, **style) -> TextRaster:
+        """Return the raster for `text` in the given style, rendering it at most once"""
+        key = self.key(text, **style)
+        with self._lock:
+            raster = self._entries.get(key)
+            if raster is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return raster
+
+        raster = self._load(key)
+        if raster is None:
+            with self._lock:
+                self.misses += 1
+            raster = RASTERIZERS[self.rasterizer](text, **style)
+            self._store(key, raster)
+        else:
+            with self._lock:
+                self.hits += 1
+
+        with self._lock:
+            self._entries[key] = raster
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return raster
+
+    def clip(self, text: str, **style):
+        """Return a masked moviepy ImageClip for the cached raster"""
+        from transforms import sprite_clip
+
+        return sprite_clip(self.get(text, **style))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.npz")
+
+    def _load(self, key: str) -> Optional[TextRaster]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                raster = TextRaster(data['rgb'], data['mask'])
+            os.utime(path)  # Mark as recently used
+            return raster
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _store(self, key: str, raster: TextRaster):
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as handle:
+            np.savez_compressed(handle, rgb=raster.rgb, mask=raster.mask)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += size
+                self._stores_since_scan += 1
+            scan = (self._disk_bytes is None or self._disk_bytes > self.max_bytes
+                    or self._stores_since_scan >= RESCAN_STORES)
+        if scan:
+            self._evict()
+
+    def _evict(self):
+        """Scan the directory, remove least recently used files down to max_bytes and resync the size"""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass  # Evicted by another process
+        with self._lock:
+            self._disk_bytes, self._stores_since_scan = total, 0
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_text_cache() -> TextRasterCache:
+    """Process-wide text raster cache stored under the shared cache directory,
+    keeping AI_SHORTS_TEXT_CACHE_ENTRIES rasters in memory and at most
+    AI_SHORTS_TEXT_CACHE_MB on disk"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = TextRasterCache(directory=cache_path('text'),
+                                             max_entries=int(os.getenv('AI_SHORTS_TEXT_CACHE_ENTRIES', '256')),
+                                             max_bytes=int(os.getenv('AI_SHORTS_TEXT_CACHE_MB', '256')) * 1024 ** 2)
+        return _default_cache
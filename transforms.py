@@ -0,0 +1,151 @@
+import math
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from text_cache import TextRaster
+
+# Transforms closer than this to identity are skipped entirely
+IDENTITY_EPSILON = 1e-4
+
+
+class AffineAnimation:
+    """Zoom, rotation and fade folded into one warp per frame.
+
+    Zoom and rotation are applied about the frame center and combined into
+    a single affine matrix, so each frame costs at most one resample pass
+    (none when the transform is the identity).  Fades blend towards black,
+    which matches crossfading over the composite's black background; a
+    faded frame is written into a buffer owned by the instance and is only
+    valid until the next call.
+    """
+
+    def __init__(self, zoom: Optional[Callable[[float], float]] = None,
+                 angle: Optional[Callable[[float], float]] = None,
+                 fade_in: float = 0, fade_out: float = 0,
+                 resample: int = Image.BILINEAR):
+        self.zoom = zoom
+        self.angle = angle
+        self.fade_in = fade_in
+        self.fade_out = fade_out
+        self.resample = resample
+        self._faded: Optional[np.ndarray] = None
+
+    def inverse_matrix(self, t: float, size: Tuple[int, int]) -> Optional[Tuple[float, ...]]:
+        """Output-to-input affine coefficients for PIL, or None for the identity"""
+        scale = self.zoom(t) if self.zoom else 1.0
+        degrees = self.angle(t) if self.angle else 0.0
+        if abs(scale - 1) < IDENTITY_EPSILON and abs(degrees) < IDENTITY_EPSILON:
+            return None
+
+        # Output pixel p maps to input R(-angle) * (p - c) / scale + c
+        # (positive angles rotate counter-clockwise, like moviepy's rotate)
+        radians = math.radians(degrees)
+        cos = math.cos(radians) / scale
+        sin = math.sin(radians) / scale
+        cx, cy = size[0] / 2, size[1] / 2
+        return (cos, -sin, cx - cos * cx + sin * cy,
+                sin, cos, cy - sin * cx - cos * cy)
+
+    def opacity(self, t: float, duration: Optional[float]) -> float:
+        opacity = 1.0
+        if self.fade_in and t < self.fade_in:
+            opacity = min(opacity, t / self.fade_in)
+        if self.fade_out and duration is not None and t > duration - self.fade_out:
+            opacity = min(opacity, (duration - t) / self.fade_out)
+        return max(opacity, 0.0)
+
+    def frame_key(self, t: float, size: Tuple[int, int], duration: Optional[float] = None) -> Hashable:
+        """Warp and fade at time t: equal keys transform equal frames identically"""
+        return self.inverse_matrix(t, size), self.opacity(t, duration)
+
+    def apply(self, frame: np.ndarray, t: float, duration: Optional[float] = None) -> np.ndarray:
+        """Warp and fade one frame"""
+        height, width = frame.shape[:2]
+        matrix = self.inverse_matrix(t, (width, height))
+        if matrix is not None:
+            image = Image.fromarray(frame).transform((width, height), Image.AFFINE, matrix,
+                                                     resample=self.resample)
+            frame = np.asarray(image)
+
+        opacity = self.opacity(t, duration)
+        if opacity < 1:
+            if self._faded is None or self._faded.shape != frame.shape:
+                self._faded = np.empty(frame.shape, dtype=np.uint8)
+            np.multiply(frame, np.float32(opacity), out=self._faded, casting='unsafe')
+            frame = self._faded
+        return frame
+
+    def apply_to(self, clip):
+        """Return `clip` with the animation applied frame by frame"""
+        duration = clip.duration
+        return clip.fl(lambda get_frame, t: self.apply(get_frame(t), t, duration), apply_to=[])
+
+
+class StaticSprite:
+    """Sprite that shows the same raster for its whole lifetime"""
+
+    def __init__(self, raster: TextRaster):
+        self.raster = raster
+        self._frame = (raster.rgb, raster.mask.astype(np.float32) / 255)
+
+    def frame(self, t: float) -> Tuple[np.ndarray, np.ndarray]:
+        """RGB frame and float mask at time t"""
+        return self._frame
+
+    def clip(self):
+        """Masked moviepy clip of the sprite"""
+        from moviepy.editor import ImageClip
+
+        rgb, mask = self._frame
+        return ImageClip(rgb).set_mask(ImageClip(mask, ismask=True))
+
+
+class ScaledSprite:
+    """Small sprite animated by scale, served from quantized pre-scaled variants"""
+
+    def __init__(self, raster: TextRaster, scale: Callable[[float], float], step: float = 0.01,
+                 resample: int = Image.BILINEAR):
+        self.raster = raster
+        self.scale = scale
+        self.step = step
+        self.resample = resample
+        self._variants: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def frame(self, t: float) -> Tuple[np.ndarray, np.ndarray]:
+        """RGB frame and float mask for the scale at time t"""
+        level = int(round(self.scale(t) / self.step))
+        variant = self._variants.get(level)
+        if variant is None:
+            variant = self._render(level * self.step)
+            self._variants[level] = variant
+        return variant
+
+    def _render(self, scale: float) -> Tuple[np.ndarray, np.ndarray]:
+        rgb, mask = self.raster.rgb, self.raster.mask
+        if abs(scale - 1) >= IDENTITY_EPSILON:
+            width, height = self.raster.size
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            rgb = np.asarray(Image.fromarray(rgb).resize(size, self.resample))
+            mask = np.asarray(Image.fromarray(mask).resize(size, self.resample))
+        return rgb, mask.astype(np.float32) / 255
+
+    def clip(self):
+        """Masked moviepy clip whose size follows the scale curve"""
+        from moviepy.editor import VideoClip
+
+        mask = VideoClip(lambda t: self.frame(t)[1], ismask=True)
+        return VideoClip(lambda t: self.frame(t)[0]).set_mask(mask)
+
+
+def make_sprite(raster: TextRaster, scale: Optional[Callable[[float], float]] = None, step: float = 0.01):
+    """Sprite for a text raster, optionally pulsing in scale"""
+    if scale is None:
+        return StaticSprite(raster)
+    return ScaledSprite(raster, scale, step)
+
+
+def sprite_clip(raster: TextRaster, scale: Optional[Callable[[float], float]] = None, step: float = 0.01):
+    """Masked moviepy clip for a text raster, optionally pulsing in scale"""
+    return make_sprite(raster, scale, step).clip()